@@ -0,0 +1,111 @@
+"""
+拾取/框选 overlay 的命中测试调度：光标移动超过阈值、或距上次查询超过刷新间隔时才重新查询，
+其余时候直接复用上次结果；同时统计查询耗时与 CPU 占用。光标来源、查询函数与时钟均可注入，
+不依赖 Win32。
+"""
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+Point = tuple[int, int]
+
+
+class HitTestScheduler(Generic[T]):
+    """
+    poll() 每个 tick 调用一次，返回 (结果, 本次是否重新查询)。
+
+    - move_threshold：光标相对上次查询位置移动超过该像素数（切比雪夫距离）才重新查询
+    - min_interval：两次查询的最小间隔（光标快速移动时合并查询）
+    - refresh_interval：光标不动时的刷新间隔（界面自身变化时也能更新）；None 表示不刷新
+    """
+
+    def __init__(
+        self,
+        cursor: Callable[[], Point],
+        hit_test: Callable[[int, int], T],
+        move_threshold: int = 3,
+        min_interval: float = 0.03,
+        refresh_interval: Optional[float] = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        cpu_clock: Callable[[], float] = time.thread_time,
+    ):
+        self._cursor = cursor
+        self._hit_test = hit_test
+        self.move_threshold = move_threshold
+        self.min_interval = min_interval
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._cpu_clock = cpu_clock
+        self._lock = threading.Lock()
+        self.cursor: Optional[Point] = None
+        self._last_pos: Optional[Point] = None
+        self._last_at: Optional[float] = None
+        self._last: Optional[T] = None
+        self._started_at = clock()
+        self._polls = 0
+        self._queries = 0
+        self._reused = 0
+        self._latencies_ms: list[float] = []
+        self._query_cpu = 0.0
+
+    @property
+    def last(self) -> Optional[T]:
+        return self._last
+
+    def _due(self, pos: Point, now: float) -> bool:
+        if self._last_at is None or self._last_pos is None:
+            return True
+        elapsed = now - self._last_at
+        moved = max(abs(pos[0] - self._last_pos[0]), abs(pos[1] - self._last_pos[1]))
+        if moved > self.move_threshold:
+            return elapsed >= self.min_interval
+        return self.refresh_interval is not None and elapsed >= self.refresh_interval
+
+    def _query(self, pos: Point) -> T:
+        t0, c0 = self._clock(), self._cpu_clock()
+        try:
+            result = self._hit_test(pos[0], pos[1])
+        finally:
+            t1 = self._clock()
+            self._query_cpu += self._cpu_clock() - c0
+            self._latencies_ms.append((t1 - t0) * 1000)
+            if len(self._latencies_ms) > 1000:
+                del self._latencies_ms[:500]
+            self._queries += 1
+            self._last_pos, self._last_at = pos, t1
+        self._last = result
+        return result
+
+    def poll(self) -> tuple[Optional[T], bool]:
+        with self._lock:
+            self._polls += 1
+            pos = self._cursor()
+            self.cursor = pos
+            if not self._due(pos, self._clock()):
+                self._reused += 1
+                return self._last, False
+            return self._query(pos), True
+
+    def force(self) -> T:
+        """忽略阈值立即查询（如热键捕获时）。"""
+        with self._lock:
+            pos = self._cursor()
+            self.cursor = pos
+            return self._query(pos)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lat = sorted(self._latencies_ms)
+            wall = max(self._clock() - self._started_at, 1e-9)
+            return {
+                "polls": self._polls,
+                "queries": self._queries,
+                "reused": self._reused,
+                "latency_ms_avg": round(sum(lat) / len(lat), 3) if lat else None,
+                "latency_ms_p95": round(lat[min(len(lat) - 1, int(len(lat) * 0.95))], 3) if lat else None,
+                "latency_ms_max": round(lat[-1], 3) if lat else None,
+                "query_cpu_ms": round(self._query_cpu * 1000, 3),
+                "query_cpu_percent": round(self._query_cpu / wall * 100, 2),
+            }
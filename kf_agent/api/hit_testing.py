@@ -0,0 +1,317 @@
+"""
+控件拾取的命中测试：把窗口的元素树拍成快照，按网格建立元素矩形的空间索引，
+点查询从索引中沿“包含该点的祖先链”下降到最深的元素，窗口变化前不再遍历 UIA 树。
+
+真实环境中每次取矩形/子元素都是一次 UIA 跨进程调用，拍快照要访问整棵树（数千到上万次），
+因此快照在后台线程构建（SnapshotCache），构建完成前与失效期间由调用方回退到逐层下降；
+快照被节点数/深度上限截断的子树，命中后从该节点继续逐层下降。
+本模块不依赖 Win32，元素访问通过 get_rect / get_children / is_visible 注入，可用合成树测试与基准。
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+Rect = tuple[int, int, int, int]
+
+SnapshotBuild = Callable[[], tuple[list["ElementNode"], dict[str, Any]]]
+
+
+class ElementNode:
+    """快照中的一个元素：矩形、深度、父节点下标、原始元素（payload），truncated 表示子元素未完整拍入快照。"""
+
+    __slots__ = ("rect", "depth", "parent", "payload", "area", "truncated")
+
+    def __init__(self, rect: Rect, depth: int, parent: int, payload: Any):
+        self.rect = rect
+        self.depth = depth
+        self.parent = parent
+        self.payload = payload
+        self.area = (rect[2] - rect[0]) * (rect[3] - rect[1])
+        self.truncated = False
+
+    def contains(self, x: int, y: int) -> bool:
+        l, t, r, b = self.rect
+        return l <= x <= r and t <= y <= b
+
+
+def snapshot_tree(
+    root: Any,
+    get_rect: Callable[[Any], Optional[Rect]],
+    get_children: Callable[[Any], Iterable[Any]],
+    max_depth: int = 12,
+    max_nodes: int = 5000,
+    is_visible: Optional[Callable[[Any], bool]] = None,
+) -> list[ElementNode]:
+    """
+    广度优先遍历元素树，返回节点列表（下标 0 为根）。无矩形或空矩形的元素不入列，但继续遍历其子元素；
+    is_visible 返回 False（如 UIA IsOffscreen）的元素连同子树跳过。
+    达到 max_depth 或 max_nodes 时，未展开子元素的节点标记 truncated，查询命中时由调用方继续下降。
+    """
+    nodes: list[ElementNode] = []
+    queue: list[tuple[Any, int, int]] = [(root, 0, -1)]
+    i = 0
+    while i < len(queue) and len(nodes) < max_nodes:
+        elem, depth, parent = queue[i]
+        i += 1
+        if is_visible is not None and depth > 0:
+            try:
+                if not is_visible(elem):
+                    continue
+            except Exception:
+                pass
+        try:
+            rect = get_rect(elem)
+        except Exception:
+            rect = None
+        index = parent
+        if rect is not None and rect[0] < rect[2] and rect[1] < rect[3]:
+            index = len(nodes)
+            nodes.append(ElementNode(rect, depth, parent, elem))
+        if depth >= max_depth:
+            if index >= 0:
+                nodes[index].truncated = True
+            continue
+        try:
+            children = list(get_children(elem))
+        except Exception:
+            continue
+        for child in children:
+            queue.append((child, depth + 1, index))
+    # 节点数达到上限时队列中剩余的元素没有入列：它们最近的已入列祖先标记为截断
+    for _, _, parent in queue[i:]:
+        if parent >= 0:
+            nodes[parent].truncated = True
+    return nodes
+
+
+class GridIndex:
+    """
+    均匀网格空间索引：每个元素登记到其矩形覆盖的所有格子，点查询只检查所在格子的元素。
+    超大元素（如窗口根节点）覆盖格子过多时单独存放，查询时总是检查。
+    """
+
+    def __init__(self, nodes: list[ElementNode], cell_size: int = 64, max_cells_per_node: int = 256):
+        self.nodes = nodes
+        self.cell_size = cell_size
+        self._cells: dict[tuple[int, int], list[int]] = {}
+        self._large: list[int] = []
+        for i, node in enumerate(nodes):
+            l, t, r, b = node.rect
+            cx0, cy0 = l // cell_size, t // cell_size
+            cx1, cy1 = r // cell_size, b // cell_size
+            if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > max_cells_per_node:
+                self._large.append(i)
+                continue
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    self._cells.setdefault((cx, cy), []).append(i)
+
+    def candidates(self, x: int, y: int) -> list[int]:
+        cell = self._cells.get((x // self.cell_size, y // self.cell_size), ())
+        return [i for i in (*self._large, *cell) if self.nodes[i].contains(x, y)]
+
+    def deepest_at(self, x: int, y: int) -> Optional[ElementNode]:
+        """
+        从根开始沿包含 (x, y) 的子元素逐层下降（每层取面积最小者，同面积取靠后的兄弟，即通常绘制在上层的），
+        返回链上最深的元素；根不包含该点时返回 None。与实时逐层下降的结果一致，不会跳到其他分支中
+        被遮挡的更小元素。
+        """
+        nodes = self.nodes
+        if not nodes or not nodes[0].contains(x, y):
+            return None
+        by_parent: dict[int, list[int]] = {}
+        for i in self.candidates(x, y):
+            by_parent.setdefault(nodes[i].parent, []).append(i)
+        current = 0
+        while True:
+            kids = by_parent.get(current)
+            if not kids:
+                return nodes[current]
+            best = kids[0]
+            for i in kids[1:]:
+                if nodes[i].area <= nodes[best].area:
+                    best = i
+            current = best
+
+
+def smallest_by_descent(
+    root: Any,
+    x: int,
+    y: int,
+    get_rect: Callable[[Any], Optional[Rect]],
+    get_children: Callable[[Any], Iterable[Any]],
+    max_depth: int = 12,
+    is_visible: Optional[Callable[[Any], bool]] = None,
+) -> Any:
+    """逐层下降：每层选包含该点的最小子元素（即拾取器原有的实时遍历算法；快照未就绪或被截断时使用）。"""
+    elem = root
+    for _ in range(max_depth):
+        best = None
+        rect = get_rect(elem)
+        best_area = (rect[2] - rect[0]) * (rect[3] - rect[1]) if rect else 999999999
+        for child in get_children(elem):
+            rc = get_rect(child)
+            if rc is None:
+                continue
+            cl, ct, cr, cb = rc
+            if cl <= x <= cr and ct <= y <= cb:
+                area = (cr - cl) * (cb - ct)
+                if 0 < area < best_area:
+                    if is_visible is not None and not is_visible(child):
+                        continue
+                    best_area = area
+                    best = child
+        if best is None:
+            break
+        elem = best
+    return elem
+
+
+class SnapshotCache:
+    """
+    按窗口键缓存快照索引，快照在后台线程构建，get() 从不阻塞在构建上：
+    键一致且未失效时返回 (索引, meta)，否则安排构建并返回 None（调用方本次回退到逐层下降）。
+
+    失效由外部事件驱动（焦点变化、结构变化时调用 invalidate()）；两次构建至少间隔 min_rebuild_interval 秒，
+    结构事件频繁的窗口不会被持续重建。max_age 为兜底的最长有效期（无法订阅事件时使用），None 表示不按时间失效。
+    on_worker_start / on_worker_stop 在后台线程内调用（如初始化 COM、注销事件）。
+    """
+
+    def __init__(
+        self,
+        max_age: Optional[float] = None,
+        min_rebuild_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        on_worker_start: Optional[Callable[[], None]] = None,
+        on_worker_stop: Optional[Callable[[], None]] = None,
+    ):
+        self.max_age = max_age
+        self.min_rebuild_interval = min_rebuild_interval
+        self._clock = clock
+        self._on_worker_start = on_worker_start
+        self._on_worker_stop = on_worker_stop
+        self._key: Optional[Hashable] = None
+        self._index: Optional[GridIndex] = None
+        self._meta: dict[str, Any] = {}
+        self._built_at = 0.0
+        self._stale = False
+        # 失效计数：构建期间发生失效时，构建结果直接视为过期
+        self._epoch = 0
+        self._request: Optional[tuple[Hashable, SnapshotBuild]] = None
+        self._building: Optional[Hashable] = None
+        self._last_start = float("-inf")
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._closing = False
+        self.builds = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _fresh_locked(self, key: Hashable) -> bool:
+        if self._index is None or self._key != key or self._stale:
+            return False
+        return self.max_age is None or self._clock() - self._built_at <= self.max_age
+
+    def get(self, key: Hashable, build: SnapshotBuild) -> Optional[tuple[GridIndex, dict[str, Any]]]:
+        with self._cond:
+            if self._fresh_locked(key):
+                self.hits += 1
+                return self._index, self._meta
+            self.misses += 1
+            if self._building != key:
+                self._request = (key, build)
+                self._ensure_worker_locked()
+                self._cond.notify()
+            return None
+
+    def _ensure_worker_locked(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._closing = False
+            self._worker = threading.Thread(target=self._work, name="kf-picker-snapshot", daemon=True)
+            self._worker.start()
+
+    def _work(self) -> None:
+        if self._on_worker_start is not None:
+            try:
+                self._on_worker_start()
+            except Exception as e:
+                logger.debug("snapshot worker start hook: %s", e)
+        try:
+            while True:
+                with self._cond:
+                    while self._request is None and not self._closing:
+                        self._cond.wait()
+                    if self._closing:
+                        return
+                    # 距上次构建不足 min_rebuild_interval 时先等待，期间到来的新请求覆盖旧请求
+                    delay = self._last_start + self.min_rebuild_interval - self._clock()
+                    if delay > 0:
+                        self._cond.wait(delay)
+                        continue
+                    key, build = self._request
+                    self._request = None
+                    self._building = key
+                    self._last_start = self._clock()
+                    epoch = self._epoch
+                try:
+                    nodes, meta = build()
+                    index: Optional[GridIndex] = GridIndex(nodes)
+                except Exception as e:
+                    logger.debug("snapshot build failed: %s", e)
+                    index, meta = None, {}
+                with self._cond:
+                    self._building = None
+                    if index is not None:
+                        self._key, self._index, self._meta = key, index, meta
+                        self._built_at = self._clock()
+                        self._stale = epoch != self._epoch
+                        self.builds += 1
+        finally:
+            if self._on_worker_stop is not None:
+                try:
+                    self._on_worker_stop()
+                except Exception as e:
+                    logger.debug("snapshot worker stop hook: %s", e)
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """等待后台没有待处理或进行中的构建（测试与基准用）。"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._cond:
+                if self._request is None and self._building is None:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def invalidate(self) -> None:
+        """标记当前快照过期（可在任意线程调用，如 UIA 事件回调）；下次 get() 时安排重建。"""
+        with self._cond:
+            self._stale = True
+            self._epoch += 1
+            self.invalidations += 1
+
+    def close(self) -> None:
+        """停止后台线程并丢弃快照（拾取会话结束时调用）。"""
+        with self._cond:
+            self._closing = True
+            self._request = None
+            self._key = None
+            self._index = None
+            self._meta = {}
+            self._cond.notify_all()
+            worker = self._worker
+        if worker is not None and worker is not threading.current_thread():
+            worker.join(timeout=2.0)
+
+    def stats(self) -> dict[str, int]:
+        with self._cond:
+            return {
+                "builds": self.builds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
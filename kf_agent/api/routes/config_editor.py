@@ -1,5 +1,5 @@
 """配置 CRUD 接口：获取/更新某平台的流程与元素配置。"""
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, Field
 from typing import Any, Optional
 
@@ -9,6 +9,11 @@ from kf_agent.storage import platform_config as storage
 router = APIRouter()
 
 
+class AcceptWaitSuggestionsRequest(BaseModel):
+    steps: Optional[list[str]] = Field(None, description="要接受的步骤路径（如 open[3]），默认全部有建议的步骤")
+    host: Optional[str] = Field(None, description="按哪台主机的观测，默认本机 agent_id")
+
+
 class PlatformConfigUpdate(BaseModel):
     open: list[dict[str, Any]] = Field(default_factory=list, description="打开流程步骤列表")
     close: list[dict[str, Any]] = Field(default_factory=list, description="关闭流程步骤列表")
@@ -23,6 +28,46 @@ async def get_platform_config(platform_id: str):
     return config.model_dump()
 
 
+@router.get("/platforms/{platform_id}/analysis")
+def analyze_platform_config(
+    platform_id: str,
+    screen_width: int = Query(1920, ge=1),
+    screen_height: int = Query(1080, ge=1),
+):
+    """静态估算 open/close 流程的最好/最坏耗时、耗时最多的步骤与高耗时写法提示（不执行流程）。"""
+    from kf_agent.core.analysis import analyze_platform
+
+    result = analyze_platform(platform_id, screen=(screen_width, screen_height))
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"platform not found: {platform_id}")
+    return result
+
+
+@router.get("/platforms/{platform_id}/wait-suggestions")
+def get_wait_suggestions(platform_id: str, host: Optional[str] = None):
+    """各 wait 步骤观测到的下一步就绪耗时 p50/p99 与建议秒数（需 WAIT_TUNE_MODE=observe 或 auto）。"""
+    from kf_agent.core.wait_tuning import wait_suggestions
+
+    items = wait_suggestions(platform_id, host)
+    if items is None:
+        raise HTTPException(status_code=404, detail=f"platform not found: {platform_id}")
+    return {"platform": platform_id, "suggestions": items}
+
+
+@router.post("/platforms/{platform_id}/wait-suggestions/accept")
+def accept_wait_suggestions(platform_id: str, body: AcceptWaitSuggestionsRequest):
+    """把建议秒数写回平台 JSON。"""
+    from kf_agent.core.wait_tuning import accept_wait_suggestions as accept
+
+    try:
+        accepted = accept(platform_id, steps=body.steps, host=body.host)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if accepted is None:
+        raise HTTPException(status_code=404, detail=f"platform not found: {platform_id}")
+    return {"platform": platform_id, "accepted": accepted}
+
+
 @router.put("/platforms/{platform_id}")
 async def update_platform_config(platform_id: str, body: PlatformConfigUpdate):
     config = PlatformConfig(
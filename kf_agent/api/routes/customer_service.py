@@ -1,34 +1,144 @@
-"""打开/关闭/状态/平台列表接口。"""
-from fastapi import APIRouter, HTTPException
+"""打开/关闭/状态/平台列表接口，以及异步任务提交与查询。"""
+import asyncio
+from typing import Any, Literal, Optional
+
+from fastapi import APIRouter, Header, HTTPException
 from pydantic import BaseModel, Field
 
-from kf_agent.core import service
+from kf_agent.core import executor, service
+from kf_agent.core.jobs import IdempotencyConflict
 
 router = APIRouter()
 
+# 同步接口带 Idempotency-Key 时，等待任务完成的轮询间隔
+_JOB_POLL_INTERVAL = 0.2
+
 
 class OpenRequest(BaseModel):
     platform: str = Field(..., description="平台 ID，如 qianniu、xiaohongshu、douyin")
+    resume: bool = Field(False, description="上次失败且会话/窗口仍有效时，从失败的步骤继续")
 
 
 class CloseRequest(BaseModel):
     platform: str = Field(..., description="平台 ID")
+    resume: bool = Field(False, description="同 OpenRequest.resume")
 
 
-@router.post("/open")
-async def open_customer_service(body: OpenRequest):
-    result = service.open_platform(body.platform)
+class RunFlowRequest(BaseModel):
+    platform: str = Field(..., description="平台 ID（用于模板路径与日志）")
+    steps: list[dict[str, Any]] = Field(..., description="步骤列表，格式同平台配置中的 open/close")
+
+
+class SubmitJobRequest(BaseModel):
+    action: Literal["open", "close", "run"]
+    platform: str = Field(..., description="平台 ID")
+    steps: Optional[list[dict[str, Any]]] = Field(None, description="action=run 时的步骤列表")
+    resume: bool = Field(False, description="action=open/close 时从上次失败的步骤继续")
+
+
+async def _submit_job(
+    action: str,
+    platform: str,
+    steps: Optional[list[dict[str, Any]]],
+    idempotency_key: Optional[str],
+    resume: bool = False,
+) -> dict:
+    loop = asyncio.get_event_loop()
+    try:
+        return await loop.run_in_executor(
+            None,
+            lambda: service.submit_job(
+                action, platform, steps=steps, idempotency_key=idempotency_key, resume=resume,
+            ),
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except executor.ExecutorError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def _get_job(job_id: str) -> Optional[dict]:
+    loop = asyncio.get_event_loop()
+    try:
+        return await loop.run_in_executor(None, service.get_job, job_id)
+    except executor.ExecutorError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def _run(
+    action: str,
+    platform: str,
+    steps: Optional[list[dict[str, Any]]],
+    idempotency_key: Optional[str],
+    resume: bool = False,
+) -> dict:
+    """
+    同步执行并返回结果。带 Idempotency-Key 时经任务表去重：重复请求等待（或直接拿到）同一次执行的结果。
+    """
+    # 流程执行（或等待执行器）是阻塞调用，放到线程池避免卡住事件循环
+    loop = asyncio.get_event_loop()
+    if not idempotency_key:
+        if action == "open":
+            result = await loop.run_in_executor(None, service.open_platform, platform, resume)
+        elif action == "close":
+            result = await loop.run_in_executor(None, service.close_platform, platform, resume)
+        else:
+            result = await loop.run_in_executor(None, service.run_flow, platform, steps or [])
+    else:
+        job = await _submit_job(action, platform, steps, idempotency_key, resume)
+        while job is not None and job["status"] in ("pending", "running"):
+            await asyncio.sleep(_JOB_POLL_INTERVAL)
+            job = await _get_job(job["job_id"])
+        if job is None:
+            raise HTTPException(status_code=410, detail="job expired")
+        result = job["result"] or {"success": False, "message": "job has no result"}
     if not result["success"]:
         raise HTTPException(status_code=400, detail=result["message"])
     return result
 
 
+@router.post("/open")
+async def open_customer_service(
+    body: OpenRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    return await _run("open", body.platform, None, idempotency_key, body.resume)
+
+
 @router.post("/close")
-async def close_customer_service(body: CloseRequest):
-    result = service.close_platform(body.platform)
-    if not result["success"]:
-        raise HTTPException(status_code=400, detail=result["message"])
-    return result
+async def close_customer_service(
+    body: CloseRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    return await _run("close", body.platform, None, idempotency_key, body.resume)
+
+
+@router.post("/run")
+async def run_customer_service_flow(
+    body: RunFlowRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    """执行任意步骤列表（集群广播等场景）。"""
+    return await _run("run", body.platform, body.steps, idempotency_key)
+
+
+@router.post("/jobs")
+async def submit_job(
+    body: SubmitJobRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    """提交异步任务，立即返回任务快照（含 job_id）；相同 Idempotency-Key 返回同一任务。"""
+    if body.action == "run" and not body.steps:
+        raise HTTPException(status_code=400, detail="steps required for action=run")
+    return await _submit_job(body.action, body.platform, body.steps, idempotency_key, body.resume)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await _get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
 
 
 @router.get("/status")
@@ -0,0 +1,95 @@
+"""诊断接口（需 DEBUG_ENDPOINTS_ENABLED=true）：采样分析、内存统计。执行器模式下同时覆盖执行器进程。"""
+import asyncio
+from typing import Any, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from kf_agent.config import get_settings
+from kf_agent.core import executor, memory, profiler
+
+router = APIRouter()
+
+
+def _require_enabled() -> None:
+    if not get_settings().debug_endpoints_enabled:
+        raise HTTPException(status_code=404, detail="debug endpoints disabled")
+
+
+@router.post("/profile")
+async def profile(
+    seconds: float = Query(5.0, gt=0, description="采样秒数"),
+    interval: float = Query(0.01, ge=0.001, le=1.0, description="采样间隔秒数"),
+    include_idle: bool = Query(False, description="是否计入阻塞在 wait/select/accept 上的空闲线程"),
+    format: Literal["json", "collapsed"] = Query("json", description="collapsed 返回折叠栈文本（火焰图输入）"),
+):
+    """采样 API 进程（及执行器进程）各线程的调用栈，返回折叠栈、各线程样本数与自身耗时最多的函数。"""
+    _require_enabled()
+    settings = get_settings()
+    if seconds > settings.debug_profile_max_seconds:
+        raise HTTPException(status_code=400, detail=f"seconds must be <= {settings.debug_profile_max_seconds}")
+    loop = asyncio.get_running_loop()
+    names = ["api"]
+    tasks = [loop.run_in_executor(None, lambda: profiler.sample(seconds, interval, include_idle, root="api"))]
+    if executor.use_executor_process():
+        names.append("executor")
+        tasks.append(loop.run_in_executor(None, lambda: executor.call(
+            "profile", timeout=seconds + 10.0,
+            seconds=seconds, interval=interval, include_idle=include_idle, root="executor",
+        )))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    processes: dict[str, Any] = {}
+    for name, result in zip(names, results):
+        if isinstance(result, profiler.ProfilerBusy):
+            raise HTTPException(status_code=409, detail=str(result))
+        if isinstance(result, BaseException):
+            processes[name] = {"error": str(result)}
+        else:
+            processes[name] = result
+    if format == "collapsed":
+        stacks: dict[str, int] = {}
+        for result in processes.values():
+            stacks.update(result.get("stacks") or {})
+        return PlainTextResponse(profiler.collapsed(stacks))
+    return {"seconds": seconds, "interval": interval, "processes": processes}
+
+
+async def _each_process(local: Any, op: str, timeout: float, **kwargs: Any) -> dict[str, Any]:
+    """在 API 进程执行 local()，执行器模式下同时在执行器进程执行 op；某个进程失败时该项为 {"error": ...}。"""
+    loop = asyncio.get_running_loop()
+    names = ["api"]
+    tasks = [loop.run_in_executor(None, local)]
+    if executor.use_executor_process():
+        names.append("executor")
+        tasks.append(loop.run_in_executor(None, lambda: executor.call(op, timeout=timeout, **kwargs)))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    return {
+        name: {"error": str(result)} if isinstance(result, BaseException) else result
+        for name, result in zip(names, results)
+    }
+
+
+@router.get("/memory")
+async def memory_usage(
+    top: int = Query(20, ge=1, le=200, description="分配热点条数"),
+    group_by: Literal["lineno", "filename", "traceback"] = Query("lineno"),
+):
+    """进程 RSS、模板/匹配缓存与驱动持有的帧、tracemalloc 分配热点（未开启时为 null）。"""
+    _require_enabled()
+    processes = await _each_process(
+        lambda: memory.memory_report(top, group_by), "memory", 30.0, top=top, group_by=group_by,
+    )
+    return {"processes": processes}
+
+
+@router.post("/memory/tracemalloc")
+async def toggle_tracemalloc(
+    enabled: bool = Query(..., description="开启或关闭"),
+    frames: Optional[int] = Query(None, ge=1, le=50, description="每个分配记录的栈深度"),
+):
+    """运行时开关 tracemalloc（开启后分配变慢，排查完请关闭）。"""
+    _require_enabled()
+    processes = await _each_process(
+        lambda: memory.set_tracing(enabled, frames), "tracemalloc", 10.0, enabled=enabled, frames=frames,
+    )
+    return {"processes": processes}
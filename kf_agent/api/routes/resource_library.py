@@ -1,6 +1,5 @@
 """平台资源库 API：控件/图片资源的 CRUD 与定位。"""
 import logging
-import re
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
@@ -41,66 +40,12 @@ def _resolve_image_path(image_path: str) -> Path:
     return p
 
 
-def _locate_control_rect(control: ElementControl) -> Optional[tuple[int, int, int, int]]:
-    try:
-        from pywinauto import Application
-        from pywinauto.findwindows import ElementNotFoundError
-    except ImportError:
-        return None
-
-    if not control.window_title and not control.window_class:
+def _locate_control_rect(platform_id: str, control: ElementControl) -> Optional[tuple[int, int, int, int]]:
+    if sys.platform != "win32":
         return None
-
+    from kf_agent.drivers.control_locator import get_control_locator
     try:
-        app = Application(backend="uia")
-        if control.window_title:
-            app = app.connect(title_re=f".*{re.escape(control.window_title)}.*", timeout=5)
-        else:
-            app = app.connect(class_name_re=f".*{re.escape(control.window_class or '')}.*", timeout=5)
-
-        win = app.windows()[0]
-        if (
-            control.control_id is None
-            and not control.automation_id
-            and not control.control_type
-            and not control.name
-        ):
-            return None
-
-        # 先严格后宽松，避免捕获信息轻微变化导致定位失败
-        candidates: list[dict] = []
-        if control.automation_id and control.control_id is not None:
-            candidates.append({"auto_id": control.automation_id, "control_id": control.control_id})
-        if control.automation_id and control.name:
-            candidates.append({"auto_id": control.automation_id, "title_re": f".*{re.escape(control.name)}.*"})
-        if control.control_id is not None and control.name:
-            candidates.append({"control_id": control.control_id, "title_re": f".*{re.escape(control.name)}.*"})
-        if control.automation_id:
-            candidates.append({"auto_id": control.automation_id})
-        if control.control_id is not None:
-            candidates.append({"control_id": control.control_id})
-        if control.name and control.control_type:
-            candidates.append({"title_re": f".*{re.escape(control.name)}.*", "control_type": control.control_type})
-        if control.name:
-            candidates.append({"title_re": f".*{re.escape(control.name)}.*"})
-        if control.control_type:
-            candidates.append({"control_type": control.control_type})
-
-        tried = set()
-        for kwargs in candidates:
-            key = tuple(sorted(kwargs.items()))
-            if key in tried:
-                continue
-            tried.add(key)
-            try:
-                ctrl = win.child_window(**kwargs).wrapper_object()
-                rect = ctrl.rectangle()
-                return (int(rect.left), int(rect.top), int(rect.right), int(rect.bottom))
-            except Exception:
-                continue
-        return None
-    except ElementNotFoundError:
-        return None
+        return get_control_locator(platform_id).rect(control)
     except Exception as e:
         logger.warning("locate control failed: %s", e)
         return None
@@ -258,7 +203,7 @@ async def locate_resource(platform_id: str, body: LocateResourceBody):
         item = next((x for x in library.controls if x.id == body.resource_id), None)
         if item is None:
             raise HTTPException(status_code=404, detail="control resource not found")
-        rect = _locate_control_rect(item.payload)
+        rect = _locate_control_rect(platform_id, item.payload)
         if rect is None:
             raise HTTPException(status_code=404, detail="control not found on current desktop")
         _blink_rect(rect)
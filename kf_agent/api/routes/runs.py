@@ -0,0 +1,75 @@
+"""执行历史查询：最近执行记录、单次执行明细、按步骤的耗时百分位与失败率，以及失败现场文件。"""
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from kf_agent.storage.run_history import RunHistoryStore, get_run_history
+
+router = APIRouter()
+
+
+def _store() -> RunHistoryStore:
+    store = get_run_history()
+    if store is None:
+        raise HTTPException(status_code=404, detail="run history disabled")
+    return store
+
+
+@router.get("")
+def list_runs(
+    platform: Optional[str] = None,
+    flow: Optional[str] = None,
+    since: Optional[float] = Query(None, description="起始时间（Unix 秒）"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """最近的执行记录（新到旧）。"""
+    return {"runs": _store().list_runs(platform=platform, flow=flow, since=since, limit=limit)}
+
+
+@router.get("/stats")
+def run_stats(
+    platform: Optional[str] = None,
+    flow: Optional[str] = None,
+    since: Optional[float] = Query(None, description="起始时间（Unix 秒）"),
+):
+    """按步骤的耗时 p50/p95/p99 与失败次数，按 (平台, 流程) 的失败率。"""
+    store = _store()
+    return {
+        "steps": store.step_stats(platform=platform, flow=flow, since=since),
+        "flows": store.failure_rates(platform=platform, flow=flow, since=since),
+    }
+
+
+@router.get("/{run_id}")
+def get_run(run_id: str):
+    """单次执行明细（含各步骤耗时、状态与定位信息）。"""
+    run = _store().get_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"run not found: {run_id}")
+    return run
+
+
+@router.get("/{run_id}/artifacts")
+def list_run_artifacts(run_id: str):
+    """失败现场：文件列表（screen.jpg 屏幕帧并框出最高分位置、template.* 模板、meta.json）与 meta 内容。"""
+    from kf_agent.storage.artifacts import get_artifact_store
+
+    store = get_artifact_store()
+    files = store.list_artifacts(run_id) if store is not None else None
+    if files is None:
+        raise HTTPException(status_code=404, detail=f"no artifacts for run: {run_id}")
+    for f in files:
+        f["url"] = f"/runs/{run_id}/artifacts/{f['name']}"
+    return {"run_id": run_id, "files": files, "meta": store.read_meta(run_id)}
+
+
+@router.get("/{run_id}/artifacts/{name}")
+def get_run_artifact(run_id: str, name: str):
+    from kf_agent.storage.artifacts import get_artifact_store
+
+    store = get_artifact_store()
+    path = store.artifact_path(run_id, name) if store is not None else None
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"artifact not found: {name}")
+    return FileResponse(path)
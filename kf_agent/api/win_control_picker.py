@@ -9,6 +9,9 @@ import threading
 import warnings
 from typing import Any, Callable, Optional
 
+from kf_agent.api.hit_scheduler import HitTestScheduler
+from kf_agent.api.hit_testing import SnapshotCache, smallest_by_descent, snapshot_tree
+
 # 抑制 pywinauto 在子线程中的 STA 提示（已在本线程 CoInitializeEx STA）
 warnings.filterwarnings("ignore", message=".*STA COM.*", category=UserWarning)
 
@@ -21,6 +24,19 @@ _capture_done = threading.Event()
 # 边框宽度
 BORDER = 3
 
+# 最近一次拾取会话的命中测试调度统计（查询次数、耗时、CPU）
+_last_hit_test_stats: dict[str, Any] = {}
+
+
+def _set_last_hit_test_stats(stats: dict[str, Any]) -> None:
+    global _last_hit_test_stats
+    _last_hit_test_stats = stats
+    logger.info("control picker hit-test stats: %s", stats)
+
+
+def get_last_hit_test_stats() -> dict[str, Any]:
+    return dict(_last_hit_test_stats)
+
 # 面积阈值：超过此值认为是大块容器，尝试 RawViewWalker/MSAA 获取更细粒度
 _LARGE_AREA_THRESHOLD = 200000
 
@@ -82,70 +98,226 @@ def _get_smallest_element_at_point(elem, x: int, y: int, max_depth: int = 8) ->
     return elem
 
 
-def _get_control_and_rect_via_uia_raw(x: int, y: int) -> tuple[Optional[dict[str, Any]], Optional[tuple[int, int, int, int]]]:
+_uia_local = threading.local()
+_SNAPSHOT_MAX_DEPTH = 12
+_SNAPSHOT_MAX_NODES = 5000
+# 无法订阅 UIA 焦点/结构变化事件时，快照的兜底有效期（秒）
+_SNAPSHOT_FALLBACK_MAX_AGE = 2.0
+# UIA TreeScope_Subtree
+_TREE_SCOPE_SUBTREE = 7
+
+
+def _com_init_mta() -> None:
+    """快照线程以 MTA 初始化 COM（UIA 客户端对象可跨线程使用，事件回调也在 MTA 中派发）。"""
+    import ctypes
+    ctypes.windll.ole32.CoInitializeEx(None, 0x0)  # COINIT_MULTITHREADED
+
+
+class _UiaWatch:
     """
-    使用 UIA RawViewWalker 直接遍历完整树，获取包含 (x,y) 的最内层控件。
-    RawView 比 ControlView 包含更多元素，对千牛等 Electron 应用可能暴露更细粒度控件。
+    在快照线程内订阅焦点变化与当前窗口子树的结构变化，收到事件即让快照失效。
+    订阅失败时退回按时间失效（_SNAPSHOT_FALLBACK_MAX_AGE）。
     """
-    try:
-        import comtypes.client
-        from ctypes.wintypes import tagPOINT
 
-        comtypes.client.GetModule("UIAutomationCore.dll")
-        from comtypes.gen.UIAutomationClient import IUIAutomation
+    def __init__(self) -> None:
+        self._handler: Any = None
+        self._root: Any = None
+        self._focus = False
 
-        uia = comtypes.client.CreateObject(
-            "{ff48dba4-60ef-4201-aa87-54103eef594e}",
-            interface=IUIAutomation,
+    def _make_handler(self) -> Any:
+        import comtypes
+        from comtypes.gen.UIAutomationClient import (
+            IUIAutomationFocusChangedEventHandler,
+            IUIAutomationStructureChangedEventHandler,
         )
-        pt = tagPOINT(x, y)
-        elem = uia.ElementFromPoint(pt)
-        if elem is None:
-            return None, None
 
-        walker = uia.RawViewWalker
-        if walker is None:
-            return None, None
+        class _Handler(comtypes.COMObject):
+            _com_interfaces_ = [IUIAutomationFocusChangedEventHandler, IUIAutomationStructureChangedEventHandler]
 
-        def _rect_from_element(el) -> Optional[tuple[int, int, int, int]]:
-            try:
-                r = el.CurrentBoundingRectangle
-                return (r.left, r.top, r.right, r.bottom)
-            except Exception:
-                return None
+            def HandleFocusChangedEvent(self, sender):
+                _snapshots.invalidate()
 
-        def _smallest_at_point(parent, px: int, py: int, depth: int = 12) -> Any:
-            if depth <= 0:
-                return parent
+            def HandleStructureChangedEvent(self, sender, change_type, runtime_id):
+                _snapshots.invalidate()
+
+        return _Handler()
+
+    def watch(self, uia: Any, root: Any) -> None:
+        try:
+            if self._handler is None:
+                self._handler = self._make_handler()
+            if not self._focus:
+                uia.AddFocusChangedEventHandler(None, self._handler)
+                self._focus = True
+            if self._root is not None:
+                try:
+                    uia.RemoveStructureChangedEventHandler(self._root, self._handler)
+                except Exception:
+                    pass
+                self._root = None
+            uia.AddStructureChangedEventHandler(root, _TREE_SCOPE_SUBTREE, None, self._handler)
+            self._root = root
+            _snapshots.max_age = None
+        except Exception as e:
+            logger.debug("subscribe UIA events failed, snapshot expires by age: %s", e)
+            _snapshots.max_age = _SNAPSHOT_FALLBACK_MAX_AGE
+
+    def stop(self) -> None:
+        uia = getattr(_uia_local, "uia", None)
+        if uia is not None and (self._focus or self._root is not None):
             try:
-                child = walker.GetFirstChildElement(parent)
-                best = None
-                best_area = 999999999
-                while child is not None:
-                    try:
-                        rc = _rect_from_element(child)
-                        if rc:
-                            cl, ct, cr, cb = rc
-                            if cl <= px <= cr and ct <= py <= cb:
-                                area = (cr - cl) * (cb - ct)
-                                if 0 < area < best_area:
-                                    best_area = area
-                                    best = child
-                    except Exception:
-                        pass
-                    try:
-                        next_child = walker.GetNextSiblingElement(child)
-                        child = next_child
-                    except Exception:
-                        break
-                if best is not None:
-                    return _smallest_at_point(best, px, py, depth - 1)
-            except Exception:
-                pass
-            return parent
+                uia[0].RemoveAllEventHandlers()
+            except Exception as e:
+                logger.debug("remove UIA event handlers: %s", e)
+        self._handler = None
+        self._root = None
+        self._focus = False
+
+
+_watch = _UiaWatch()
+# 鼠标所在顶层窗口的元素树快照索引：后台线程构建，窗口句柄/矩形变化、焦点或结构变化后重建
+_snapshots = SnapshotCache(on_worker_start=_com_init_mta, on_worker_stop=_watch.stop)
+
+
+def _top_window_at(x: int, y: int) -> Optional[tuple[int, tuple[int, int, int, int]]]:
+    """(顶层窗口句柄, 窗口矩形)，用作快照键；失败返回 None。"""
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        user32.WindowFromPoint.argtypes = [wintypes.POINT]
+        user32.WindowFromPoint.restype = ctypes.c_void_p
+        user32.GetAncestor.argtypes = [ctypes.c_void_p, ctypes.c_uint]
+        user32.GetAncestor.restype = ctypes.c_void_p
+        hwnd = user32.WindowFromPoint(wintypes.POINT(x, y))
+        if not hwnd:
+            return None
+        root = user32.GetAncestor(hwnd, 2) or hwnd  # GA_ROOT
+        r = wintypes.RECT()
+        if not user32.GetWindowRect(ctypes.c_void_p(root), ctypes.byref(r)):
+            return None
+        return root, (r.left, r.top, r.right, r.bottom)
+    except Exception:
+        return None
+
+
+def _raw_rect(el) -> Optional[tuple[int, int, int, int]]:
+    try:
+        r = el.CurrentBoundingRectangle
+        return (r.left, r.top, r.right, r.bottom)
+    except Exception:
+        return None
+
+
+def _raw_visible(el) -> bool:
+    """屏幕外（IsOffscreen，如滚动区外、折叠的面板）的元素不参与命中。"""
+    try:
+        return not el.CurrentIsOffscreen
+    except Exception:
+        return True
+
+
+def _window_info(hwnd: int) -> dict[str, Optional[str]]:
+    """顶层窗口的标题与类名（Win32，可在任意线程调用）。"""
+    try:
+        import ctypes
+
+        user32 = ctypes.windll.user32
+        buf = ctypes.create_unicode_buffer(512)
+        user32.GetWindowTextW(ctypes.c_void_p(hwnd), buf, 512)
+        title = buf.value or None
+        user32.GetClassNameW(ctypes.c_void_p(hwnd), buf, 512)
+        return {"window_title": title, "window_class": buf.value or None}
+    except Exception:
+        return {"window_title": None, "window_class": None}
+
+
+def _raw_children(walker) -> Callable[[Any], list[Any]]:
+    def children(el) -> list[Any]:
+        out = []
+        try:
+            child = walker.GetFirstChildElement(el)
+            while child is not None:
+                out.append(child)
+                child = walker.GetNextSiblingElement(child)
+        except Exception:
+            pass
+        return out
+    return children
+
+
+def _top_window_info(x: int, y: int) -> dict[str, Optional[str]]:
+    window_title: Optional[str] = None
+    window_class: Optional[str] = None
+    try:
+        from pywinauto import Desktop
+        desktop = Desktop(backend="uia")
+        top = desktop.top_from_point(x, y)
+        if top is not None:
+            tw = top.wrapper_object()
+            window_title = tw.window_text() or None
+            window_class = tw.class_name() or None
+    except Exception:
+        pass
+    return {"window_title": window_title, "window_class": window_class}
+
 
-        elem = _smallest_at_point(elem, x, y)
-        rect = _rect_from_element(elem)
+def _get_control_and_rect_via_uia_raw(x: int, y: int) -> tuple[Optional[dict[str, Any]], Optional[tuple[int, int, int, int]]]:
+    """
+    使用 UIA RawViewWalker 获取包含 (x,y) 的最内层控件。
+    RawView 比 ControlView 包含更多元素，对千牛等 Electron 应用可能暴露更细粒度控件。
+    鼠标所在顶层窗口的元素树快照在后台线程构建，就绪后从空间索引查询；快照未就绪、已失效或命中节点的
+    子树被截断时，从 ElementFromPoint / 命中节点实时逐层下降。
+    """
+    try:
+        uia, walker = _get_uia()
+        if walker is None:
+            return None, None
+        children = _raw_children(walker)
+
+        elem = None
+        meta: dict[str, Any] = {}
+        top = _top_window_at(x, y)
+        if top is not None:
+            hwnd, _ = top
+
+            def build() -> tuple[list, dict[str, Any]]:
+                # 在快照线程内执行：COM 对象按线程创建
+                b_uia, b_walker = _get_uia()
+                root = b_uia.ElementFromHandle(hwnd)
+                _watch.watch(b_uia, root)
+                nodes = snapshot_tree(
+                    root, _raw_rect, _raw_children(b_walker),
+                    max_depth=_SNAPSHOT_MAX_DEPTH, max_nodes=_SNAPSHOT_MAX_NODES,
+                    is_visible=_raw_visible,
+                )
+                return nodes, _window_info(hwnd)
+
+            cached = _snapshots.get(top, build)
+            if cached is not None:
+                index, meta = cached
+                node = index.deepest_at(x, y)
+                if node is not None:
+                    elem = node.payload
+                    if node.truncated:
+                        elem = smallest_by_descent(
+                            elem, x, y, _raw_rect, children,
+                            max_depth=_SNAPSHOT_MAX_DEPTH, is_visible=_raw_visible,
+                        )
+        if elem is None:
+            # 快照未就绪或无命中时，实时逐层下降（约几十次 UIA 调用）
+            from ctypes.wintypes import tagPOINT
+            start = uia.ElementFromPoint(tagPOINT(x, y))
+            if start is None:
+                return None, None
+            elem = smallest_by_descent(
+                start, x, y, _raw_rect, children,
+                max_depth=_SNAPSHOT_MAX_DEPTH, is_visible=_raw_visible,
+            )
+            meta = _window_info(top[0]) if top is not None else _top_window_info(x, y)
+
+        rect = _raw_rect(elem)
         if rect is None:
             return None, None
 
@@ -172,22 +344,9 @@ def _get_control_and_rect_via_uia_raw(x: int, y: int) -> tuple[Optional[dict[str
         except Exception:
             pass
 
-        window_title: Optional[str] = None
-        window_class: Optional[str] = None
-        try:
-            from pywinauto import Desktop
-            desktop = Desktop(backend="uia")
-            top = desktop.top_from_point(x, y)
-            if top is not None:
-                tw = top.wrapper_object()
-                window_title = tw.window_text() or None
-                window_class = tw.class_name() or None
-        except Exception:
-            pass
-
         control = {
-            "window_title": window_title,
-            "window_class": window_class,
+            "window_title": meta.get("window_title"),
+            "window_class": meta.get("window_class"),
             "control_id": None,
             "automation_id": automation_id,
             "control_type": control_type,
@@ -370,32 +529,46 @@ def _overlay_thread(
     current_rect: Optional[tuple[int, int, int, int]] = None
     hwnd_overlay = None
 
-    def get_control_at_cursor() -> tuple[Optional[dict[str, Any]], Optional[tuple[int, int, int, int]]]:
-        x, y = get_cursor()
-        return _get_control_and_rect_at(x, y)
+    # 光标不动时复用上次结果，移动超过阈值或超过刷新间隔才重新查询控件
+    scheduler: HitTestScheduler = HitTestScheduler(
+        get_cursor, lambda x, y: _get_control_and_rect_at(x, y)[1],
+        move_threshold=3, min_interval=0.05, refresh_interval=0.5,
+    )
 
     # 无控件时显示在光标处的小红框（空心框，与控件框一致）
     FALLBACK_SIZE = 60
     FALLBACK_BORDER = 3
 
+    # 框窗口当前位置与尺寸；尺寸不变时只移动窗口，不重建 GDI 区域
+    frame_pos: list[Optional[tuple[int, int]]] = [None]
+    frame_size: list[Optional[tuple[int, int]]] = [None]
+
+    def place_frame(hwnd: int, x: int, y: int, ww: int, hh: int, border: int) -> None:
+        if frame_pos[0] == (x, y) and frame_size[0] == (ww, hh):
+            return
+        user32.MoveWindow(hwnd, x, y, ww, hh, 1)
+        frame_pos[0] = (x, y)
+        if frame_size[0] == (ww, hh):
+            return
+        rgn_outer = gdi32.CreateRectRgn(0, 0, ww, hh)
+        rgn_inner = gdi32.CreateRectRgn(border, border, ww - border, hh - border)
+        rgn_frame = gdi32.CreateRectRgn(0, 0, 0, 0)
+        gdi32.CombineRgn(rgn_frame, rgn_outer, rgn_inner, RGN_DIFF)
+        # SetWindowRgn 成功后区域归系统所有，无需 DeleteObject(rgn_frame)
+        user32.SetWindowRgn(hwnd, rgn_frame, 1)
+        gdi32.DeleteObject(rgn_outer)
+        gdi32.DeleteObject(rgn_inner)
+        frame_size[0] = (ww, hh)
+        user32.InvalidateRect(hwnd, None, 1)
+
     def update_frame_window(hwnd: int, rect: Optional[tuple[int, int, int, int]]) -> None:
         if rect is None:
             try:
-                cx, cy = get_cursor()
-                x = cx - FALLBACK_SIZE // 2
-                y = cy - FALLBACK_SIZE // 2
-                user32.MoveWindow(hwnd, x, y, FALLBACK_SIZE, FALLBACK_SIZE, 1)
-                rgn_outer = gdi32.CreateRectRgn(0, 0, FALLBACK_SIZE, FALLBACK_SIZE)
-                rgn_inner = gdi32.CreateRectRgn(
-                    FALLBACK_BORDER, FALLBACK_BORDER,
-                    FALLBACK_SIZE - FALLBACK_BORDER, FALLBACK_SIZE - FALLBACK_BORDER,
+                cx, cy = scheduler.cursor or get_cursor()
+                place_frame(
+                    hwnd, cx - FALLBACK_SIZE // 2, cy - FALLBACK_SIZE // 2,
+                    FALLBACK_SIZE, FALLBACK_SIZE, FALLBACK_BORDER,
                 )
-                rgn_frame = gdi32.CreateRectRgn(0, 0, 0, 0)
-                gdi32.CombineRgn(rgn_frame, rgn_outer, rgn_inner, RGN_DIFF)
-                user32.SetWindowRgn(hwnd, rgn_frame, 1)
-                gdi32.DeleteObject(rgn_outer)
-                gdi32.DeleteObject(rgn_inner)
-                user32.InvalidateRect(hwnd, None, 1)
             except Exception:
                 pass
             return
@@ -403,17 +576,7 @@ def _overlay_thread(
         w, h = right - left, bottom - top
         if w <= 0 or h <= 0:
             return
-        x, y = left - BORDER, top - BORDER
-        ww, hh = w + BORDER * 2, h + BORDER * 2
-        user32.MoveWindow(hwnd, x, y, ww, hh, 1)
-        rgn_outer = gdi32.CreateRectRgn(0, 0, ww, hh)
-        rgn_inner = gdi32.CreateRectRgn(BORDER, BORDER, ww - BORDER, hh - BORDER)
-        rgn_frame = gdi32.CreateRectRgn(0, 0, 0, 0)
-        gdi32.CombineRgn(rgn_frame, rgn_outer, rgn_inner, RGN_DIFF)
-        user32.SetWindowRgn(hwnd, rgn_frame, 1)
-        gdi32.DeleteObject(rgn_outer)
-        gdi32.DeleteObject(rgn_inner)
-        user32.InvalidateRect(hwnd, None, 1)
+        place_frame(hwnd, left - BORDER, top - BORDER, w + BORDER * 2, h + BORDER * 2, BORDER)
 
     class RECT(ctypes.Structure):
         _fields_ = [("left", ctypes.c_long), ("top", ctypes.c_long), ("right", ctypes.c_long), ("bottom", ctypes.c_long)]
@@ -444,7 +607,7 @@ def _overlay_thread(
             return 0
         if msg == WM_TIMER:
             try:
-                _, rect = get_control_at_cursor()
+                rect, _ = scheduler.poll()
                 if rect != current_rect:
                     current_rect = rect
                     update_frame_window(hwnd, rect)
@@ -533,7 +696,7 @@ def _overlay_thread(
         # 用 PeekMessage 循环 + 手动更新红框，不依赖 WM_TIMER（避免消息未派发导致红框不更新、热键无反应）
         import time
         try:
-            _, rect = get_control_at_cursor()
+            rect = scheduler.force()
             update_frame_window(hwnd_overlay, rect)
         except Exception:
             update_frame_window(hwnd_overlay, None)
@@ -546,9 +709,9 @@ def _overlay_thread(
                 user32.DispatchMessageW(ctypes.byref(msg))
             else:
                 try:
-                    _, rect = get_control_at_cursor()
+                    rect, _ = scheduler.poll()
                     if rect is None:
-                        # 无控件时红框跟随光标，必须每次更新
+                        # 无控件时红框跟随光标（位置不变时 update_frame_window 不做任何绘制）
                         current_rect = None
                         update_frame_window(hwnd_overlay, None)
                     elif rect != current_rect:
@@ -560,9 +723,13 @@ def _overlay_thread(
                 time.sleep(0.05)
         user32.UnregisterHotKey(hwnd_overlay, HOTKEY_ID)
         user32.DestroyWindow(hwnd_overlay)
+        _set_last_hit_test_stats({**scheduler.stats(), "snapshot": _snapshots.stats()})
     except Exception as e:
         logger.exception("overlay_thread: %s", e)
         on_done(None)
+    finally:
+        # 停止快照线程并注销 UIA 事件
+        _snapshots.close()
 
 
 def run_pick_control_session(timeout: float = 120.0) -> Optional[dict[str, Any]]:
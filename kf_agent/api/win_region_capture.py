@@ -8,6 +8,8 @@ import threading
 from pathlib import Path
 from typing import Callable, Optional
 
+from kf_agent.api.hit_scheduler import HitTestScheduler
+
 logger = logging.getLogger(__name__)
 
 _region_result: Optional[tuple[int, int, int, int]] = None  # (left, top, right, bottom)
@@ -33,6 +35,9 @@ def _overlay_thread(
     WM_LBUTTONDOWN = 0x0201
     WM_LBUTTONUP = 0x0202
     WM_MOUSEMOVE = 0x0200
+    WM_TIMER = 0x0113
+    ID_TIMER = 1
+    TIMER_MS = 50
     WM_PAINT = 0x000F
     WM_CLOSE = 0x0010
     WM_DESTROY = 0x0002
@@ -89,6 +94,8 @@ def _overlay_thread(
     end_x, end_y = 0, 0
     hwnd_frame = [None]  # 独立选区框窗口（非分层），保证虚框可见
 
+    frame_size: list[Optional[tuple[int, int]]] = [None]  # 框窗口当前尺寸；不变时不重建 GDI 区域
+
     def update_frame_window(rect: tuple[int, int, int, int]) -> None:
         left, top, right, bottom = rect
         if right <= left or bottom <= top:
@@ -100,6 +107,7 @@ def _overlay_thread(
         ww = (right - left) + 2 * BORDER
         hh = (bottom - top) + 2 * BORDER
         if hwnd_frame[0] is None:
+            frame_size[0] = None
             hwnd_frame[0] = user32.CreateWindowExW(
                 WS_EX_TOPMOST | WS_EX_TRANSPARENT, frame_class_name, None, WS_POPUP,
                 -1000, -1000, 1, 1, 0, 0, kernel32.GetModuleHandleW(None), None,
@@ -109,6 +117,8 @@ def _overlay_thread(
         if not hwnd_frame[0]:
             return
         user32.MoveWindow(hwnd_frame[0], x, y, ww, hh, 1)
+        if frame_size[0] == (ww, hh):
+            return
         rgn_outer = gdi32.CreateRectRgn(0, 0, ww, hh)
         rgn_inner = gdi32.CreateRectRgn(BORDER, BORDER, ww - BORDER, hh - BORDER)
         rgn_frame = gdi32.CreateRectRgn(0, 0, 0, 0)
@@ -116,6 +126,7 @@ def _overlay_thread(
         user32.SetWindowRgn(hwnd_frame[0], rgn_frame, 1)
         gdi32.DeleteObject(rgn_outer)
         gdi32.DeleteObject(rgn_inner)
+        frame_size[0] = (ww, hh)
 
     def get_rect() -> tuple[int, int, int, int]:
         left = min(start_x, end_x)
@@ -126,6 +137,12 @@ def _overlay_thread(
             return (0, 0, 0, 0)
         return (left, top, right, bottom)
 
+    # 鼠标移动消息可能远高于刷新率：按最小间隔合并，拖动停下后由 WM_TIMER 补上最后一次更新
+    scheduler: HitTestScheduler = HitTestScheduler(
+        lambda: (end_x, end_y), lambda x, y: get_rect(),
+        move_threshold=0, min_interval=1 / 60, refresh_interval=None,
+    )
+
     WNDPROC = ctypes.CFUNCTYPE(ctypes.c_void_p, ctypes.c_void_p, ctypes.c_ulong, ctypes.c_void_p, ctypes.c_void_p)
 
     def wnd_proc(hwnd: int, msg: int, wparam: int, lparam: int) -> int:
@@ -136,15 +153,23 @@ def _overlay_thread(
                 start_x = lparam & 0xFFFF
                 start_y = (lparam >> 16) & 0xFFFF
                 end_x, end_y = start_x, start_y
-                update_frame_window(get_rect())
+                update_frame_window(scheduler.force())
                 user32.InvalidateRect(hwnd, None, 1)
             return 0
         if msg == WM_MOUSEMOVE:
             if selecting:
+                # 遮罩本身的绘制与选区无关，只更新独立的框窗口
                 end_x = lparam & 0xFFFF
                 end_y = (lparam >> 16) & 0xFFFF
-                update_frame_window(get_rect())
-                user32.InvalidateRect(hwnd, None, 1)
+                rect, changed = scheduler.poll()
+                if changed:
+                    update_frame_window(rect)
+            return 0
+        if msg == WM_TIMER:
+            if selecting:
+                rect, changed = scheduler.poll()
+                if changed:
+                    update_frame_window(rect)
             return 0
         if msg == WM_LBUTTONUP:
             if selecting:
@@ -191,6 +216,7 @@ def _overlay_thread(
                 user32.EndPaint(hwnd, ctypes.byref(ps))
             return 0
         if msg == WM_CLOSE:
+            user32.KillTimer(hwnd, ID_TIMER)
             if hwnd_frame[0]:
                 user32.DestroyWindow(hwnd_frame[0])
                 hwnd_frame[0] = None
@@ -284,6 +310,7 @@ def _overlay_thread(
         if not user32.SetLayeredWindowAttributes(hwnd, 0, 180, LWA_ALPHA):
             logger.warning("SetLayeredWindowAttributes failed")
         user32.ShowWindow(hwnd, 5)
+        user32.SetTimer(hwnd, ID_TIMER, TIMER_MS, None)
 
         msg = MSG()
         while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0):
@@ -291,6 +318,7 @@ def _overlay_thread(
             user32.DispatchMessageW(ctypes.byref(msg))
 
         user32.DestroyWindow(hwnd)
+        logger.info("region capture hit-test stats: %s", scheduler.stats())
     except Exception as e:
         logger.exception("region capture overlay: %s", e)
         on_done(None)
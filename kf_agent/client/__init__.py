@@ -0,0 +1,20 @@
+"""kf-agent HTTP API 客户端：同步/异步客户端、多 agent 并发调用。"""
+from kf_agent.client._calls import RetryPolicy
+from kf_agent.client.async_client import AsyncKFAgentClient
+from kf_agent.client.errors import KFAgentError, KFAgentHTTPError, KFAgentTimeoutError
+from kf_agent.client.models import FlowResult, JobInfo, PlatformStatus
+from kf_agent.client.multi import MultiAgentClient
+from kf_agent.client.sync_client import KFAgentClient
+
+__all__ = [
+    "KFAgentClient",
+    "AsyncKFAgentClient",
+    "MultiAgentClient",
+    "RetryPolicy",
+    "KFAgentError",
+    "KFAgentHTTPError",
+    "KFAgentTimeoutError",
+    "FlowResult",
+    "JobInfo",
+    "PlatformStatus",
+]
@@ -0,0 +1,161 @@
+"""同步/异步客户端共用的请求描述、重试策略与响应解析。每个函数对应服务端一个路由。"""
+import random
+from typing import Any, Callable, Optional
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+from kf_agent.client.errors import KFAgentHTTPError
+from kf_agent.client.models import (
+    FlowResult,
+    JobInfo,
+    PlatformConfig,
+    PlatformList,
+    PlatformStatus,
+    ResourceLibrary,
+)
+
+# 这些状态码视为暂时性错误，可以重试
+RETRY_STATUS = frozenset({502, 503, 504})
+
+
+class RetryPolicy(BaseModel):
+    """有界重试：网络错误与 502/503/504 时按指数退避（带抖动）重试，最多 max_attempts 次。"""
+    max_attempts: int = 3
+    backoff_seconds: float = 0.5
+    max_backoff_seconds: float = 5.0
+
+    def delay(self, attempt: int) -> float:
+        base = min(self.max_backoff_seconds, self.backoff_seconds * (2 ** (attempt - 1)))
+        return base * (0.5 + random.random() / 2)
+
+
+class Call:
+    """
+    一次逻辑调用。needs_key 为 True 的写操作在首次构造时生成 Idempotency-Key，
+    重试时复用同一个 key，服务端据此去重，重试不会重复操作桌面。
+    """
+
+    def __init__(
+        self,
+        method: str,
+        path: str,
+        *,
+        json: Any = None,
+        params: Optional[dict[str, Any]] = None,
+        parse: Optional[Callable[[Any], Any]] = None,
+        needs_key: bool = False,
+        idempotency_key: Optional[str] = None,
+    ):
+        self.method = method
+        self.path = path
+        self.json = json
+        self.params = params
+        self.parse = parse
+        self.headers: dict[str, str] = {}
+        if needs_key:
+            self.headers["Idempotency-Key"] = idempotency_key or uuid4().hex
+
+    def url(self, base_url: str) -> str:
+        return base_url.rstrip("/") + self.path
+
+
+def handle_response(call: Call, status_code: int, body: Any, url: str) -> Any:
+    """4xx/5xx 抛 KFAgentHTTPError，否则按 call.parse 转为类型化结果。"""
+    if status_code >= 400:
+        detail = body.get("detail") if isinstance(body, dict) else body
+        raise KFAgentHTTPError(status_code, detail, url)
+    return call.parse(body) if call.parse is not None else body
+
+
+def _model(cls: type[BaseModel]) -> Callable[[Any], Any]:
+    return cls.model_validate
+
+
+# ---------- customer_service ----------
+
+
+def open_platform(platform: str, idempotency_key: Optional[str] = None, resume: bool = False) -> Call:
+    return Call(
+        "POST", "/customer_service/open",
+        json={"platform": platform, "resume": resume}, parse=_model(FlowResult),
+        needs_key=True, idempotency_key=idempotency_key,
+    )
+
+
+def close_platform(platform: str, idempotency_key: Optional[str] = None, resume: bool = False) -> Call:
+    return Call(
+        "POST", "/customer_service/close",
+        json={"platform": platform, "resume": resume}, parse=_model(FlowResult),
+        needs_key=True, idempotency_key=idempotency_key,
+    )
+
+
+def run_flow(platform: str, steps: list[dict[str, Any]], idempotency_key: Optional[str] = None) -> Call:
+    return Call(
+        "POST", "/customer_service/run",
+        json={"platform": platform, "steps": steps}, parse=_model(FlowResult),
+        needs_key=True, idempotency_key=idempotency_key,
+    )
+
+
+def get_status(platform: str) -> Call:
+    return Call("GET", "/customer_service/status", params={"platform": platform}, parse=_model(PlatformStatus))
+
+
+def list_platforms() -> Call:
+    return Call("GET", "/customer_service/platforms", parse=lambda b: PlatformList.model_validate(b).platforms)
+
+
+def submit_job(
+    action: str,
+    platform: str,
+    steps: Optional[list[dict[str, Any]]] = None,
+    idempotency_key: Optional[str] = None,
+    resume: bool = False,
+) -> Call:
+    payload: dict[str, Any] = {"action": action, "platform": platform}
+    if steps is not None:
+        payload["steps"] = steps
+    if resume:
+        payload["resume"] = True
+    return Call(
+        "POST", "/customer_service/jobs",
+        json=payload, parse=_model(JobInfo),
+        needs_key=True, idempotency_key=idempotency_key,
+    )
+
+
+def get_job(job_id: str) -> Call:
+    return Call("GET", f"/customer_service/jobs/{job_id}", parse=_model(JobInfo))
+
+
+# ---------- config ----------
+
+
+def get_platform_config(platform_id: str) -> Call:
+    return Call("GET", f"/config/platforms/{platform_id}", parse=_model(PlatformConfig))
+
+
+def update_platform_config(
+    platform_id: str,
+    open_steps: list[dict[str, Any]],
+    close_steps: list[dict[str, Any]],
+    display_name: Optional[str] = None,
+) -> Call:
+    return Call(
+        "PUT", f"/config/platforms/{platform_id}",
+        json={"open": open_steps, "close": close_steps, "display_name": display_name},
+    )
+
+
+def delete_platform_config(platform_id: str) -> Call:
+    return Call("DELETE", f"/config/platforms/{platform_id}")
+
+
+def get_resources(platform_id: str) -> Call:
+    return Call("GET", f"/config/platforms/{platform_id}/resources", parse=_model(ResourceLibrary))
+
+
+def health() -> Call:
+    return Call("GET", "/health")
@@ -0,0 +1,171 @@
+"""异步客户端：基于 httpx.AsyncClient 连接池，接口与 KFAgentClient 一致。"""
+import asyncio
+import logging
+import time
+from typing import Any, Optional
+
+import httpx
+
+from kf_agent.client import _calls as calls
+from kf_agent.client._calls import RETRY_STATUS, Call, RetryPolicy, handle_response
+from kf_agent.client.errors import KFAgentError, KFAgentTimeoutError
+from kf_agent.client.models import FlowResult, JobInfo, PlatformConfig, PlatformStatus, ResourceLibrary
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncKFAgentClient:
+    """
+    kf-agent HTTP API 的异步客户端。可传入共享的 httpx.AsyncClient，让多个 agent 共用一个连接池
+    （MultiAgentClient 即如此）。
+
+        async with AsyncKFAgentClient("http://vm-01:8000") as c:
+            job = await c.run_job("open", "qianniu", timeout=300)
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout: float = 330.0,
+        retry: Optional[RetryPolicy] = None,
+        max_connections: int = 20,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.retry = retry or RetryPolicy()
+        self._owns_http = http_client is None
+        self._http = http_client or httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def aclose(self) -> None:
+        if self._owns_http:
+            await self._http.aclose()
+
+    async def __aenter__(self) -> "AsyncKFAgentClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    async def _send(self, call: Call) -> Any:
+        url = call.url(self.base_url)
+        for attempt in range(1, self.retry.max_attempts + 1):
+            last = attempt == self.retry.max_attempts
+            try:
+                resp = await self._http.request(
+                    call.method, url, json=call.json, params=call.params, headers=call.headers,
+                )
+            except httpx.TransportError as e:
+                if last:
+                    raise KFAgentError(f"{call.method} {url} failed: {e}") from e
+                logger.debug("retry %s %s after %s (attempt %s)", call.method, url, e, attempt)
+                await asyncio.sleep(self.retry.delay(attempt))
+                continue
+            if resp.status_code in RETRY_STATUS and not last:
+                await asyncio.sleep(self.retry.delay(attempt))
+                continue
+            try:
+                body = resp.json()
+            except ValueError:
+                body = resp.text
+            return handle_response(call, resp.status_code, body, url)
+        raise KFAgentError(f"{call.method} {url}: retries exhausted")
+
+    # ---------- customer_service ----------
+
+    async def open_platform(
+        self, platform: str, *, idempotency_key: Optional[str] = None, resume: bool = False,
+    ) -> FlowResult:
+        return await self._send(calls.open_platform(platform, idempotency_key, resume))
+
+    async def close_platform(
+        self, platform: str, *, idempotency_key: Optional[str] = None, resume: bool = False,
+    ) -> FlowResult:
+        return await self._send(calls.close_platform(platform, idempotency_key, resume))
+
+    async def run_flow(
+        self,
+        platform: str,
+        steps: list[dict[str, Any]],
+        *,
+        idempotency_key: Optional[str] = None,
+    ) -> FlowResult:
+        return await self._send(calls.run_flow(platform, steps, idempotency_key))
+
+    async def get_status(self, platform: str) -> PlatformStatus:
+        return await self._send(calls.get_status(platform))
+
+    async def list_platforms(self) -> list[str]:
+        return await self._send(calls.list_platforms())
+
+    async def submit_job(
+        self,
+        action: str,
+        platform: str,
+        steps: Optional[list[dict[str, Any]]] = None,
+        *,
+        idempotency_key: Optional[str] = None,
+        resume: bool = False,
+    ) -> JobInfo:
+        return await self._send(calls.submit_job(action, platform, steps, idempotency_key, resume))
+
+    async def get_job(self, job_id: str) -> JobInfo:
+        return await self._send(calls.get_job(job_id))
+
+    async def wait_for_job(
+        self,
+        job_id: str,
+        *,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.5,
+    ) -> JobInfo:
+        """轮询直到任务结束；超时抛 KFAgentTimeoutError。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = await self.get_job(job_id)
+            if job.done:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                raise KFAgentTimeoutError(f"job {job_id} not finished after {timeout}s (status={job.status})")
+            await asyncio.sleep(poll_interval)
+
+    async def run_job(
+        self,
+        action: str,
+        platform: str,
+        steps: Optional[list[dict[str, Any]]] = None,
+        *,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.5,
+        idempotency_key: Optional[str] = None,
+        resume: bool = False,
+    ) -> JobInfo:
+        """提交任务并等待完成。"""
+        job = await self.submit_job(action, platform, steps, idempotency_key=idempotency_key, resume=resume)
+        return await self.wait_for_job(job.job_id, timeout=timeout, poll_interval=poll_interval)
+
+    # ---------- config ----------
+
+    async def get_platform_config(self, platform_id: str) -> PlatformConfig:
+        return await self._send(calls.get_platform_config(platform_id))
+
+    async def update_platform_config(
+        self,
+        platform_id: str,
+        open_steps: list[dict[str, Any]],
+        close_steps: list[dict[str, Any]],
+        display_name: Optional[str] = None,
+    ) -> dict:
+        return await self._send(calls.update_platform_config(platform_id, open_steps, close_steps, display_name))
+
+    async def delete_platform_config(self, platform_id: str) -> dict:
+        return await self._send(calls.delete_platform_config(platform_id))
+
+    async def get_resources(self, platform_id: str) -> ResourceLibrary:
+        return await self._send(calls.get_resources(platform_id))
+
+    async def health(self) -> dict:
+        return await self._send(calls.health())
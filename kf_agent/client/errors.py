@@ -0,0 +1,22 @@
+"""客户端异常。"""
+from typing import Any, Optional
+
+
+class KFAgentError(Exception):
+    """客户端错误基类（网络失败、重试耗尽等）。"""
+    pass
+
+
+class KFAgentHTTPError(KFAgentError):
+    """服务端返回 4xx/5xx。detail 为服务端 JSON 中的 detail 字段（若有）。"""
+
+    def __init__(self, status_code: int, detail: Any = None, url: Optional[str] = None):
+        self.status_code = status_code
+        self.detail = detail
+        self.url = url
+        super().__init__(f"HTTP {status_code} {url or ''}: {detail}")
+
+
+class KFAgentTimeoutError(KFAgentError):
+    """等待任务完成超时。"""
+    pass
@@ -0,0 +1,50 @@
+"""客户端返回类型（与服务端路由返回结构一一对应）。"""
+from typing import Any, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+from kf_agent.core.models import PlatformConfig, ResourceLibrary
+
+__all__ = [
+    "FlowResult",
+    "PlatformStatus",
+    "JobInfo",
+    "PlatformConfig",
+    "ResourceLibrary",
+]
+
+
+class FlowResult(BaseModel):
+    """open/close/run 的同步结果。"""
+    success: bool
+    message: str = ""
+    resumed_from: Optional[int] = None  # resume=True 时实际开始执行的步骤下标
+    run_id: Optional[str] = None  # 执行历史中的记录 ID（GET /runs/{run_id}）
+
+
+class PlatformStatus(BaseModel):
+    configured: bool = False
+    running: bool = False
+    online: bool = False
+
+
+class JobInfo(BaseModel):
+    """异步任务快照，对应 GET /customer_service/jobs/{job_id}。"""
+    job_id: str
+    action: Literal["open", "close", "run"]
+    platform: str
+    status: Literal["pending", "running", "succeeded", "failed"]
+    result: Optional[dict[str, Any]] = None
+    idempotency_key: Optional[str] = None
+    resume: bool = False
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+
+class PlatformList(BaseModel):
+    platforms: list[str] = Field(default_factory=list)
@@ -0,0 +1,94 @@
+"""多 agent 并发调用：所有 agent 共用一个 httpx.AsyncClient 连接池，并发数有上限。"""
+import asyncio
+from typing import Any, Awaitable, Callable, Iterable, Optional, TypeVar, Union
+
+import httpx
+
+from kf_agent.client._calls import RetryPolicy
+from kf_agent.client.async_client import AsyncKFAgentClient
+from kf_agent.client.models import FlowResult, JobInfo
+
+T = TypeVar("T")
+
+
+class MultiAgentClient:
+    """
+    管理一组 agent 的异步客户端。agents 为 {agent_id: base_url} 或 base_url 列表（此时 id 即 url）。
+    gather() 返回 {agent_id: 结果或异常}，单个 agent 失败不影响其他 agent。
+
+        async with MultiAgentClient({"vm-01": "http://vm-01:8000", "vm-02": "http://vm-02:8000"}) as m:
+            results = await m.close_platform("qianniu")
+    """
+
+    def __init__(
+        self,
+        agents: Union[dict[str, str], Iterable[str]],
+        *,
+        concurrency: int = 32,
+        timeout: float = 330.0,
+        retry: Optional[RetryPolicy] = None,
+        max_connections: int = 200,
+    ):
+        mapping = dict(agents) if isinstance(agents, dict) else {u: u for u in agents}
+        self._sem = asyncio.Semaphore(concurrency)
+        self._http = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self.clients: dict[str, AsyncKFAgentClient] = {
+            agent_id: AsyncKFAgentClient(url, retry=retry, http_client=self._http)
+            for agent_id, url in mapping.items()
+        }
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+    async def __aenter__(self) -> "MultiAgentClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    async def gather(
+        self,
+        fn: Callable[[AsyncKFAgentClient], Awaitable[T]],
+        agent_ids: Optional[Iterable[str]] = None,
+    ) -> dict[str, Union[T, BaseException]]:
+        """对选定 agent（默认全部）并发执行 fn(client)。"""
+        ids = list(agent_ids) if agent_ids is not None else list(self.clients)
+
+        async def one(agent_id: str) -> Union[T, BaseException]:
+            async with self._sem:
+                try:
+                    return await fn(self.clients[agent_id])
+                except Exception as e:
+                    return e
+
+        results = await asyncio.gather(*(one(a) for a in ids))
+        return dict(zip(ids, results))
+
+    async def open_platform(
+        self, platform: str, agent_ids: Optional[Iterable[str]] = None,
+    ) -> dict[str, Union[FlowResult, BaseException]]:
+        return await self.gather(lambda c: c.open_platform(platform), agent_ids)
+
+    async def close_platform(
+        self, platform: str, agent_ids: Optional[Iterable[str]] = None,
+    ) -> dict[str, Union[FlowResult, BaseException]]:
+        return await self.gather(lambda c: c.close_platform(platform), agent_ids)
+
+    async def run_job(
+        self,
+        action: str,
+        platform: str,
+        steps: Optional[list[dict[str, Any]]] = None,
+        agent_ids: Optional[Iterable[str]] = None,
+        *,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.5,
+    ) -> dict[str, Union[JobInfo, BaseException]]:
+        """各 agent 提交任务并轮询到结束，适合长流程（不占用长连接）。"""
+        return await self.gather(
+            lambda c: c.run_job(action, platform, steps, timeout=timeout, poll_interval=poll_interval),
+            agent_ids,
+        )
@@ -0,0 +1,163 @@
+"""同步客户端：基于 httpx.Client 连接池，带有界重试与任务轮询。"""
+import logging
+import time
+from typing import Any, Optional
+
+import httpx
+
+from kf_agent.client import _calls as calls
+from kf_agent.client._calls import RETRY_STATUS, Call, RetryPolicy, handle_response
+from kf_agent.client.errors import KFAgentError, KFAgentTimeoutError
+from kf_agent.client.models import FlowResult, JobInfo, PlatformConfig, PlatformStatus, ResourceLibrary
+
+logger = logging.getLogger(__name__)
+
+
+class KFAgentClient:
+    """
+    kf-agent HTTP API 的同步客户端。一个实例复用一个连接池，建议长期持有或用 with 管理。
+
+        with KFAgentClient("http://vm-01:8000") as c:
+            c.open_platform("qianniu")
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout: float = 330.0,
+        retry: Optional[RetryPolicy] = None,
+        max_connections: int = 20,
+        http_client: Optional[httpx.Client] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.retry = retry or RetryPolicy()
+        self._owns_http = http_client is None
+        self._http = http_client or httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    def close(self) -> None:
+        if self._owns_http:
+            self._http.close()
+
+    def __enter__(self) -> "KFAgentClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _send(self, call: Call) -> Any:
+        url = call.url(self.base_url)
+        for attempt in range(1, self.retry.max_attempts + 1):
+            last = attempt == self.retry.max_attempts
+            try:
+                resp = self._http.request(
+                    call.method, url, json=call.json, params=call.params, headers=call.headers,
+                )
+            except httpx.TransportError as e:
+                if last:
+                    raise KFAgentError(f"{call.method} {url} failed: {e}") from e
+                logger.debug("retry %s %s after %s (attempt %s)", call.method, url, e, attempt)
+                time.sleep(self.retry.delay(attempt))
+                continue
+            if resp.status_code in RETRY_STATUS and not last:
+                time.sleep(self.retry.delay(attempt))
+                continue
+            try:
+                body = resp.json()
+            except ValueError:
+                body = resp.text
+            return handle_response(call, resp.status_code, body, url)
+        raise KFAgentError(f"{call.method} {url}: retries exhausted")
+
+    # ---------- customer_service ----------
+
+    def open_platform(
+        self, platform: str, *, idempotency_key: Optional[str] = None, resume: bool = False,
+    ) -> FlowResult:
+        return self._send(calls.open_platform(platform, idempotency_key, resume))
+
+    def close_platform(
+        self, platform: str, *, idempotency_key: Optional[str] = None, resume: bool = False,
+    ) -> FlowResult:
+        return self._send(calls.close_platform(platform, idempotency_key, resume))
+
+    def run_flow(
+        self,
+        platform: str,
+        steps: list[dict[str, Any]],
+        *,
+        idempotency_key: Optional[str] = None,
+    ) -> FlowResult:
+        return self._send(calls.run_flow(platform, steps, idempotency_key))
+
+    def get_status(self, platform: str) -> PlatformStatus:
+        return self._send(calls.get_status(platform))
+
+    def list_platforms(self) -> list[str]:
+        return self._send(calls.list_platforms())
+
+    def submit_job(
+        self,
+        action: str,
+        platform: str,
+        steps: Optional[list[dict[str, Any]]] = None,
+        *,
+        idempotency_key: Optional[str] = None,
+        resume: bool = False,
+    ) -> JobInfo:
+        return self._send(calls.submit_job(action, platform, steps, idempotency_key, resume))
+
+    def get_job(self, job_id: str) -> JobInfo:
+        return self._send(calls.get_job(job_id))
+
+    def wait_for_job(self, job_id: str, *, timeout: Optional[float] = None, poll_interval: float = 0.5) -> JobInfo:
+        """轮询直到任务结束；超时抛 KFAgentTimeoutError。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get_job(job_id)
+            if job.done:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                raise KFAgentTimeoutError(f"job {job_id} not finished after {timeout}s (status={job.status})")
+            time.sleep(poll_interval)
+
+    def run_job(
+        self,
+        action: str,
+        platform: str,
+        steps: Optional[list[dict[str, Any]]] = None,
+        *,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.5,
+        idempotency_key: Optional[str] = None,
+        resume: bool = False,
+    ) -> JobInfo:
+        """提交任务并等待完成。"""
+        job = self.submit_job(action, platform, steps, idempotency_key=idempotency_key, resume=resume)
+        return self.wait_for_job(job.job_id, timeout=timeout, poll_interval=poll_interval)
+
+    # ---------- config ----------
+
+    def get_platform_config(self, platform_id: str) -> PlatformConfig:
+        return self._send(calls.get_platform_config(platform_id))
+
+    def update_platform_config(
+        self,
+        platform_id: str,
+        open_steps: list[dict[str, Any]],
+        close_steps: list[dict[str, Any]],
+        display_name: Optional[str] = None,
+    ) -> dict:
+        return self._send(calls.update_platform_config(platform_id, open_steps, close_steps, display_name))
+
+    def delete_platform_config(self, platform_id: str) -> dict:
+        return self._send(calls.delete_platform_config(platform_id))
+
+    def get_resources(self, platform_id: str) -> ResourceLibrary:
+        return self._send(calls.get_resources(platform_id))
+
+    def health(self) -> dict:
+        return self._send(calls.health())
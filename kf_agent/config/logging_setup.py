@@ -0,0 +1,205 @@
+"""
+日志管道：业务线程只把日志记录放进内存队列（QueueHandler），由后台 QueueListener 线程格式化并写控制台与
+滚动日志文件，磁盘慢时也不会拖慢流程执行。队列满时丢弃并计数，而不是阻塞。
+
+- 每条记录带当前执行上下文（run_id、platform、step），JSON 格式输出时作为字段
+- 等待循环等高频轮询日志用 extra=POLL 标记，按 (logger, 消息模板) 限流，被丢弃的条数附在下一条上
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Iterator, Optional
+
+from kf_agent.config.settings import Settings, get_settings
+
+# 标记高频轮询日志：logger.debug("...", extra=POLL)
+POLL = {"poll": True}
+
+_TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+_run_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("kf_run_id", default=None)
+_platform: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("kf_platform", default=None)
+_step: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("kf_step", default=None)
+
+
+@contextmanager
+def log_context(run_id: Optional[str] = None, platform: Optional[str] = None) -> Iterator[None]:
+    """在 with 块内产生的日志带上 run_id / platform。"""
+    tokens = [_run_id.set(run_id), _platform.set(platform), _step.set(None)]
+    try:
+        yield
+    finally:
+        _step.reset(tokens[2])
+        _platform.reset(tokens[1])
+        _run_id.reset(tokens[0])
+
+
+def set_log_step(index: Optional[int]) -> None:
+    """当前执行到的步骤下标（从 0 开始），由引擎在每个顶层步骤前设置。"""
+    _step.set(index)
+
+
+class ContextFilter(logging.Filter):
+    """在产生日志的线程上读取执行上下文（QueueListener 线程上已读不到）。"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.run_id = _run_id.get()
+        record.platform = _platform.get()
+        record.step = _step.get()
+        return True
+
+
+class PollRateLimitFilter(logging.Filter):
+    """带 poll 标记的记录按 (logger, 模板) 每 window 秒最多放行 burst 条。"""
+
+    def __init__(self, burst: int = 5, window: float = 10.0):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._lock = threading.Lock()
+        # key -> [窗口开始时间, 窗口内已放行条数, 已丢弃条数]
+        self._buckets: dict[tuple[str, str], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "poll", False):
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or now - bucket[0] >= self.window:
+                suppressed = bucket[2] if bucket else 0
+                self._buckets[key] = [now, 1, 0]
+                if len(self._buckets) > 1000:
+                    self._buckets = {k: v for k, v in self._buckets.items() if now - v[0] < self.window}
+            elif bucket[1] < self.burst:
+                bucket[1] += 1
+                suppressed = 0
+            else:
+                bucket[2] += 1
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """每行一个 JSON 对象。"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key in ("run_id", "platform", "step", "suppressed"):
+            value = getattr(record, key, None)
+            if value is not None:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """文本格式，有执行上下文时在消息前加 [platform run_id step]。"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        ctx = [str(v) for v in (getattr(record, "platform", None), getattr(record, "run_id", None)) if v]
+        step = getattr(record, "step", None)
+        if step is not None:
+            ctx.append(f"step={step + 1}")
+        if ctx:
+            line = line.replace(f"{record.name}: ", f"{record.name}: [{' '.join(ctx)}] ", 1)
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            line += f" (+{suppressed} similar suppressed)"
+        return line
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃记录（计数），不阻塞调用线程。"""
+
+    def __init__(self, q: "queue.Queue"):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """在调用线程上展开消息参数；异常文本单独保留在 exc_text（JSON 输出为独立字段）。"""
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def _sink_handlers(settings: Settings) -> list[logging.Handler]:
+    console = logging.StreamHandler()
+    console.setFormatter(JsonFormatter() if settings.log_format == "json" else TextFormatter(_TEXT_FORMAT))
+    handlers: list[logging.Handler] = [console]
+    if settings.log_file:
+        settings.log_file.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            settings.log_file,
+            maxBytes=settings.log_file_max_bytes,
+            backupCount=settings.log_file_backup_count,
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+    return handlers
+
+
+def setup_logging(settings: Optional[Settings] = None) -> None:
+    """替换根 logger 的 handler 为队列管道（每个进程调用一次，重复调用无效果）。"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        settings = settings or get_settings()
+        q: "queue.Queue" = queue.Queue(maxsize=settings.log_queue_size)
+        handler = NonBlockingQueueHandler(q)
+        handler.addFilter(ContextFilter())
+        handler.addFilter(PollRateLimitFilter(settings.log_poll_burst, settings.log_poll_window_seconds))
+        root = logging.getLogger()
+        for h in list(root.handlers):
+            root.removeHandler(h)
+        root.addHandler(handler)
+        root.setLevel(getattr(logging, settings.log_level.upper(), logging.INFO))
+        _listener = logging.handlers.QueueListener(q, *_sink_handlers(settings), respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """停止后台线程并写完队列中剩余的日志。"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
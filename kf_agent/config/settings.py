@@ -1,6 +1,8 @@
 """全局配置：端口、日志、平台配置目录等。"""
 import os
+import socket
 from pathlib import Path
+from typing import Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -29,8 +31,91 @@ class Settings(BaseSettings):
     platforms_dir: Path = Field(default_factory=_default_platforms_dir)
     templates_dir_name: str = "templates"
 
-    # 日志
+    # 日志：经内存队列由后台线程输出；log_format 为控制台格式 text / json；
+    # 配置 log_file 时另写按大小滚动的 JSON 日志文件；轮询类日志每 window 秒最多 burst 条
     log_level: str = "INFO"
+    log_format: str = "text"
+    log_file: Optional[Path] = None
+    log_file_max_bytes: int = 10 * 1024 * 1024
+    log_file_backup_count: int = 5
+    log_queue_size: int = 10000
+    log_poll_burst: int = 5
+    log_poll_window_seconds: float = 10.0
+
+    # HTTP worker 数；大于 1 时桌面操作必须交给独立执行器进程
+    workers: int = 1
+
+    # 执行器：inline 为 API 进程内直接执行；process 为独立桌面执行进程（本地 IPC）
+    # executor_authkey 为空时 kf-agent 每次启动随机生成并经环境变量传给 worker 与执行器；
+    # 单独启动 kf-agent-executor 时必须显式配置
+    executor_mode: str = "inline"
+    executor_host: str = "127.0.0.1"
+    executor_port: int = 8765
+    executor_authkey: str = ""
+    executor_timeout_seconds: float = 300.0
+
+    # 诊断接口（/debug/*）：默认关闭；单次采样分析的最长秒数
+    debug_endpoints_enabled: bool = False
+    debug_profile_max_seconds: float = 60.0
+
+    # 内存：执行期间采样 RSS 峰值的间隔；启动时开启 tracemalloc（分配变慢，排查时再开）及记录的栈深度
+    memory_sample_interval_seconds: float = 0.2
+    memory_tracemalloc: bool = False
+    memory_tracemalloc_frames: int = 1
+
+    # 断点续跑（resume）前确认窗口仍在的等待秒数
+    resume_verify_timeout_seconds: float = 2.0
+
+    # 执行历史（SQLite，默认 platforms_dir/runs.db）：保留最近 max_runs 条、max_age_days 天内的记录
+    run_history_enabled: bool = True
+    run_history_path: Optional[Path] = None
+    run_history_max_runs: int = 10000
+    run_history_max_age_days: float = 30.0
+
+    # 失败现场（屏幕帧、模板、最高分位置，默认 platforms_dir/artifacts）：总大小超过 max_mb 时删除最旧的
+    artifacts_enabled: bool = True
+    artifacts_dir: Optional[Path] = None
+    artifacts_max_mb: float = 200.0
+    artifacts_jpeg_quality: int = 80
+
+    # 启动后在后台预热驱动依赖、模板与流程（/ready 报告进度）
+    prewarm_on_startup: bool = True
+
+    # UI 驱动：auto 按系统自动选择；fake 为不操作桌面的假驱动（本地多 agent 联调）
+    driver: str = "auto"
+    fake_driver_delay_seconds: float = 0.0
+
+    # 输入：pyautogui 每次调用后的默认停顿（PAUSE）；点击后到开始输入的等待；逐字键入间隔
+    # sequence 步骤与批量输入不受 input_pause_seconds 影响，按步骤自身的 delay_seconds 执行
+    input_pause_seconds: float = 0.1
+    input_settle_seconds: float = 0.2
+    input_type_interval_seconds: float = 0.05
+
+    # 图像匹配复用：按 frame_tile_size 像素分块比较相邻帧，整屏未变时复用上次结果，局部变化时只匹配变化区域
+    match_cache_enabled: bool = True
+    frame_tile_size: int = 64
+    # 截屏转换、匹配结果图等大数组的复用缓冲池：空闲缓冲总大小上限（MB）
+    buffer_pool_max_mb: float = 256.0
+
+    # 固定等待调优：off 不观测；observe 在 wait 期间后台探测下一步何时可定位并记录（{platform}.waits.json）；
+    # auto 另把 wait 缩短到 p99 × margin_factor + margin_seconds（到点仍未就绪则继续等到原秒数）
+    wait_tune_mode: str = "off"
+    wait_tune_margin_factor: float = 1.25
+    wait_tune_margin_seconds: float = 0.2
+    wait_tune_min_samples: int = 20
+
+    # 集群：配置 coordinator_url 后定期向调度器发送心跳
+    coordinator_url: Optional[str] = None
+    agent_id: str = Field(default_factory=socket.gethostname)
+    agent_url: Optional[str] = None  # 调度器访问本 agent 的地址，默认 http://{hostname}:{port}
+    agent_capacity: int = 4  # 本 agent 可同时承载的平台会话数
+    heartbeat_interval_seconds: float = 10.0
+
+    # 调度器（kf-agent-coordinator）
+    coordinator_host: str = "0.0.0.0"
+    coordinator_port: int = 8100
+    agent_ttl_seconds: float = 30.0  # 超过该时间无心跳视为不健康
+    agent_request_timeout_seconds: float = 330.0
 
 
 def get_settings() -> Settings:
@@ -0,0 +1 @@
+# Coordinator package：多 agent 注册、调度与代理
@@ -0,0 +1,213 @@
+"""
+调度器 FastAPI 应用与 run() 入口（kf-agent-coordinator）。
+agent 通过心跳注册；open 请求放到负载最低的 agent 上，status/close 按会话粘滞代理到原 agent。
+"""
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+import httpx
+import uvicorn
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from kf_agent.config import get_settings
+from kf_agent.config.logging_setup import setup_logging
+from kf_agent.coordinator.broadcast import BroadcastRequest, BroadcastTarget, broadcast
+from kf_agent.coordinator.registry import AgentHeartbeat, AgentInfo, AgentRegistry, PlacementError
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    app.state.registry = AgentRegistry(ttl_seconds=settings.agent_ttl_seconds)
+    # 所有到 agent 的代理请求共享一个连接池
+    app.state.http = httpx.AsyncClient(
+        timeout=settings.agent_request_timeout_seconds,
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+    )
+    yield
+    await app.state.http.aclose()
+
+
+app = FastAPI(
+    title="客服软件操控调度器",
+    description="管理多台 kf-agent：心跳注册、会话放置与代理。",
+    version="0.1.0",
+    lifespan=lifespan,
+)
+
+agents_router = APIRouter()
+sessions_router = APIRouter()
+
+
+class SessionOpenRequest(BaseModel):
+    platform: str = Field(..., description="平台 ID")
+    session: Optional[str] = Field(None, description="会话键（如店铺），默认等于平台 ID")
+    agent_id: Optional[str] = Field(None, description="指定 agent；为空时自动放置")
+
+
+class SessionCloseRequest(BaseModel):
+    platform: str = Field(..., description="平台 ID")
+    session: Optional[str] = Field(None, description="会话键，默认等于平台 ID")
+
+
+def _registry(request: Request) -> AgentRegistry:
+    return request.app.state.registry
+
+
+async def _proxy(
+    request: Request,
+    agent: AgentInfo,
+    method: str,
+    path: str,
+    **kwargs: Any,
+) -> tuple[int, Any]:
+    """转发到 agent，返回 (状态码, JSON)。网络错误转为 502。"""
+    client: httpx.AsyncClient = request.app.state.http
+    url = agent.url.rstrip("/") + path
+    try:
+        resp = await client.request(method, url, **kwargs)
+    except httpx.HTTPError as e:
+        logger.warning("proxy %s %s failed: %s", method, url, e)
+        raise HTTPException(status_code=502, detail=f"agent {agent.agent_id} unreachable: {e}")
+    try:
+        data = resp.json()
+    except ValueError:
+        data = {"detail": resp.text}
+    return resp.status_code, data
+
+
+@agents_router.post("/heartbeat")
+async def agent_heartbeat(body: AgentHeartbeat, request: Request):
+    info = _registry(request).heartbeat(body)
+    return {"agent_id": info.agent_id, "sessions": info.sessions}
+
+
+@agents_router.get("")
+async def list_agents(request: Request):
+    return {"agents": _registry(request).list_agents()}
+
+
+@agents_router.delete("/{agent_id}")
+async def remove_agent(agent_id: str, request: Request):
+    if not _registry(request).remove(agent_id):
+        raise HTTPException(status_code=404, detail="agent not found")
+    return {"agent_id": agent_id, "removed": True}
+
+
+def _restore_binding(registry: AgentRegistry, session: str, agent_id: str, previous: Optional[str]) -> None:
+    """open 失败后回到请求前的状态：本次新建的绑定解除，原有绑定保留或恢复。"""
+    if previous is None:
+        registry.unbind(session)
+    elif previous != agent_id:
+        registry.bind(session, previous)
+
+
+@sessions_router.post("/open")
+async def open_session(body: SessionOpenRequest, request: Request):
+    registry = _registry(request)
+    session = body.session or body.platform
+    if body.agent_id:
+        agent = registry.get(body.agent_id)
+        if agent is None or not registry.is_healthy(agent):
+            raise HTTPException(status_code=404, detail=f"agent not available: {body.agent_id}")
+    else:
+        try:
+            agent = registry.place(body.platform, session)
+        except PlacementError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+    # 先占位，避免并发 open 把同一会话放到不同 agent；失败时恢复请求前的绑定
+    previous = registry.bound_agent_id(session)
+    registry.bind(session, agent.agent_id)
+    try:
+        status, data = await _proxy(request, agent, "POST", "/customer_service/open", json={"platform": body.platform})
+    except HTTPException:
+        _restore_binding(registry, session, agent.agent_id, previous)
+        raise
+    if status >= 400:
+        _restore_binding(registry, session, agent.agent_id, previous)
+        raise HTTPException(status_code=status, detail=data.get("detail", data))
+    return {**data, "agent_id": agent.agent_id, "session": session}
+
+
+@sessions_router.post("/close")
+async def close_session(body: SessionCloseRequest, request: Request):
+    registry = _registry(request)
+    session = body.session or body.platform
+    agent = registry.agent_for_session(session)
+    if agent is None:
+        raise HTTPException(status_code=404, detail=f"no healthy agent holds session: {session}")
+    status, data = await _proxy(request, agent, "POST", "/customer_service/close", json={"platform": body.platform})
+    if status >= 400:
+        raise HTTPException(status_code=status, detail=data.get("detail", data))
+    registry.unbind(session)
+    return {**data, "agent_id": agent.agent_id, "session": session}
+
+
+@sessions_router.get("/status")
+async def session_status(platform: str, request: Request, session: Optional[str] = None):
+    registry = _registry(request)
+    key = session or platform
+    agent = registry.agent_for_session(key)
+    if agent is None:
+        return {"session": key, "agent_id": None, "configured": False, "running": False, "online": False}
+    status, data = await _proxy(request, agent, "GET", "/customer_service/status", params={"platform": platform})
+    if status >= 400:
+        raise HTTPException(status_code=status, detail=data.get("detail", data))
+    return {**data, "agent_id": agent.agent_id, "session": key}
+
+
+@sessions_router.get("/sessions")
+async def list_sessions(request: Request):
+    return {"sessions": _registry(request).list_sessions()}
+
+
+@agents_router.post("/broadcast")
+async def broadcast_to_agents(body: BroadcastRequest, request: Request):
+    """
+    并发下发到选定 agent（默认全部健康 agent），以 NDJSON 流按完成顺序返回每个 agent/平台的结果，
+    最后一行为汇总。广播是对多台 agent 的批量操作，不改动会话绑定（粘滞会话只由 /customer_service/open、close 维护）。
+    """
+    if body.action == "run" and not body.steps:
+        raise HTTPException(status_code=400, detail="steps required for action=run")
+    registry = _registry(request)
+    agents = [a for a in registry.list_agents() if a["healthy"]]
+    if body.agents is not None:
+        wanted = set(body.agents)
+        agents = [a for a in agents if a["agent_id"] in wanted]
+    targets = [
+        BroadcastTarget(agent_id=a["agent_id"], url=a["url"], platforms=a["platforms"])
+        for a in agents
+    ]
+
+    async def stream():
+        async for item in broadcast(request.app.state.http, targets, body):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+app.include_router(agents_router, prefix="/agents", tags=["agents"])
+app.include_router(sessions_router, prefix="/customer_service", tags=["customer_service"])
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+def run() -> None:
+    """命令行入口：启动调度器。"""
+    settings = get_settings()
+    uvicorn.run(
+        "kf_agent.coordinator.app:app",
+        host=settings.coordinator_host,
+        port=settings.coordinator_port,
+        reload=False,
+    )
@@ -0,0 +1,157 @@
+"""
+并发广播：把 open/close 或任意流程同时下发到一组 agent，按完成顺序流式返回每个 agent/平台的结果。
+同一 agent 上的多个平台顺序执行（agent 内桌面操作本就串行），不同 agent 之间并发，受 concurrency 限制。
+"""
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Literal, Optional
+
+import httpx
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+BroadcastAction = Literal["open", "close", "run"]
+
+
+class BroadcastTarget(BaseModel):
+    """广播目标 agent；platforms 为空时向 agent 查询其已配置平台。"""
+    agent_id: str
+    url: str
+    platforms: list[str] = Field(default_factory=list)
+
+
+class BroadcastRequest(BaseModel):
+    action: BroadcastAction = Field(..., description="open / close / run")
+    agents: Optional[list[str]] = Field(None, description="agent_id 列表，为空表示全部健康 agent")
+    platforms: Optional[list[str]] = Field(None, description="平台列表，为空表示各 agent 已配置的全部平台")
+    steps: Optional[list[dict[str, Any]]] = Field(None, description="action=run 时下发的步骤列表")
+    concurrency: int = Field(16, ge=1, description="同时处理的 agent 数上限")
+    timeout_seconds: float = Field(120.0, gt=0, description="单个 agent 的总超时")
+
+
+def _path_for(action: BroadcastAction) -> str:
+    return {
+        "open": "/customer_service/open",
+        "close": "/customer_service/close",
+        "run": "/customer_service/run",
+    }[action]
+
+
+async def _agent_platforms(client: httpx.AsyncClient, target: BroadcastTarget) -> list[str]:
+    resp = await client.get(target.url.rstrip("/") + "/customer_service/platforms")
+    resp.raise_for_status()
+    return list(resp.json().get("platforms") or [])
+
+
+async def _run_on_agent(
+    client: httpx.AsyncClient,
+    target: BroadcastTarget,
+    req: BroadcastRequest,
+    platforms: Optional[list[str]],
+    queue: "asyncio.Queue[dict[str, Any]]",
+) -> None:
+    """在单个 agent 上依次执行各平台，每完成一个就放入结果队列。"""
+    done: set[str] = set()
+    todo: list[str] = []
+    try:
+        todo = list(platforms or target.platforms or await _agent_platforms(client, target))
+        for platform in todo:
+            payload: dict[str, Any] = {"platform": platform}
+            if req.action == "run":
+                payload["steps"] = req.steps or []
+            started = time.monotonic()
+            try:
+                resp = await client.post(target.url.rstrip("/") + _path_for(req.action), json=payload)
+                try:
+                    data = resp.json()
+                except ValueError:
+                    data = {"detail": resp.text}
+                ok = resp.status_code < 400
+                message = data.get("message") if ok else data.get("detail")
+            except httpx.HTTPError as e:
+                ok, message = False, f"request failed: {e}"
+            done.add(platform)
+            await queue.put({
+                "agent_id": target.agent_id,
+                "platform": platform,
+                "success": ok,
+                "message": message,
+                "elapsed_seconds": round(time.monotonic() - started, 3),
+            })
+    except asyncio.CancelledError:
+        for platform in todo:
+            if platform not in done:
+                await queue.put({
+                    "agent_id": target.agent_id,
+                    "platform": platform,
+                    "success": False,
+                    "message": f"agent timeout after {req.timeout_seconds}s",
+                    "elapsed_seconds": None,
+                })
+        raise
+    except Exception as e:
+        logger.warning("broadcast to %s failed: %s", target.agent_id, e)
+        await queue.put({
+            "agent_id": target.agent_id,
+            "platform": None,
+            "success": False,
+            "message": str(e),
+            "elapsed_seconds": None,
+        })
+
+
+async def broadcast(
+    client: httpx.AsyncClient,
+    targets: list[BroadcastTarget],
+    req: BroadcastRequest,
+) -> AsyncIterator[dict[str, Any]]:
+    """
+    并发执行并按完成顺序 yield 每条结果，最后 yield 一条 {"summary": {...}}。
+    client 由调用方提供（共享连接池）；单个 agent 超时只影响该 agent。
+    """
+    queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+    sem = asyncio.Semaphore(req.concurrency)
+
+    async def guarded(target: BroadcastTarget) -> None:
+        async with sem:
+            try:
+                await asyncio.wait_for(
+                    _run_on_agent(client, target, req, req.platforms, queue),
+                    timeout=req.timeout_seconds,
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    tasks = [asyncio.create_task(guarded(t)) for t in targets]
+    started = time.monotonic()
+    total = succeeded = 0
+    pending = set(tasks)
+    try:
+        while pending or not queue.empty():
+            if queue.empty():
+                getter = asyncio.create_task(queue.get())
+                finished, _ = await asyncio.wait(pending | {getter}, return_when=asyncio.FIRST_COMPLETED)
+                pending -= finished
+                if not getter.done():
+                    getter.cancel()
+                    continue
+                item = getter.result()
+            else:
+                item = queue.get_nowait()
+            total += 1
+            succeeded += 1 if item["success"] else 0
+            yield item
+    finally:
+        for t in tasks:
+            t.cancel()
+    yield {
+        "summary": {
+            "agents": len(targets),
+            "results": total,
+            "succeeded": succeeded,
+            "failed": total - succeeded,
+            "elapsed_seconds": round(time.monotonic() - started, 3),
+        }
+    }
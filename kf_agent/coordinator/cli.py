@@ -0,0 +1,97 @@
+"""
+广播命令行（kf-agent-broadcast）：直接向 agent 并发下发 open/close/run，逐行输出 JSON 结果。
+目标 agent 可用 --agent 显式给出，或用 --coordinator 从调度器取健康 agent 列表。
+
+示例：
+    kf-agent-broadcast close --coordinator http://127.0.0.1:8100
+    kf-agent-broadcast open --agent a1=http://127.0.0.1:8001 --agent a2=http://127.0.0.1:8002 -p qianniu
+    kf-agent-broadcast run --coordinator http://127.0.0.1:8100 --steps-file flow.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from kf_agent.coordinator.broadcast import BroadcastRequest, BroadcastTarget, broadcast
+
+
+def _parse_agent(value: str) -> BroadcastTarget:
+    """解析 --agent：id=url 或仅 url（此时 id 取 url）。"""
+    if "=" in value:
+        agent_id, url = value.split("=", 1)
+    else:
+        agent_id, url = value, value
+    return BroadcastTarget(agent_id=agent_id, url=url)
+
+
+async def _targets_from_coordinator(
+    client: httpx.AsyncClient,
+    coordinator: str,
+    agent_ids: Optional[list[str]],
+) -> list[BroadcastTarget]:
+    resp = await client.get(coordinator.rstrip("/") + "/agents")
+    resp.raise_for_status()
+    agents = [a for a in resp.json().get("agents", []) if a.get("healthy")]
+    if agent_ids:
+        wanted = set(agent_ids)
+        agents = [a for a in agents if a["agent_id"] in wanted]
+    return [
+        BroadcastTarget(agent_id=a["agent_id"], url=a["url"], platforms=a.get("platforms") or [])
+        for a in agents
+    ]
+
+
+async def _main(args: argparse.Namespace) -> int:
+    steps = None
+    if args.action == "run":
+        if not args.steps_file:
+            print("--steps-file is required for run", file=sys.stderr)
+            return 2
+        steps = json.loads(Path(args.steps_file).read_text(encoding="utf-8"))
+    req = BroadcastRequest(
+        action=args.action,
+        platforms=args.platform or None,
+        steps=steps,
+        concurrency=args.concurrency,
+        timeout_seconds=args.timeout,
+    )
+    limits = httpx.Limits(max_connections=max(args.concurrency * 2, 10))
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        if args.coordinator:
+            agent_ids = [a for a in (args.agent or []) if "=" not in a and "://" not in a]
+            targets = await _targets_from_coordinator(client, args.coordinator, agent_ids or None)
+        else:
+            targets = [_parse_agent(a) for a in (args.agent or [])]
+        if not targets:
+            print("no target agents", file=sys.stderr)
+            return 2
+        failed = 0
+        async for item in broadcast(client, targets, req):
+            print(json.dumps(item, ensure_ascii=False), flush=True)
+            if "summary" in item:
+                failed = item["summary"]["failed"]
+    return 1 if failed else 0
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="kf-agent-broadcast", description="并发向多个 kf-agent 下发流程")
+    parser.add_argument("action", choices=["open", "close", "run"])
+    parser.add_argument("--coordinator", help="调度器地址，从中获取健康 agent 列表")
+    parser.add_argument(
+        "--agent", action="append",
+        help="目标 agent：id=url；配合 --coordinator 时为要筛选的 agent_id（可重复）",
+    )
+    parser.add_argument("-p", "--platform", action="append", help="平台 ID（可重复），默认 agent 上全部平台")
+    parser.add_argument("--steps-file", help="action=run 时的步骤 JSON 文件（数组）")
+    parser.add_argument("--concurrency", type=int, default=16, help="同时处理的 agent 数上限")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单个 agent 的总超时秒数")
+    args = parser.parse_args(argv)
+    sys.exit(asyncio.run(_main(args)))
+
+
+if __name__ == "__main__":
+    main()
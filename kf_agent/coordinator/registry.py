@@ -0,0 +1,139 @@
+"""Agent 注册表：心跳、健康判定、会话粘滞与最小负载放置。"""
+import threading
+import time
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class AgentHeartbeat(BaseModel):
+    """agent 上报的心跳内容。"""
+    agent_id: str
+    url: str
+    capacity: int = 4
+    platforms: list[str] = Field(default_factory=list)
+
+
+class AgentInfo(AgentHeartbeat):
+    """注册表中的 agent 状态。"""
+    last_seen: float = 0.0
+    sessions: list[str] = Field(default_factory=list)
+
+    @property
+    def load(self) -> float:
+        """已承载会话数 / 容量，容量无效时视为满载。"""
+        if self.capacity <= 0:
+            return 1.0
+        return len(self.sessions) / self.capacity
+
+
+class PlacementError(Exception):
+    """没有可承载该会话的健康 agent。"""
+    pass
+
+
+class AgentRegistry:
+    """
+    内存注册表。会话键（session）默认即平台 ID，可用店铺等更细的键区分；
+    同一会话始终路由到同一 agent，直到关闭或该 agent 失联。
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0):
+        self.ttl_seconds = ttl_seconds
+        self._agents: dict[str, AgentInfo] = {}
+        self._sessions: dict[str, str] = {}  # session -> agent_id
+        self._lock = threading.Lock()
+
+    def heartbeat(self, hb: AgentHeartbeat) -> AgentInfo:
+        with self._lock:
+            info = self._agents.get(hb.agent_id)
+            sessions = info.sessions if info is not None else []
+            info = AgentInfo(**hb.model_dump(), last_seen=time.monotonic(), sessions=sessions)
+            self._agents[hb.agent_id] = info
+            return info
+
+    def remove(self, agent_id: str) -> bool:
+        with self._lock:
+            info = self._agents.pop(agent_id, None)
+            if info is None:
+                return False
+            for session in info.sessions:
+                self._sessions.pop(session, None)
+            return True
+
+    def is_healthy(self, info: AgentInfo) -> bool:
+        return time.monotonic() - info.last_seen <= self.ttl_seconds
+
+    def get(self, agent_id: str) -> Optional[AgentInfo]:
+        with self._lock:
+            return self._agents.get(agent_id)
+
+    def list_agents(self) -> list[dict]:
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    **a.model_dump(exclude={"last_seen"}),
+                    "healthy": self.is_healthy(a),
+                    "load": a.load,
+                    "seconds_since_heartbeat": round(now - a.last_seen, 3),
+                }
+                for a in self._agents.values()
+            ]
+
+    def agent_for_session(self, session: str) -> Optional[AgentInfo]:
+        """返回会话当前绑定且健康的 agent。"""
+        with self._lock:
+            agent_id = self._sessions.get(session)
+            info = self._agents.get(agent_id) if agent_id else None
+            if info is None or not self.is_healthy(info):
+                return None
+            return info
+
+    def bound_agent_id(self, session: str) -> Optional[str]:
+        """会话当前绑定的 agent_id（不论是否健康）。"""
+        with self._lock:
+            return self._sessions.get(session)
+
+    def place(self, platform: str, session: str) -> AgentInfo:
+        """
+        为会话选择 agent：已有健康绑定时粘滞；否则在配置了该平台、未满载的健康 agent 中选负载最低者。
+        """
+        with self._lock:
+            agent_id = self._sessions.get(session)
+            info = self._agents.get(agent_id) if agent_id else None
+            if info is not None and self.is_healthy(info):
+                return info
+            candidates = [
+                a for a in self._agents.values()
+                if self.is_healthy(a)
+                and platform in a.platforms
+                and len(a.sessions) < a.capacity
+            ]
+            if not candidates:
+                raise PlacementError(f"no healthy agent with free capacity for platform: {platform}")
+            return min(candidates, key=lambda a: (a.load, len(a.sessions), a.agent_id))
+
+    def bind(self, session: str, agent_id: str) -> None:
+        with self._lock:
+            self._unbind_locked(session)
+            info = self._agents.get(agent_id)
+            if info is None:
+                return
+            self._sessions[session] = agent_id
+            if session not in info.sessions:
+                info.sessions.append(session)
+
+    def unbind(self, session: str) -> None:
+        with self._lock:
+            self._unbind_locked(session)
+
+    def _unbind_locked(self, session: str) -> None:
+        agent_id = self._sessions.pop(session, None)
+        info = self._agents.get(agent_id) if agent_id else None
+        if info is not None and session in info.sessions:
+            info.sessions.remove(session)
+
+    def list_sessions(self) -> dict[str, str]:
+        with self._lock:
+            return dict(self._sessions)
@@ -0,0 +1,346 @@
+"""
+流程静态耗时分析：不执行流程，按步骤估算最好/最坏耗时并列出最坏情况下耗时最多的步骤与高耗时写法提示。
+
+耗时由三部分组成：固定等待（wait、input 间隔等）、条件等待的超时上限（wait_window、wait_stable、
+if_present 的 timeout 等）、定位开销（图像按模板尺寸与搜索区域估算，控件按候选查询数估算，
+有定位记忆时取实测平均值）。估算系数为经验值，用于比较流程改动前后的差异，不是精确预测。
+
+命令行（kf-agent-analyze）：
+    kf-agent-analyze                     # 全部平台
+    kf-agent-analyze qianniu --screen 2560x1440
+    kf-agent-analyze --file flow.json    # 步骤数组或平台配置 JSON
+"""
+import argparse
+import json
+import struct
+import sys
+from pathlib import Path
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from kf_agent.config import get_settings
+from kf_agent.core.engine import PROBE_INTERVAL_SECONDS, resolve_image_path, uses_paste
+from kf_agent.core.models import ElementDesc, PlatformConfig, step_from_dict
+from kf_agent.drivers.control_locator import build_candidates, control_key
+
+DEFAULT_SCREEN = (1920, 1080)
+
+# 截屏一次的耗时（秒）
+CAPTURE_SECONDS = 0.04
+# OpenCV 模板匹配：每百万屏幕像素的基础耗时 + 模板每千像素追加的耗时（秒）
+MATCH_SECONDS_PER_MPX = 0.015
+MATCH_SECONDS_PER_MPX_PER_KPX = 0.001
+# OpenCV 未命中后退回 pyautogui.locateOnScreen，按 OpenCV 耗时的倍数估算
+PYAUTOGUI_FALLBACK_FACTOR = 3.0
+# 控件定位：命中一个候选查询的耗时；候选未命中时 pywinauto 默认等待 window_find_timeout
+CONTROL_HIT_SECONDS = 0.05
+CONTROL_MISS_SECONDS = 5.0
+CONTROL_CONNECT_SECONDS = 5.0
+# 启动进程、关闭窗口、剪贴板粘贴的固定开销
+LAUNCH_SECONDS = 0.2
+CLOSE_WINDOW_SECONDS = (0.05, 3.0)
+PASTE_SECONDS = 0.15
+# 超过该像素数的模板在全屏搜索时提示（约 200x200）
+LARGE_TEMPLATE_PX = 40_000
+
+
+def _png_size(path: Path) -> Optional[tuple[int, int]]:
+    """读取 PNG 头中的宽高，非 PNG 时退回 Pillow。"""
+    try:
+        with path.open("rb") as f:
+            head = f.read(24)
+        if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        from PIL import Image
+        with Image.open(path) as im:
+            return im.size
+    except Exception:
+        return None
+
+
+class Cost:
+    """一段步骤的耗时区间（秒）。"""
+
+    __slots__ = ("best", "worst")
+
+    def __init__(self, best: float = 0.0, worst: float = 0.0):
+        self.best = best
+        self.worst = worst
+
+    def __add__(self, other: "Cost") -> "Cost":
+        return Cost(self.best + other.best, self.worst + other.worst)
+
+
+class FlowAnalyzer:
+    """分析一个平台的流程。screen 为图像搜索区域（当前图像定位均为全屏）。"""
+
+    def __init__(
+        self,
+        templates_base: Optional[Path] = None,
+        screen: tuple[int, int] = DEFAULT_SCREEN,
+        platform_id: Optional[str] = None,
+    ):
+        settings = get_settings()
+        self.templates_base = templates_base
+        self.screen = screen
+        self.pause = settings.input_pause_seconds
+        self.settle = settings.input_settle_seconds
+        self.type_interval = settings.input_type_interval_seconds
+        self.warnings: list[dict[str, Any]] = []
+        self._locator_memory = None
+        if platform_id:
+            try:
+                from kf_agent.storage.locator_memory import load_locator_memory
+                self._locator_memory = load_locator_memory(platform_id)
+            except Exception:
+                self._locator_memory = None
+
+    def _warn(self, path: str, kind: str, message: str) -> None:
+        self.warnings.append({"step": path, "kind": kind, "message": message})
+
+    # ---------- 定位开销 ----------
+
+    def _image_cost(self, path: str, image: Any) -> Cost:
+        file = Path(resolve_image_path(image.image, self.templates_base))
+        size = _png_size(file) if file.exists() else None
+        if size is None:
+            self._warn(path, "template_missing", f"template not readable: {image.image}")
+            size = (100, 100)
+        screen_mpx = self.screen[0] * self.screen[1] / 1e6
+        template_px = size[0] * size[1]
+        match = CAPTURE_SECONDS + screen_mpx * (MATCH_SECONDS_PER_MPX + template_px / 1000 * MATCH_SECONDS_PER_MPX_PER_KPX)
+        if template_px > LARGE_TEMPLATE_PX:
+            self._warn(
+                path, "full_screen_large_template",
+                f"{image.image} is {size[0]}x{size[1]}, searched over the full {self.screen[0]}x{self.screen[1]} screen "
+                f"(~{match * 1000:.0f} ms per search); crop it to the distinctive part",
+            )
+        return Cost(match, match * (1 + PYAUTOGUI_FALLBACK_FACTOR))
+
+    def _control_cost(self, control: Any) -> Cost:
+        n = len(build_candidates(control))
+        worst = CONTROL_CONNECT_SECONDS + max(n - 1, 0) * CONTROL_MISS_SECONDS + CONTROL_HIT_SECONDS
+        best = CONTROL_HIT_SECONDS
+        if self._locator_memory is not None:
+            entry = self._locator_memory.entries.get(control_key(control))
+            s = entry.stats.get(entry.strategy) if entry and entry.strategy else None
+            if s is not None and s.attempts:
+                best = s.total_ms / s.attempts / 1000
+        return Cost(best, worst)
+
+    def _locate_cost(self, path: str, el: Optional[ElementDesc]) -> Cost:
+        if el is None or el.coord is not None:
+            return Cost()
+        if el.image is not None:
+            return self._image_cost(path, el.image)
+        if el.control is not None:
+            return self._control_cost(el.control)
+        return Cost()
+
+    def _probe_cost(self, path: str, el: ElementDesc) -> Cost:
+        """只探测不点击：图像一次 OpenCV 匹配，控件各候选不等待。"""
+        if el.image is not None:
+            c = self._image_cost(path, el.image)
+            return Cost(c.best, c.best)
+        if el.control is not None:
+            n = max(len(build_candidates(el.control)), 1)
+            return Cost(CONTROL_HIT_SECONDS, CONTROL_CONNECT_SECONDS + n * CONTROL_HIT_SECONDS)
+        return Cost()
+
+    # ---------- 步骤 ----------
+
+    def _input_cost(self, text: str, paste: bool) -> float:
+        return PASTE_SECONDS if paste else len(text) * self.type_interval
+
+    def step_cost(self, step: BaseModel, path: str) -> tuple[Cost, list[dict[str, Any]]]:
+        """返回 (耗时区间, 该步骤最坏情况下的分项耗时；分支与并行取最坏的一支)。"""
+        kind = getattr(step, "type", None)
+        path_items: Optional[list[dict[str, Any]]] = None
+        if kind == "launch":
+            cost = Cost(0.0 if step.skip_if_running else LAUNCH_SECONDS, LAUNCH_SECONDS)
+        elif kind == "wait_window":
+            cost = Cost(0.0, step.timeout_seconds)
+        elif kind == "click":
+            loc = Cost() if step.x is not None and step.y is not None else self._locate_cost(path, step.element)
+            cost = loc + Cost(self.pause, self.pause)
+        elif kind == "input_text":
+            cost = Cost()
+            if step.element and step.element.has_any():
+                cost = self._locate_cost(path, step.element) + Cost(self.pause + self.settle, self.pause + self.settle)
+            t = self._input_cost(step.text, uses_paste(step)) + self.pause
+            cost = cost + Cost(t, t)
+        elif kind == "wait":
+            cost = Cost(step.seconds, step.seconds)
+        elif kind == "wait_stable":
+            n = step.stable_samples
+            cost = Cost((n + 1) * CAPTURE_SECONDS + n * step.interval_seconds, step.timeout_seconds)
+        elif kind == "hotkey":
+            cost = Cost(self.pause, self.pause)
+        elif kind == "sequence":
+            cost = Cost()
+            for action in step.actions:
+                if action.action == "click" and action.element is not None and action.element.coord is None:
+                    cost = cost + self._locate_cost(path, action.element) + Cost(self.pause, self.pause)
+                elif action.action == "type":
+                    cost = cost + Cost(self._input_cost(action.text or "", False), self._input_cost(action.text or "", False))
+                elif action.action == "paste":
+                    cost = cost + Cost(PASTE_SECONDS, PASTE_SECONDS)
+                elif action.action == "wait":
+                    cost = cost + Cost(action.seconds or 0.0, action.seconds or 0.0)
+            gaps = step.delay_seconds * max(len(step.actions) - 1, 0)
+            cost = cost + Cost(gaps, gaps)
+        elif kind == "close_window":
+            cost = Cost(*CLOSE_WINDOW_SECONDS)
+        elif kind in ("if_present", "if_absent"):
+            probe = self._probe_cost(path, step.element)
+            polls = int(step.timeout_seconds / PROBE_INTERVAL_SECONDS) + 1
+            then_cost, then_path = self.block_cost(step.steps, f"{path}.steps")
+            else_cost, else_path = self.block_cost(step.else_steps, f"{path}.else_steps")
+            cost = Cost(
+                probe.best + min(then_cost.best, else_cost.best),
+                step.timeout_seconds + probe.worst * polls + max(then_cost.worst, else_cost.worst),
+            )
+            path_items = then_path if then_cost.worst >= else_cost.worst else else_path
+        elif kind == "repeat_until":
+            probe = self._probe_cost(path, step.element)
+            body, body_path = self.block_cost(step.steps, f"{path}.steps")
+            n = step.max_iterations
+            cost = Cost(
+                body.best + probe.best,
+                n * (body.worst + probe.worst) + (n - 1) * step.interval_seconds,
+            )
+            path_items = [dict(item, worst_seconds=round(item["worst_seconds"] * n, 3)) for item in body_path]
+        elif kind == "parallel":
+            branches = [self.block_cost(b, f"{path}.branches[{i}]") for i, b in enumerate(step.branches) if b]
+            if branches:
+                bests = [c.best for c, _ in branches]
+                slowest = max(branches, key=lambda b: b[0].worst)
+                worst = slowest[0].worst
+                if step.timeout_seconds is not None:
+                    worst = min(worst, step.timeout_seconds)
+                cost = Cost(max(bests) if step.join == "all" else min(bests), worst)
+                path_items = slowest[1]
+            else:
+                cost = Cost()
+        else:
+            self._warn(path, "unknown_step", f"unknown step type: {kind}")
+            cost = Cost()
+
+        post = getattr(step, "postcondition", None)
+        if post is not None and post.has_any():
+            probe = self._probe_cost(path, post)
+            cost = Cost(probe.best, probe.worst + cost.worst)
+        if path_items is None:
+            path_items = [{"step": path, "type": kind, "worst_seconds": round(cost.worst, 3)}]
+        return cost, path_items
+
+    def block_cost(self, steps: list[BaseModel], prefix: str) -> tuple[Cost, list[dict[str, Any]]]:
+        total = Cost()
+        items_all: list[dict[str, Any]] = []
+        prev = None
+        for i, step in enumerate(steps):
+            path = f"{prefix}[{i}]"
+            self._check_pattern(prev, step, path)
+            cost, items = self.step_cost(step, path)
+            total = total + cost
+            items_all.extend(items)
+            prev = step
+        return total, items_all
+
+    def _check_pattern(self, prev: Optional[BaseModel], step: BaseModel, path: str) -> None:
+        if getattr(step, "type", None) != "wait" or prev is None:
+            return
+        prev_kind = getattr(prev, "type", None)
+        if prev_kind == "wait":
+            self._warn(path, "back_to_back_waits", "fixed wait right after another fixed wait; merge them")
+        elif prev_kind in ("wait_window", "wait_stable", "repeat_until") or (
+            prev_kind in ("if_present", "if_absent") and prev.timeout_seconds > 0
+        ):
+            self._warn(
+                path, "wait_after_condition_wait",
+                f"fixed {step.seconds}s wait after {prev_kind}; the condition wait already covers readiness",
+            )
+
+    def analyze(self, flow: str, steps: list[BaseModel]) -> dict[str, Any]:
+        start = len(self.warnings)
+        cost, items = self.block_cost(steps, flow)
+        costliest = sorted((c for c in items if c["worst_seconds"] > 0), key=lambda c: -c["worst_seconds"])
+        return {
+            "steps": len(steps),
+            "best_seconds": round(cost.best, 3),
+            "worst_seconds": round(cost.worst, 3),
+            "costliest_steps": costliest[:10],
+            "warnings": self.warnings[start:],
+        }
+
+
+def analyze_config(
+    config: PlatformConfig,
+    templates_base: Optional[Path] = None,
+    screen: tuple[int, int] = DEFAULT_SCREEN,
+) -> dict[str, Any]:
+    """分析平台的 open / close 流程。步骤解析失败时该流程只返回 error。"""
+    analyzer = FlowAnalyzer(templates_base, screen, platform_id=config.platform)
+    result: dict[str, Any] = {"platform": config.platform, "screen": list(screen)}
+    for flow, get_steps in (("open", config.get_open_steps), ("close", config.get_close_steps)):
+        try:
+            steps = get_steps()
+        except Exception as e:
+            result[flow] = {"error": f"invalid steps: {e}"}
+            continue
+        result[flow] = analyzer.analyze(flow, steps)
+    return result
+
+
+def analyze_platform(platform_id: str, screen: tuple[int, int] = DEFAULT_SCREEN) -> Optional[dict[str, Any]]:
+    """分析已保存的平台配置；平台不存在返回 None。"""
+    from kf_agent.storage.platform_config import load_platform_config
+
+    config = load_platform_config(platform_id)
+    if config is None:
+        return None
+    settings = get_settings()
+    return analyze_config(config, settings.platforms_dir / settings.templates_dir_name, screen)
+
+
+def _parse_screen(value: str) -> tuple[int, int]:
+    w, _, h = value.lower().partition("x")
+    return int(w), int(h)
+
+
+def _has_error(result: dict[str, Any]) -> bool:
+    """平台不存在，或其中某个流程（open / close）步骤无效。"""
+    return "error" in result or any(isinstance(v, dict) and "error" in v for v in result.values())
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="kf-agent-analyze", description="静态估算平台流程的最好/最坏耗时")
+    parser.add_argument("platform", nargs="*", help="平台 ID，默认全部已配置平台")
+    parser.add_argument("--file", help="直接分析 JSON 文件（步骤数组或平台配置）")
+    parser.add_argument("--screen", type=_parse_screen, default=DEFAULT_SCREEN, help="屏幕尺寸 WxH，默认 1920x1080")
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    templates_base = settings.platforms_dir / settings.templates_dir_name
+    results: list[dict[str, Any]] = []
+    if args.file:
+        data = json.loads(Path(args.file).read_text(encoding="utf-8"))
+        if isinstance(data, list):
+            analyzer = FlowAnalyzer(templates_base, args.screen)
+            results.append({"file": args.file, "run": analyzer.analyze("run", [step_from_dict(s) for s in data])})
+        else:
+            data.setdefault("platform", Path(args.file).stem)
+            results.append(analyze_config(PlatformConfig.model_validate(data), templates_base, args.screen))
+    else:
+        from kf_agent.storage.platform_config import list_platform_ids
+        for pid in args.platform or list_platform_ids():
+            r = analyze_platform(pid, args.screen)
+            results.append(r if r is not None else {"platform": pid, "error": "platform not found"})
+    for r in results:
+        print(json.dumps(r, ensure_ascii=False, indent=2))
+    sys.exit(1 if any(_has_error(r) for r in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+流程断点：每步成功后记录下一步的下标，流程失败时保留断点。
+resume 模式下若驱动会话未重建、步骤未变且窗口仍在，则从失败的那一步继续，而不是从头执行。
+断点只在执行流程的进程内存中保存（进程重启后从头执行）。
+"""
+import hashlib
+import json
+import threading
+import time
+import weakref
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from kf_agent.drivers.base import UIDriver
+
+
+def flow_fingerprint(steps: list[BaseModel]) -> str:
+    """步骤列表的指纹：配置被修改后旧断点作废。"""
+    raw = json.dumps([s.model_dump(mode="json") for s in steps], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class FlowCheckpoint:
+    """单个 (平台, 流程) 的断点。"""
+
+    def __init__(self, platform: str, flow: str, fingerprint: str, total: int, driver: UIDriver, start_index: int):
+        self.platform = platform
+        self.flow = flow
+        self.fingerprint = fingerprint
+        self.total = total
+        self.next_index = start_index
+        self.start_index = start_index
+        self.status = "running"  # running / failed / succeeded
+        self.error: Optional[str] = None
+        self.updated_at = time.time()
+        # 只保存弱引用：驱动被驱动池丢弃重建后断点自动失效
+        self._driver = weakref.ref(driver)
+
+    def same_session(self, driver: UIDriver) -> bool:
+        return self._driver() is driver
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "platform": self.platform,
+            "flow": self.flow,
+            "status": self.status,
+            "next_index": self.next_index,
+            "start_index": self.start_index,
+            "total": self.total,
+            "error": self.error,
+            "updated_at": self.updated_at,
+        }
+
+
+class CheckpointStore:
+    """按 (platform, flow) 保存最近一次执行的断点。线程安全。"""
+
+    def __init__(self):
+        self._items: dict[tuple[str, str], FlowCheckpoint] = {}
+        self._lock = threading.Lock()
+
+    def get(self, platform: str, flow: str) -> Optional[FlowCheckpoint]:
+        with self._lock:
+            return self._items.get((platform, flow))
+
+    def start(
+        self,
+        platform: str,
+        flow: str,
+        fingerprint: str,
+        total: int,
+        driver: UIDriver,
+        start_index: int = 0,
+    ) -> FlowCheckpoint:
+        cp = FlowCheckpoint(platform, flow, fingerprint, total, driver, start_index)
+        with self._lock:
+            self._items[(platform, flow)] = cp
+        return cp
+
+    def advance(self, cp: FlowCheckpoint, completed_index: int) -> None:
+        with self._lock:
+            cp.next_index = completed_index + 1
+            cp.updated_at = time.time()
+
+    def finish(self, cp: FlowCheckpoint, error: Optional[str] = None) -> None:
+        with self._lock:
+            cp.status = "failed" if error is not None else "succeeded"
+            cp.error = error
+            cp.updated_at = time.time()
+
+    def list(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [cp.to_dict() for cp in self._items.values()]
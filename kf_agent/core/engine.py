@@ -1,8 +1,12 @@
 """流程执行引擎：解析步骤类型并调用 UI 驱动执行。"""
+import contextvars
 import logging
+import os
+import queue
+import threading
 import time
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Optional
 
 from kf_agent.core.models import (
     StepLaunch,
@@ -10,10 +14,18 @@ from kf_agent.core.models import (
     StepClick,
     StepInputText,
     StepWait,
+    StepWaitStable,
     StepHotkey,
     StepCloseWindow,
+    StepSequence,
+    StepIfPresent,
+    StepRepeatUntil,
+    StepParallel,
+    InputEvent,
+    ElementDesc,
     step_from_dict,
 )
+from kf_agent.config.logging_setup import set_log_step
 from kf_agent.drivers.base import UIDriver
 
 logger = logging.getLogger(__name__)
@@ -24,7 +36,44 @@ class EngineError(Exception):
     pass
 
 
-def _resolve_image_path(relative_path: str, templates_base: Optional[Path]) -> str:
+# 桌面输入互斥：并行分支中的点击、键入、快捷键等逐个执行，一个输入步骤内不会被其他分支打断
+_input_lock = threading.RLock()
+# 并行分支线程的上下文：cancel（Event）与 deadline（monotonic 秒，None 表示不限）
+_branch = threading.local()
+# 当前执行的附加上下文（如 wait 调优器），并行分支线程从父线程继承
+_run = threading.local()
+# 并行分支中 wait_window 分片等待的粒度（便于及时响应取消）
+BRANCH_WAIT_SLICE_SECONDS = 1.0
+# 并行步骤结束时等待被取消分支退出的最长时间（分支可能正处于一次驱动调用中）
+BRANCH_JOIN_TIMEOUT_SECONDS = 10.0
+
+
+def _remaining() -> Optional[float]:
+    deadline = getattr(_branch, "deadline", None)
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _check_cancelled() -> None:
+    cancel = getattr(_branch, "cancel", None)
+    if cancel is not None and cancel.is_set():
+        raise EngineError("parallel branch cancelled")
+    remaining = _remaining()
+    if remaining is not None and remaining <= 0:
+        raise EngineError("parallel timeout")
+
+
+def _sleep(seconds: float) -> None:
+    """可被并行分支取消的 sleep；普通流程等同 time.sleep。"""
+    cancel = getattr(_branch, "cancel", None)
+    if cancel is None:
+        time.sleep(seconds)
+        return
+    remaining = _remaining()
+    cancel.wait(seconds if remaining is None else max(0.0, min(seconds, remaining)))
+    _check_cancelled()
+
+
+def resolve_image_path(relative_path: str, templates_base: Optional[Path]) -> str:
     """将相对路径解析为绝对路径。templates_base 为 platforms 目录或 platforms/templates。"""
     if not relative_path:
         return relative_path
@@ -42,89 +91,424 @@ def _resolve_image_path(relative_path: str, templates_base: Optional[Path]) -> s
     return str(Path(relative_path).resolve() if p.is_absolute() else relative_path)
 
 
+# auto 模式下超过该长度即改用粘贴
+AUTO_PASTE_MIN_CHARS = 16
+
+
+def uses_paste(step: StepInputText) -> bool:
+    """input_text 步骤是否走剪贴板粘贴（mode=paste，或 auto 且文本较长/含非 ASCII 字符）。"""
+    mode = getattr(step, "mode", "type")
+    if mode == "paste":
+        return True
+    if mode == "auto":
+        return len(step.text) >= AUTO_PASTE_MIN_CHARS or not step.text.isascii()
+    return False
+
+
+def _click_element(driver: UIDriver, el: ElementDesc, templates_base: Optional[Path], label: str = "") -> None:
+    """按 element 的坐标 / 图像 / 控件点击，失败抛 EngineError（label 为错误信息前缀）。"""
+    prefix = f"{label} " if label else ""
+    if el.coord is not None:
+        driver.click(el.coord.x, el.coord.y)
+    elif el.image is not None:
+        path = resolve_image_path(el.image.image, templates_base)
+        th = getattr(el.image, "threshold", 0.8) or 0.8
+        if not driver.find_and_click_image(path, threshold=th):
+            raise EngineError(f"{prefix}image not found: {path}")
+    elif el.control is not None:
+        try:
+            if not driver.find_and_click_control(el.control):
+                raise EngineError(f"{prefix}control not found or click failed")
+        except NotImplementedError:
+            raise EngineError("control click not implemented in engine")
+    else:
+        raise EngineError(f"{label or 'click'} step has no coord, image, or control")
+
+
+def _run_sequence(step: StepSequence, driver: UIDriver, templates_base: Optional[Path]) -> None:
+    """
+    连续的坐标点击 / 键入 / 粘贴 / 快捷键 / 等待合成一批交给 driver.send_input 背靠背执行；
+    需要图像或控件定位的点击会先提交已积累的批次，单独定位点击后再继续。
+    """
+    batch: list[InputEvent] = []
+
+    def flush() -> None:
+        if batch:
+            driver.send_input(list(batch), delay=step.delay_seconds)
+            batch.clear()
+
+    for action in step.actions:
+        el = action.element
+        if action.action == "click" and el is not None and el.has_any():
+            if el.coord is not None:
+                batch.append(InputEvent(action="click", x=el.coord.x, y=el.coord.y))
+                continue
+            flush()
+            _click_element(driver, el, templates_base, "sequence")
+            if step.delay_seconds > 0:
+                _sleep(step.delay_seconds)
+            continue
+        if action.action == "click" and (action.x is None or action.y is None):
+            raise EngineError("sequence click has no element or (x,y)")
+        batch.append(InputEvent.model_validate(action.model_dump(exclude={"element"})))
+    try:
+        flush()
+    except ValueError as e:
+        raise EngineError(f"sequence: {e}")
+
+
+def _element_present(driver: UIDriver, el: ElementDesc, templates_base: Optional[Path]) -> bool:
+    """只探测不点击：图像在屏幕上或控件存在即为 True；坐标无法探测。"""
+    if el.image is not None:
+        path = resolve_image_path(el.image.image, templates_base)
+        return driver.image_present(path, threshold=getattr(el.image, "threshold", 0.8) or 0.8)
+    if el.control is not None:
+        return driver.control_present(el.control)
+    return False
+
+
+def _already_satisfied(step, driver: UIDriver, templates_base: Optional[Path]) -> Optional[str]:
+    """步骤的目标状态已达成时返回原因（跳过该步骤），否则返回 None。"""
+    kind = getattr(step, "type", None)
+    if kind == "launch" and step.skip_if_running:
+        name = step.process_name or os.path.basename(step.path)
+        if driver.is_process_running(name):
+            return f"process running: {name}"
+    elif kind == "wait_window" and step.skip_if_exists:
+        if driver.window_exists(title=step.title, class_name=step.class_name):
+            return f"window exists: {step.title or step.class_name}"
+    post = getattr(step, "postcondition", None)
+    if post is not None and post.has_any() and _element_present(driver, post, templates_base):
+        return "postcondition present"
+    return None
+
+
+# if_present 等待元素出现、repeat_until 轮间探测的轮询间隔
+PROBE_INTERVAL_SECONDS = 0.2
+
+
+def _wait_present(driver: UIDriver, el: ElementDesc, templates_base: Optional[Path], timeout: float) -> bool:
+    """timeout 秒内元素出现返回 True；timeout<=0 只探测一次。"""
+    deadline = time.monotonic() + max(timeout, 0.0)
+    while True:
+        if _element_present(driver, el, templates_base):
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        _sleep(min(PROBE_INTERVAL_SECONDS, remaining))
+
+
+def _run_if(step: StepIfPresent, driver: UIDriver, templates_base: Optional[Path], settle_seconds: float) -> None:
+    if not step.element.has_any():
+        raise EngineError(f"{step.type} step has no image or control")
+    present = _wait_present(driver, step.element, templates_base, step.timeout_seconds)
+    taken = present if step.type == "if_present" else not present
+    logger.info("engine %s: element %s, running %s", step.type, "present" if present else "absent",
+                "steps" if taken else "else_steps")
+    _run_block(step.steps if taken else step.else_steps, driver, templates_base, settle_seconds)
+
+
+def _run_repeat_until(
+    step: StepRepeatUntil, driver: UIDriver, templates_base: Optional[Path], settle_seconds: float,
+) -> None:
+    if not step.element.has_any():
+        raise EngineError("repeat_until step has no image or control")
+    for n in range(1, step.max_iterations + 1):
+        _run_block(step.steps, driver, templates_base, settle_seconds)
+        present = _element_present(driver, step.element, templates_base)
+        if present != step.until_absent:
+            logger.info("engine repeat_until: done after %s iteration(s)", n)
+            return
+        if n < step.max_iterations and step.interval_seconds > 0:
+            _sleep(step.interval_seconds)
+    raise EngineError(f"repeat_until: condition not met after {step.max_iterations} iterations")
+
+
+def _wait_window(driver: UIDriver, s: StepWaitWindow) -> bool:
+    """并行分支内分片等待，以便取消与共享截止时间生效。"""
+    if getattr(_branch, "cancel", None) is None:
+        return driver.wait_window(title=s.title, class_name=s.class_name, timeout_seconds=s.timeout_seconds)
+    deadline = time.monotonic() + s.timeout_seconds
+    while True:
+        _check_cancelled()
+        left = deadline - time.monotonic()
+        shared = _remaining()
+        if shared is not None:
+            left = min(left, shared)
+        if left <= 0:
+            return False
+        if driver.wait_window(title=s.title, class_name=s.class_name,
+                              timeout_seconds=min(BRANCH_WAIT_SLICE_SECONDS, left)):
+            return True
+
+
+def _run_wait(step: StepWait, driver: UIDriver, templates_base: Optional[Path]) -> None:
+    tuner = getattr(_run, "wait_tuner", None)
+    if tuner is None:
+        _sleep(step.seconds)
+        return
+
+    def probe(target: dict) -> bool:
+        # 与输入步骤串行（并行分支可能正在操作桌面）；输入进行中时跳过本次探测，不阻塞输入
+        if not _input_lock.acquire(blocking=False):
+            return False
+        try:
+            if "window" in target:
+                return driver.window_exists(**target["window"])
+            return _element_present(driver, ElementDesc.model_validate(target), templates_base)
+        finally:
+            _input_lock.release()
+
+    tuner.run_wait(step, probe, driver, _sleep)
+
+
+def _run_branch(
+    branch: list, driver: UIDriver, templates_base: Optional[Path], settle_seconds: float,
+    cancel: threading.Event, deadline: Optional[float], index: int, results: "queue.Queue",
+    wait_tuner: Any = None,
+) -> None:
+    _branch.cancel, _branch.deadline = cancel, deadline
+    _run.wait_tuner = wait_tuner
+    error: Optional[BaseException] = None
+    try:
+        with driver.thread_context():
+            _run_block(branch, driver, templates_base, settle_seconds)
+    except BaseException as e:
+        error = e
+    finally:
+        _branch.cancel = _branch.deadline = None
+        _run.wait_tuner = None
+        results.put((index, error))
+
+
+def _run_parallel(step: StepParallel, driver: UIDriver, templates_base: Optional[Path], settle_seconds: float) -> None:
+    """
+    各分支在独立线程执行。join=all 等全部成功，任一失败即取消其余并失败；join=first 第一个成功的
+    分支胜出，其余取消。取消在分支的下一步（或下一次轮询）前生效，已取消的分支不会再做桌面输入。
+    """
+    branches = [b for b in step.branches if b]
+    if not branches:
+        return
+    cancel = threading.Event()
+    start = time.monotonic()
+    deadline = None if step.timeout_seconds is None else start + step.timeout_seconds
+    outer = _remaining()
+    if outer is not None:
+        # 嵌套在另一个并行分支内时不超过外层截止时间
+        deadline = start + outer if deadline is None else min(deadline, start + outer)
+    results: queue.Queue = queue.Queue()
+    threads: list[threading.Thread] = []
+    for i, branch in enumerate(branches):
+        # 分支线程继承日志上下文（run_id / platform / step）
+        t = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(_run_branch, branch, driver, templates_base, settle_seconds, cancel, deadline, i, results,
+                  getattr(_run, "wait_tuner", None)),
+            name=f"kf-parallel-{i}",
+            daemon=True,
+        )
+        t.start()
+        threads.append(t)
+    errors: list[str] = []
+    done = 0
+    try:
+        while done < len(branches):
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                i, error = results.get(timeout=timeout)
+            except queue.Empty:
+                raise EngineError(f"parallel timeout after {round(deadline - start, 3)}s")
+            done += 1
+            if error is None:
+                logger.info("engine parallel: branch %s done", i + 1)
+                if step.join == "first":
+                    return
+                continue
+            errors.append(f"branch {i + 1}: {error}")
+            if step.join == "all":
+                raise EngineError(f"parallel {errors[0]}")
+        if errors:
+            raise EngineError("parallel: all branches failed; " + "; ".join(errors))
+    finally:
+        cancel.set()
+        # 等被取消的分支退出，步骤返回后（及释放桌面锁、驱动后）不再有分支在操作桌面
+        join_deadline = time.monotonic() + BRANCH_JOIN_TIMEOUT_SECONDS
+        for t in threads:
+            t.join(max(0.0, join_deadline - time.monotonic()))
+        alive = [t.name for t in threads if t.is_alive()]
+        if alive:
+            logger.warning("engine parallel: branches still running after %ss: %s",
+                           BRANCH_JOIN_TIMEOUT_SECONDS, ", ".join(alive))
+
+
+def _run_wait_stable(step: StepWaitStable, driver: UIDriver) -> None:
+    """连续 stable_samples 次采样与前一帧相比变化不超过 tolerance 即返回，超时失败。"""
+    from kf_agent.drivers.frame_change import changed_fraction, downsample
+
+    r = step.region
+    region = (r.x, r.y, r.width, r.height) if r is not None else None
+    deadline = time.monotonic() + step.timeout_seconds
+    prev = None
+    stable = 0
+    while True:
+        _check_cancelled()
+        frame = driver.capture_frame(region)
+        if frame is None:
+            raise EngineError("wait_stable: cannot capture the screen")
+        small = downsample(frame)
+        if prev is not None and changed_fraction(prev, small) <= step.tolerance:
+            stable += 1
+            if stable >= step.stable_samples:
+                return
+        else:
+            stable = 0
+        prev = small
+        if time.monotonic() >= deadline:
+            raise EngineError(f"wait_stable: screen still changing after {step.timeout_seconds}s")
+        _sleep(step.interval_seconds)
+
+
+# 需要操作鼠标键盘或前台窗口的步骤
+_INPUT_KINDS = ("click", "input_text", "hotkey", "sequence", "close_window")
+
+
+def _run_step(step, driver: UIDriver, templates_base: Optional[Path], settle_seconds: float) -> None:
+    """执行单个步骤（分支/循环/并行步骤递归执行子步骤），失败抛 EngineError。"""
+    kind = getattr(step, "type", None)
+    if kind in _INPUT_KINDS:
+        # 桌面输入互斥；持锁后再确认分支未被取消
+        with _input_lock:
+            _check_cancelled()
+            _run_input_step(step, driver, templates_base, settle_seconds)
+        return
+    if kind == "launch":
+        s = step  # type: StepLaunch
+        driver.launch(s.path, args=s.args, cwd=s.cwd)
+    elif kind == "wait_window":
+        s = step  # type: StepWaitWindow
+        if not _wait_window(driver, s):
+            raise EngineError(f"wait_window timeout: title={s.title}")
+    elif kind == "wait":
+        _run_wait(step, driver, templates_base)
+    elif kind == "wait_stable":
+        _run_wait_stable(step, driver)
+    elif kind in ("if_present", "if_absent"):
+        _run_if(step, driver, templates_base, settle_seconds)
+    elif kind == "repeat_until":
+        _run_repeat_until(step, driver, templates_base, settle_seconds)
+    elif kind == "parallel":
+        _run_parallel(step, driver, templates_base, settle_seconds)
+    else:
+        raise EngineError(f"unknown step type: {kind}")
+
+
+def _run_input_step(step, driver: UIDriver, templates_base: Optional[Path], settle_seconds: float) -> None:
+    kind = step.type
+    if kind == "click":
+        s = step  # type: StepClick
+        if s.x is not None and s.y is not None:
+            driver.click(s.x, s.y)
+        elif s.element and s.element.has_any():
+            _click_element(driver, s.element, templates_base)
+        else:
+            raise EngineError("click step has no element or (x,y)")
+    elif kind == "input_text":
+        s = step  # type: StepInputText
+        if s.element and s.element.has_any():
+            # 先点击再输入（简化）
+            _click_element(driver, s.element, templates_base, "input_text")
+            if settle_seconds > 0:
+                time.sleep(settle_seconds)
+        if uses_paste(s):
+            driver.insert_text(s.text)
+        else:
+            driver.type_text(s.text)
+    elif kind == "hotkey":
+        s = step  # type: StepHotkey
+        driver.hotkey(*s.keys)
+    elif kind == "sequence":
+        _run_sequence(step, driver, templates_base)
+    elif kind == "close_window":
+        s = step  # type: StepCloseWindow
+        ok = driver.close_window(
+            title=s.title,
+            class_name=s.class_name,
+            kill_process=s.kill_process,
+        )
+        if not ok and s.title:
+            logger.warning("close_window may have failed: title=%s", s.title)
+
+
+def _run_block(steps: list, driver: UIDriver, templates_base: Optional[Path], settle_seconds: float) -> None:
+    """执行分支/循环/并行分支内的子步骤（不记录断点）。"""
+    for step in steps:
+        _check_cancelled()
+        reason = _already_satisfied(step, driver, templates_base)
+        if reason is not None:
+            logger.info("engine nested step: type=%s skipped (%s)", getattr(step, "type", None), reason)
+            continue
+        _run_step(step, driver, templates_base, settle_seconds)
+
+
 def run_steps(
     steps: list,
     driver: UIDriver,
     templates_base: Optional[Path] = None,
+    settle_seconds: Optional[float] = None,
+    start_index: int = 0,
+    on_step: Optional[Callable[[int], None]] = None,
+    wait_tuner: Any = None,
+    on_step_done: Optional[Callable[[int, str, str, float, Optional[dict]], None]] = None,
 ) -> None:
     """
     按顺序执行步骤列表。steps 为已解析的 Step* 模型列表。
     templates_base 用于解析 image 相对路径，通常为 platforms_dir 或 platforms_dir/templates。
+    settle_seconds 为 input_text 点击目标后到开始输入的等待，默认取配置 input_settle_seconds。
+    start_index 为起始步骤下标（断点续跑）；on_step(i) 在第 i 步成功后调用（记录断点）。
+    执行前先探测步骤是否已满足（进程已运行、窗口已存在、postcondition 已出现），满足则跳过，
+    因此重复执行 open 是幂等的。分支/循环步骤作为一个整体记录断点。
+    wait_tuner 为 WaitTuner 时，wait 步骤期间观测下一步何时就绪（auto 模式下按观测缩短等待）。
+    on_step_done(i, type, status, 秒数, 定位信息) 在每个顶层步骤结束（ok / skipped / failed）后调用（执行历史）。
     """
-    for i, step in enumerate(steps):
+    if settle_seconds is None:
+        from kf_agent.config import get_settings
+        settle_seconds = get_settings().input_settle_seconds
+    _run.wait_tuner = wait_tuner
+    try:
+        _run_top(steps, driver, templates_base, settle_seconds, start_index, on_step, on_step_done)
+    finally:
+        _run.wait_tuner = None
+        set_log_step(None)
+
+
+def _run_top(
+    steps: list,
+    driver: UIDriver,
+    templates_base: Optional[Path],
+    settle_seconds: float,
+    start_index: int,
+    on_step: Optional[Callable[[int], None]],
+    on_step_done: Optional[Callable[[int, str, str, float, Optional[dict]], None]] = None,
+) -> None:
+    for i in range(start_index, len(steps)):
+        step = steps[i]
         kind = getattr(step, "type", None)
-        logger.info("engine step %s: type=%s", i + 1, kind)
-        if kind == "launch":
-            s = step  # type: StepLaunch
-            driver.launch(s.path, args=s.args, cwd=s.cwd)
-        elif kind == "wait_window":
-            s = step  # type: StepWaitWindow
-            ok = driver.wait_window(
-                title=s.title,
-                class_name=s.class_name,
-                timeout_seconds=s.timeout_seconds,
-            )
-            if not ok:
-                raise EngineError(f"wait_window timeout: title={s.title}")
-        elif kind == "click":
-            s = step  # type: StepClick
-            if s.x is not None and s.y is not None:
-                driver.click(s.x, s.y)
-            elif s.element and s.element.has_any():
-                el = s.element
-                if el.coord is not None:
-                    driver.click(el.coord.x, el.coord.y)
-                elif el.image is not None:
-                    path = _resolve_image_path(el.image.image, templates_base)
-                    th = getattr(el.image, "threshold", 0.8) or 0.8
-                    if not driver.find_and_click_image(path, threshold=th):
-                        raise EngineError(f"image not found: {path}")
-                elif el.control is not None:
-                    try:
-                        if not driver.find_and_click_control(el.control):
-                            raise EngineError("control not found or click failed")
-                    except NotImplementedError:
-                        raise EngineError("control click not implemented in engine")
-                else:
-                    raise EngineError("click step has no coord, image, or control")
+        set_log_step(i)
+        t0 = time.perf_counter()
+        driver.last_locate = None
+        status = "failed"
+        try:
+            reason = _already_satisfied(step, driver, templates_base)
+            if reason is not None:
+                logger.info("engine step %s: type=%s skipped (%s)", i + 1, kind, reason)
+                status = "skipped"
             else:
-                raise EngineError("click step has no element or (x,y)")
-        elif kind == "input_text":
-            s = step  # type: StepInputText
-            if s.element and s.element.has_any():
-                # 先点击再输入（简化）
-                el = s.element
-                if el.coord is not None:
-                    driver.click(el.coord.x, el.coord.y)
-                    time.sleep(0.2)
-                elif el.image is not None:
-                    path = _resolve_image_path(el.image.image, templates_base)
-                    th = getattr(el.image, "threshold", 0.8) or 0.8
-                    if not driver.find_and_click_image(path, threshold=th):
-                        raise EngineError(f"input_text image not found: {path}")
-                    time.sleep(0.2)
-                elif el.control is not None:
-                    try:
-                        if not driver.find_and_click_control(el.control):
-                            raise EngineError("input_text control not found or click failed")
-                    except NotImplementedError:
-                        raise EngineError("control click not implemented in engine")
-                    time.sleep(0.2)
-            driver.type_text(s.text)
-        elif kind == "wait":
-            s = step  # type: StepWait
-            time.sleep(s.seconds)
-        elif kind == "hotkey":
-            s = step  # type: StepHotkey
-            driver.hotkey(*s.keys)
-        elif kind == "close_window":
-            s = step  # type: StepCloseWindow
-            ok = driver.close_window(
-                title=s.title,
-                class_name=s.class_name,
-                kill_process=s.kill_process,
-            )
-            if not ok and s.title:
-                logger.warning("close_window may have failed: title=%s", s.title)
-        else:
-            raise EngineError(f"unknown step type: {kind}")
+                logger.info("engine step %s: type=%s", i + 1, kind)
+                _run_step(step, driver, templates_base, settle_seconds)
+                status = "ok"
+        finally:
+            if on_step_done is not None:
+                on_step_done(i, kind, status, time.perf_counter() - t0, driver.last_locate)
+        if on_step is not None:
+            on_step(i)
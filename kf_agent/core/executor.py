@@ -0,0 +1,179 @@
+"""
+桌面执行器进程：独占 UI 驱动与缓存，API worker 通过本地 IPC（multiprocessing.connection）提交任务。
+所有桌面操作在执行器内串行执行，HTTP 层可以安全地开多个 worker。
+"""
+import logging
+import os
+import secrets
+import threading
+from multiprocessing import Process
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Optional
+
+from kf_agent.config import get_settings
+from kf_agent.config.logging_setup import setup_logging
+from kf_agent.core.jobs import IdempotencyConflict
+from kf_agent.core.profiler import ProfilerBusy
+
+logger = logging.getLogger(__name__)
+
+class ExecutorError(Exception):
+    """与执行器进程通信失败（未启动、超时、连接中断）。"""
+    pass
+
+
+def _address() -> tuple[str, int]:
+    settings = get_settings()
+    return (settings.executor_host, settings.executor_port)
+
+
+# 早期版本的默认密钥：IPC 传输的是 pickle 数据，公开的密钥等于允许任意本机进程在执行器内执行代码
+_LEGACY_AUTHKEY = "kf-agent-executor"
+
+
+def _authkey() -> bytes:
+    key = get_settings().executor_authkey
+    if not key or key == _LEGACY_AUTHKEY:
+        raise ExecutorError("EXECUTOR_AUTHKEY is not set (or is the old public default); refusing executor IPC")
+    return key.encode("utf-8")
+
+
+def ensure_authkey() -> None:
+    """未配置密钥时为本次启动随机生成一个，写入环境变量，之后启动的执行器与 worker 进程继承。"""
+    key = get_settings().executor_authkey
+    if key == _LEGACY_AUTHKEY:
+        raise ExecutorError("EXECUTOR_AUTHKEY must not be the old public default")
+    if not key:
+        os.environ["EXECUTOR_AUTHKEY"] = secrets.token_bytes(32).hex()
+
+
+def use_executor_process() -> bool:
+    """当前进程是否应把桌面操作转发给执行器进程。"""
+    return get_settings().executor_mode == "process"
+
+
+def _handlers() -> dict[str, Callable[..., Any]]:
+    from kf_agent.core import memory, prewarm, profiler, service
+
+    return {
+        "ping": lambda: {"pong": True},
+        "prewarm_status": prewarm.prewarm_status,
+        "open": service.execute_open,
+        "close": service.execute_close,
+        "run": service.execute_flow,
+        "job_submit": service.submit_local_job,
+        "job_get": service.get_local_job,
+        "profile": profiler.sample,
+        "memory": memory.memory_report,
+        "tracemalloc": memory.set_tracing,
+    }
+
+
+def _dispatch(request: dict[str, Any]) -> dict[str, Any]:
+    op = request.get("op")
+    kwargs = request.get("kwargs") or {}
+    handler = _handlers().get(op)
+    if handler is None:
+        return {"ok": False, "error": f"unknown op: {op}"}
+    try:
+        result = handler(**kwargs)
+        return {"ok": True, "result": result}
+    except IdempotencyConflict as e:
+        return {"ok": False, "error": str(e), "conflict": True}
+    except ProfilerBusy as e:
+        return {"ok": False, "error": str(e), "busy": True}
+    except Exception as e:
+        logger.exception("executor op %s failed: %s", op, e)
+        return {"ok": False, "error": str(e)}
+
+
+def _serve_connection(conn) -> None:
+    """单个连接上循环处理请求，直到对端关闭。"""
+    try:
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                break
+            if not isinstance(request, dict):
+                conn.send({"ok": False, "error": "invalid request"})
+                continue
+            conn.send(_dispatch(request))
+    except Exception as e:
+        logger.debug("executor connection closed: %s", e)
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def serve_forever(address: Optional[tuple[str, int]] = None) -> None:
+    """执行器主循环：监听本地地址，每个连接一个线程，真正的桌面操作由 service 内的桌面锁串行化。"""
+    settings = get_settings()
+    setup_logging(settings)
+    from kf_agent.core.memory import start_tracing_if_configured
+    start_tracing_if_configured()
+    addr = address or _address()
+    authkey = _authkey()
+    if settings.prewarm_on_startup:
+        from kf_agent.core.prewarm import start_prewarm
+        start_prewarm()
+    with Listener(addr, authkey=authkey) as listener:
+        logger.info("executor listening on %s:%s", addr[0], addr[1])
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                logger.warning("executor accept failed: %s", e)
+                continue
+            t = threading.Thread(target=_serve_connection, args=(conn,), daemon=True)
+            t.start()
+
+
+def start_executor_process() -> Process:
+    """在子进程中启动执行器，返回 Process 对象（由调用方负责结束）。密钥经环境变量传给子进程。"""
+    ensure_authkey()
+    proc = Process(target=serve_forever, name="kf-agent-executor", daemon=True)
+    proc.start()
+    logger.info("executor process started: pid=%s", proc.pid)
+    return proc
+
+
+def call(op: str, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    """
+    向执行器提交一个操作并等待结果。每次调用使用独立连接，
+    超时后丢弃该连接，不会把迟到的响应串到下一次调用。
+    """
+    wait = get_settings().executor_timeout_seconds if timeout is None else timeout
+    authkey = _authkey()
+    try:
+        conn = Client(_address(), authkey=authkey)
+    except Exception as e:
+        raise ExecutorError(f"executor not reachable: {e}") from e
+    try:
+        conn.send({"op": op, "kwargs": kwargs})
+        if not conn.poll(wait):
+            raise ExecutorError(f"executor timeout after {wait}s: op={op}")
+        response = conn.recv()
+    except ExecutorError:
+        raise
+    except Exception as e:
+        raise ExecutorError(f"executor call failed: {e}") from e
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    if not response.get("ok"):
+        if response.get("conflict"):
+            raise IdempotencyConflict(response.get("error"))
+        if response.get("busy"):
+            raise ProfilerBusy(response.get("error"))
+        raise ExecutorError(response.get("error") or "executor error")
+    return response.get("result")
+
+
+def main() -> None:
+    """命令行入口：单独启动执行器进程（API 以 EXECUTOR_MODE=process 运行时使用）。"""
+    serve_forever()
@@ -0,0 +1,41 @@
+"""向调度器（kf-agent-coordinator）周期上报心跳：agent 地址、容量与已配置平台。"""
+import asyncio
+import logging
+import socket
+from typing import Any
+
+from kf_agent.config import Settings, get_settings
+from kf_agent.storage.platform_config import list_platform_ids
+
+logger = logging.getLogger(__name__)
+
+
+def _advertised_url(settings: Settings) -> str:
+    if settings.agent_url:
+        return settings.agent_url.rstrip("/")
+    return f"http://{socket.gethostname()}:{settings.port}"
+
+
+def build_heartbeat(settings: Settings) -> dict[str, Any]:
+    return {
+        "agent_id": settings.agent_id,
+        "url": _advertised_url(settings),
+        "capacity": settings.agent_capacity,
+        "platforms": list_platform_ids(),
+    }
+
+
+async def heartbeat_loop() -> None:
+    """在 lifespan 中作为后台任务运行，直到被取消。调度器不可达时仅记录日志。"""
+    import httpx
+
+    settings = get_settings()
+    url = settings.coordinator_url.rstrip("/") + "/agents/heartbeat"
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        while True:
+            try:
+                resp = await client.post(url, json=build_heartbeat(get_settings()))
+                resp.raise_for_status()
+            except Exception as e:
+                logger.warning("heartbeat to %s failed: %s", url, e)
+            await asyncio.sleep(settings.heartbeat_interval_seconds)
@@ -0,0 +1,141 @@
+"""
+异步任务：open/close/run 提交后立即返回 job_id，客户端轮询结果。
+相同 Idempotency-Key 的重复提交返回同一任务，客户端重试不会重复操作桌面；
+同一 key 对应的请求内容（action/platform/steps/resume）不同时拒绝（IdempotencyConflict）。
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Literal, Optional
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+JobAction = Literal["open", "close", "run"]
+JobStatus = Literal["pending", "running", "succeeded", "failed"]
+
+# runner(action, platform_id, steps, resume=...) -> {"success": bool, "message": str}
+JobRunner = Callable[..., dict]
+
+
+class IdempotencyConflict(Exception):
+    """Idempotency-Key 已用于内容不同的请求。"""
+    pass
+
+
+def request_fingerprint(
+    action: str,
+    platform: str,
+    steps: Optional[list[dict[str, Any]]],
+    resume: bool,
+) -> str:
+    payload = json.dumps(
+        {"action": action, "platform": platform, "steps": steps, "resume": resume},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Job(BaseModel):
+    job_id: str
+    action: JobAction
+    platform: str
+    status: JobStatus = "pending"
+    result: Optional[dict[str, Any]] = None
+    idempotency_key: Optional[str] = None
+    resume: bool = False  # open/close 从上次失败的步骤继续
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+class JobStore:
+    """
+    内存任务表 + 单线程执行（桌面操作本就串行）。保留最近 max_jobs 个任务，超出后淘汰最早已结束的任务。
+    """
+
+    def __init__(self, runner: JobRunner, max_jobs: int = 1000):
+        self._runner = runner
+        self._max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._by_key: dict[str, tuple[str, str]] = {}  # key -> (job_id, 请求指纹)
+        self._steps: dict[str, Optional[list[dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kf-job")
+
+    def submit(
+        self,
+        action: JobAction,
+        platform: str,
+        steps: Optional[list[dict[str, Any]]] = None,
+        idempotency_key: Optional[str] = None,
+        resume: bool = False,
+    ) -> dict[str, Any]:
+        fingerprint = request_fingerprint(action, platform, steps, resume) if idempotency_key else ""
+        with self._lock:
+            if idempotency_key and idempotency_key in self._by_key:
+                job_id, known = self._by_key[idempotency_key]
+                existing = self._jobs.get(job_id)
+                if existing is not None:
+                    if known != fingerprint:
+                        raise IdempotencyConflict(
+                            f"Idempotency-Key {idempotency_key!r} was already used for a different request"
+                        )
+                    return existing.model_dump()
+            job = Job(
+                job_id=uuid4().hex,
+                action=action,
+                platform=platform,
+                idempotency_key=idempotency_key,
+                resume=resume,
+                created_at=time.time(),
+            )
+            self._jobs[job.job_id] = job
+            self._steps[job.job_id] = steps
+            if idempotency_key:
+                self._by_key[idempotency_key] = (job.job_id, fingerprint)
+            self._evict_locked()
+            snapshot = job.model_dump()
+        self._pool.submit(self._run, job.job_id)
+        return snapshot
+
+    def get(self, job_id: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.model_dump() if job is not None else None
+
+    def _run(self, job_id: str) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.status = "running"
+            job.started_at = time.time()
+            steps = self._steps.pop(job_id, None)
+        try:
+            result = self._runner(job.action, job.platform, steps, resume=job.resume)
+        except Exception as e:
+            logger.exception("job %s failed: %s", job_id, e)
+            result = {"success": False, "message": str(e)}
+        with self._lock:
+            job.result = result
+            job.status = "succeeded" if result.get("success") else "failed"
+            job.finished_at = time.time()
+
+    def _evict_locked(self) -> None:
+        if len(self._jobs) <= self._max_jobs:
+            return
+        for job_id in list(self._jobs.keys()):
+            if len(self._jobs) <= self._max_jobs:
+                break
+            job = self._jobs[job_id]
+            if job.status in ("succeeded", "failed"):
+                del self._jobs[job_id]
+                if job.idempotency_key:
+                    self._by_key.pop(job.idempotency_key, None)
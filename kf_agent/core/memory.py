@@ -0,0 +1,161 @@
+"""
+内存统计：
+
+- RunMemory：一次执行期间的峰值，后台线程按间隔采样进程 RSS（需 psutil）；tracemalloc 开启时另记 Python 分配峰值
+- memory_report()：进程 RSS、模板缓存/匹配缓存/帧检测器/缓冲池/驱动持有的帧等计数，以及 tracemalloc 的分配热点
+  （/debug/memory 用）
+
+tracemalloc 开销较大（分配变慢），默认关闭，可用 MEMORY_TRACEMALLOC=true 启动时开启或运行时通过接口开关。
+"""
+import logging
+import threading
+import tracemalloc
+from typing import Any, Optional
+
+from kf_agent.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024 * 1024
+
+
+def rss_bytes() -> Optional[int]:
+    """当前进程常驻内存；无 psutil 时返回 None。"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+
+def _mb(n: Optional[int]) -> Optional[float]:
+    return None if n is None else round(n / _MB, 2)
+
+
+class RunMemory:
+    """with 块内的内存峰值（执行由桌面锁串行，tracemalloc 的峰值在进入时重置）。"""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval if interval is not None else get_settings().memory_sample_interval_seconds
+        self.start_rss: Optional[int] = None
+        self.peak_rss: Optional[int] = None
+        self.end_rss: Optional[int] = None
+        self.traced_peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _observe(self) -> None:
+        rss = rss_bytes()
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._observe()
+
+    def __enter__(self) -> "RunMemory":
+        self.start_rss = self.peak_rss = rss_bytes()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        if self.start_rss is not None and self.interval > 0:
+            self._thread = threading.Thread(target=self._watch, name="kf-run-memory", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self._observe()
+        self.end_rss = rss_bytes()
+        if tracemalloc.is_tracing():
+            self.traced_peak = tracemalloc.get_traced_memory()[1]
+
+    def summary(self) -> dict[str, Optional[float]]:
+        """MB 为单位：start_rss_mb / peak_rss_mb / end_rss_mb / traced_peak_mb（未开启 tracemalloc 时为 None）。"""
+        return {
+            "start_rss_mb": _mb(self.start_rss),
+            "peak_rss_mb": _mb(self.peak_rss),
+            "end_rss_mb": _mb(self.end_rss),
+            "traced_peak_mb": _mb(self.traced_peak),
+        }
+
+
+# ---------- tracemalloc ----------
+
+
+def set_tracing(enabled: bool, frames: Optional[int] = None) -> dict[str, Any]:
+    """开启/关闭 tracemalloc（frames 为每个分配记录的栈深度）。"""
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start(frames or get_settings().memory_tracemalloc_frames)
+        logger.info("tracemalloc started (frames=%s)", tracemalloc.get_traceback_limit())
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+        logger.info("tracemalloc stopped")
+    return {"tracing": tracemalloc.is_tracing()}
+
+
+def start_tracing_if_configured() -> None:
+    if get_settings().memory_tracemalloc:
+        set_tracing(True)
+
+
+def top_allocations(limit: int = 20, group_by: str = "lineno") -> Optional[list[dict[str, Any]]]:
+    """当前存活分配按位置汇总的前 limit 项；未开启 tracemalloc 时返回 None。"""
+    if not tracemalloc.is_tracing():
+        return None
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    out = []
+    for stat in snapshot.statistics(group_by)[:limit]:
+        frames = stat.traceback if group_by == "traceback" else stat.traceback[:1]
+        out.append({
+            "size_mb": _mb(stat.size),
+            "count": stat.count,
+            "where": [f"{f.filename}:{f.lineno}" for f in frames],
+        })
+    return out
+
+
+# ---------- 汇总 ----------
+
+
+def cache_stats() -> dict[str, Any]:
+    """模板缓存、匹配缓存、帧变化检测器、缓冲池与各驱动持有的帧。只读已存在的对象，不触发依赖导入。"""
+    from kf_agent.drivers import image_click
+    from kf_agent.drivers.buffer_pool import peek_buffer_pool
+    from kf_agent.drivers.frame_change import peek_frame_detector
+    from kf_agent.drivers.pool import get_driver_manager
+
+    templates = image_click.template_cache_stats()
+    pool = peek_buffer_pool()
+    detector = peek_frame_detector()
+    frames = detector.stats() if detector is not None else None
+    # 每次整屏匹配的结果图（float32）大小，按最近一帧的分辨率估算
+    if frames and frames["frame_shape"]:
+        sh, sw = frames["frame_shape"]
+        for t in templates["largest"]:
+            t["match_result_bytes"] = max(0, sh - t["height"] + 1) * max(0, sw - t["width"] + 1) * 4
+    return {
+        "templates": templates,
+        "match_cache": image_click.match_cache_stats(),
+        "frame_detector": frames,
+        "buffer_pool": pool.stats() if pool is not None else None,
+        "driver_frames": get_driver_manager().held_bytes(),
+    }
+
+
+def memory_report(top: int = 20, group_by: str = "lineno") -> dict[str, Any]:
+    traced = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else None
+    return {
+        "rss_mb": _mb(rss_bytes()),
+        "tracemalloc": {
+            "tracing": tracemalloc.is_tracing(),
+            "current_mb": _mb(traced[0]) if traced else None,
+            "peak_mb": _mb(traced[1]) if traced else None,
+        },
+        "caches": cache_stats(),
+        "top_allocations": top_allocations(top, group_by),
+    }
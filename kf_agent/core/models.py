@@ -1,7 +1,7 @@
 """流程、步骤、元素等 Pydantic 模型（可视化定制的数据基础）。"""
 from typing import Any, Literal, Optional
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, PrivateAttr, field_validator
 
 
 # ---------- 元素描述（与可视化定制对应） ----------
@@ -78,6 +78,48 @@ class ResourceLibrary(BaseModel):
     images: list[ResourceImageItem] = Field(default_factory=list)
 
 
+# ---------- 控件定位策略记忆 ----------
+
+
+class LocatorStrategyStats(BaseModel):
+    """某个候选查询策略的累计耗时与命中情况。"""
+    attempts: int = 0
+    successes: int = 0
+    total_ms: float = 0.0
+
+
+class LocatorMemoryEntry(BaseModel):
+    """单个控件的定位记忆：上次成功的策略 + 各策略统计。"""
+    strategy: Optional[str] = None
+    stats: dict[str, LocatorStrategyStats] = Field(default_factory=dict)
+    updated_at: Optional[str] = None
+
+
+class LocatorMemory(BaseModel):
+    """平台控件定位记忆，键为 ElementControl 的规范化 JSON。"""
+    platform: str
+    entries: dict[str, LocatorMemoryEntry] = Field(default_factory=dict)
+
+
+# ---------- 固定等待观测 ----------
+
+
+class WaitStatsEntry(BaseModel):
+    """
+    单个 wait 步骤的就绪观测：samples 为等待开始后下一步可定位所用秒数，
+    None 表示直到 wait 配置的秒数结束仍未就绪。target 为下一步定位目标的摘要，变化后样本作废。
+    """
+    target: str = ""
+    samples: list[Optional[float]] = Field(default_factory=list)
+    updated_at: Optional[str] = None
+
+
+class WaitStats(BaseModel):
+    """平台固定等待观测：主机（agent_id）-> 步骤路径（如 open[3]、open[2].steps[0]）-> 观测。"""
+    platform: str
+    hosts: dict[str, dict[str, WaitStatsEntry]] = Field(default_factory=dict)
+
+
 # ---------- 步骤类型 ----------
 
 
@@ -89,24 +131,40 @@ StepType = Literal[
     "wait",
     "hotkey",
     "close_window",
+    "sequence",
+    "if_present",
+    "if_absent",
+    "repeat_until",
+    "parallel",
+    "wait_stable",
 ]
 
 
-class StepLaunch(BaseModel):
+class StepBase(BaseModel):
+    """步骤公共字段。postcondition：执行前探测该元素（图像或控件）是否已存在，已存在则跳过本步骤。"""
+    postcondition: Optional[ElementDesc] = None
+
+
+class StepLaunch(StepBase):
     type: Literal["launch"] = "launch"
     path: str
     args: Optional[list[str]] = None
     cwd: Optional[str] = None
+    # 进程已在运行时跳过启动；process_name 默认取 path 的文件名
+    skip_if_running: bool = False
+    process_name: Optional[str] = None
 
 
-class StepWaitWindow(BaseModel):
+class StepWaitWindow(StepBase):
     type: Literal["wait_window"] = "wait_window"
     title: Optional[str] = None
     class_name: Optional[str] = None
     timeout_seconds: float = 30.0
+    # 窗口已存在时立即返回，不做任何等待（默认关闭：等待替换旧窗口的同名新窗口时不能开启）
+    skip_if_exists: bool = False
 
 
-class StepClick(BaseModel):
+class StepClick(StepBase):
     type: Literal["click"] = "click"
     element: Optional[ElementDesc] = None
     # 无 element 时可用简单坐标（兼容旧配置）
@@ -114,30 +172,131 @@ class StepClick(BaseModel):
     y: Optional[int] = None
 
 
-class StepInputText(BaseModel):
+class StepInputText(StepBase):
     type: Literal["input_text"] = "input_text"
     element: Optional[ElementDesc] = None
     text: str = ""
     clear_first: bool = True
+    # type：逐字键入；paste：剪贴板粘贴（耗时与长度无关，中文可靠）；auto：含非 ASCII 或较长时粘贴
+    mode: Literal["type", "paste", "auto"] = "type"
+
+
+class InputEvent(BaseModel):
+    """驱动层输入事件：click 用坐标；type/paste 用 text；hotkey 用 keys；wait 用 seconds。"""
+    action: Literal["click", "type", "paste", "hotkey", "wait"]
+    x: Optional[int] = None
+    y: Optional[int] = None
+    text: str = ""
+    keys: list[str] = Field(default_factory=list)
+    seconds: float = 0.0
+
 
+class SequenceAction(InputEvent):
+    """sequence 步骤中的动作；click 可用 element（图像/控件定位会打断批量，单独执行）。"""
+    element: Optional[ElementDesc] = None
+
+
+class StepSequence(StepBase):
+    """多个输入动作连续执行（如 点击 → 全选 → 粘贴 → 回车），动作间隔默认为 0。"""
+    type: Literal["sequence"] = "sequence"
+    actions: list[SequenceAction] = Field(default_factory=list)
+    delay_seconds: float = 0.0
 
-class StepWait(BaseModel):
+
+class StepWait(StepBase):
     type: Literal["wait"] = "wait"
     seconds: float = 1.0
 
 
-class StepHotkey(BaseModel):
+class ScreenRegion(BaseModel):
+    """屏幕矩形区域（像素）。"""
+    x: int
+    y: int
+    width: int = Field(gt=0)
+    height: int = Field(gt=0)
+
+
+class StepWaitStable(StepBase):
+    """
+    等待画面稳定：每 interval_seconds 截一帧（可只截 region），缩小为灰度图与前一帧比较，
+    变化的采样点比例不超过 tolerance 且连续 stable_samples 次即返回；timeout_seconds 内未稳定或无法截屏则失败。
+    """
+    type: Literal["wait_stable"] = "wait_stable"
+    region: Optional[ScreenRegion] = None
+    tolerance: float = Field(default=0.0, ge=0.0, le=1.0)
+    stable_samples: int = Field(default=3, ge=1)
+    interval_seconds: float = Field(default=0.1, ge=0.0)
+    timeout_seconds: float = 10.0
+
+
+class StepHotkey(StepBase):
     type: Literal["hotkey"] = "hotkey"
     keys: list[str]  # e.g. ["ctrl", "c"]
 
 
-class StepCloseWindow(BaseModel):
+class StepCloseWindow(StepBase):
     type: Literal["close_window"] = "close_window"
     title: Optional[str] = None
     class_name: Optional[str] = None
     kill_process: bool = False  # True 时直接结束进程
 
 
+def _parse_steps(v: Any) -> list[BaseModel]:
+    return [s if isinstance(s, BaseModel) else step_from_dict(s) for s in (v or [])]
+
+
+class StepIfPresent(StepBase):
+    """
+    条件分支：element（图像或控件）在 timeout_seconds 内出现则执行 steps，否则执行 else_steps。
+    type=if_absent 时条件取反。timeout_seconds=0 只探测一次，元素不出现时几乎不耗时。
+    """
+    type: Literal["if_present", "if_absent"] = "if_present"
+    element: ElementDesc
+    timeout_seconds: float = 0.0
+    steps: list[Any] = Field(default_factory=list)
+    else_steps: list[Any] = Field(default_factory=list)
+
+    @field_validator("steps", "else_steps", mode="before")
+    @classmethod
+    def parse_steps(cls, v: Any) -> list[BaseModel]:
+        return _parse_steps(v)
+
+
+class StepRepeatUntil(StepBase):
+    """
+    有界循环：执行 steps 后探测 element，出现（until_absent=True 时为消失）即结束；
+    执行 max_iterations 轮仍未满足则失败。
+    """
+    type: Literal["repeat_until"] = "repeat_until"
+    element: ElementDesc
+    until_absent: bool = False
+    steps: list[Any] = Field(default_factory=list)
+    max_iterations: int = Field(default=10, ge=1)
+    interval_seconds: float = 0.5
+
+    @field_validator("steps", mode="before")
+    @classmethod
+    def parse_steps(cls, v: Any) -> list[BaseModel]:
+        return _parse_steps(v)
+
+
+class StepParallel(StepBase):
+    """
+    并行步骤组：branches 中每个分支（步骤列表）在独立线程中同时执行。
+    join=all 全部分支成功才算成功；join=first 任一分支成功即继续，其余分支在下一步前取消。
+    timeout_seconds 为所有分支共享的截止时间；点击、键入等桌面输入仍逐个执行（互斥）。
+    """
+    type: Literal["parallel"] = "parallel"
+    branches: list[list[Any]] = Field(default_factory=list)
+    join: Literal["all", "first"] = "all"
+    timeout_seconds: Optional[float] = None
+
+    @field_validator("branches", mode="before")
+    @classmethod
+    def parse_branches(cls, v: Any) -> list[list[BaseModel]]:
+        return [_parse_steps(b) for b in (v or [])]
+
+
 # 步骤联合类型（JSON 解析时用 dict + type 分发）
 StepPayload = (
     StepLaunch
@@ -145,8 +304,13 @@ StepPayload = (
     | StepClick
     | StepInputText
     | StepWait
+    | StepWaitStable
     | StepHotkey
     | StepCloseWindow
+    | StepSequence
+    | StepIfPresent
+    | StepRepeatUntil
+    | StepParallel
 )
 
 
@@ -163,13 +327,37 @@ def step_from_dict(data: dict[str, Any]) -> BaseModel:
         return StepInputText.model_validate(data)
     if t == "wait":
         return StepWait.model_validate(data)
+    if t == "wait_stable":
+        return StepWaitStable.model_validate(data)
     if t == "hotkey":
         return StepHotkey.model_validate(data)
     if t == "close_window":
         return StepCloseWindow.model_validate(data)
+    if t == "sequence":
+        return StepSequence.model_validate(data)
+    if t in ("if_present", "if_absent"):
+        return StepIfPresent.model_validate(data)
+    if t == "repeat_until":
+        return StepRepeatUntil.model_validate(data)
+    if t == "parallel":
+        return StepParallel.model_validate(data)
     raise ValueError(f"unknown step type: {t}")
 
 
+def child_blocks(step: BaseModel) -> list[list[BaseModel]]:
+    """分支/循环/并行步骤的子步骤列表（steps、else_steps、branches），普通步骤返回空列表。"""
+    blocks = [getattr(step, "steps", None), getattr(step, "else_steps", None), *(getattr(step, "branches", None) or [])]
+    return [b for b in blocks if b]
+
+
+def walk_steps(steps: list[BaseModel]):
+    """深度优先遍历步骤及其嵌套子步骤。"""
+    for step in steps:
+        yield step
+        for block in child_blocks(step):
+            yield from walk_steps(block)
+
+
 # ---------- 平台流程配置 ----------
 
 
@@ -180,8 +368,18 @@ class PlatformConfig(BaseModel):
     close: list[dict[str, Any]] = Field(default_factory=list)
     display_name: Optional[str] = None  # 展示用名称，如「千牛」
 
+    # 已解析的步骤缓存（配置对象按文件版本缓存，步骤只解析一次）
+    _compiled: dict[str, list[BaseModel]] = PrivateAttr(default_factory=dict)
+
+    def _compile(self, flow: str, raw: list[dict[str, Any]]) -> list[BaseModel]:
+        steps = self._compiled.get(flow)
+        if steps is None:
+            steps = [step_from_dict(s) for s in raw]
+            self._compiled[flow] = steps
+        return steps
+
     def get_open_steps(self) -> list[BaseModel]:
-        return [step_from_dict(s) for s in self.open]
+        return self._compile("open", self.open)
 
     def get_close_steps(self) -> list[BaseModel]:
-        return [step_from_dict(s) for s in self.close]
+        return self._compile("close", self.close)
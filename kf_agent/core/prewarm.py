@@ -0,0 +1,133 @@
+"""
+启动后后台预热：导入并初始化驱动依赖、编译各平台流程、加载模板图、创建会话驱动。
+API 在预热完成前即可对外服务，/ready 报告 cold / warming / warm。
+"""
+import logging
+import sys
+import threading
+import time
+from typing import Any, Iterable, Optional
+
+from kf_agent.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_state: dict[str, Any] = {
+    "status": "cold",  # cold / warming / warm / failed
+    "started_at": None,
+    "finished_at": None,
+    "phases": {},  # 阶段名 -> 耗时秒数
+    "errors": [],
+}
+_state_lock = threading.Lock()
+
+
+def prewarm_status() -> dict[str, Any]:
+    with _state_lock:
+        return {
+            **_state,
+            "phases": dict(_state["phases"]),
+            "errors": list(_state["errors"]),
+            "ready": _state["status"] == "warm",
+        }
+
+
+def _phase(name: str, seconds: float) -> None:
+    with _state_lock:
+        _state["phases"][name] = round(seconds, 4)
+
+
+def _error(msg: str) -> None:
+    with _state_lock:
+        _state["errors"].append(msg)
+
+
+def _element_images(steps: Iterable[Any]) -> list[str]:
+    """收集步骤中 element.image 引用的模板路径（相对路径，未解析）。"""
+    from kf_agent.core.models import walk_steps
+
+    images: list[str] = []
+    for step in walk_steps(list(steps)):
+        # sequence 步骤的动作、postcondition 同样可能引用模板
+        for item in [step, *(getattr(step, "actions", None) or [])]:
+            for el in (getattr(item, "element", None), getattr(item, "postcondition", None)):
+                if el is not None and getattr(el, "image", None) is not None and el.image.image:
+                    images.append(el.image.image)
+    return images
+
+
+def run_prewarm() -> dict[str, Any]:
+    """同步执行预热。每个阶段失败只记录错误，不影响后续阶段。"""
+    from kf_agent.core.engine import resolve_image_path
+    from kf_agent.storage.platform_config import list_platform_ids, load_platform_config
+
+    with _state_lock:
+        if _state["status"] == "warming":
+            return prewarm_status()
+        _state.update(status="warming", started_at=time.time(), finished_at=None, phases={}, errors=[])
+
+    settings = get_settings()
+    templates_base = settings.platforms_dir / settings.templates_dir_name
+    platform_ids: list[str] = []
+    images: list[str] = []
+
+    t0 = time.perf_counter()
+    try:
+        platform_ids = list_platform_ids()
+        for pid in platform_ids:
+            config = load_platform_config(pid)
+            if config is None:
+                continue
+            images.extend(_element_images(config.get_open_steps()))
+            images.extend(_element_images(config.get_close_steps()))
+    except Exception as e:
+        _error(f"flows.compile: {e}")
+    _phase("flows.compile", time.perf_counter() - t0)
+
+    if settings.driver != "fake":
+        t0 = time.perf_counter()
+        try:
+            from kf_agent.drivers import image_click
+            image_click.load_dependencies()
+            if sys.platform == "win32":
+                from kf_agent.drivers import win_automation
+                win_automation.load_pywinauto()
+        except Exception as e:
+            _error(f"drivers.import: {e}")
+        _phase("drivers.import", time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        try:
+            from kf_agent.drivers.image_click import load_template
+            for rel in dict.fromkeys(images):
+                if load_template(resolve_image_path(rel, templates_base)) is None:
+                    logger.debug("prewarm: template not loaded: %s", rel)
+        except Exception as e:
+            _error(f"templates.load: {e}")
+        _phase("templates.load", time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    try:
+        from kf_agent.drivers.pool import get_driver_manager
+        manager = get_driver_manager()
+        for pid in platform_ids:
+            manager.acquire(pid)
+    except Exception as e:
+        _error(f"drivers.create: {e}")
+    _phase("drivers.create", time.perf_counter() - t0)
+
+    with _state_lock:
+        _state["status"] = "warm" if not _state["errors"] else "failed"
+        _state["finished_at"] = time.time()
+    logger.info("prewarm finished: %s", prewarm_status())
+    return prewarm_status()
+
+
+def start_prewarm() -> Optional[threading.Thread]:
+    """在后台线程中预热；已在预热或已完成时不重复启动。"""
+    with _state_lock:
+        if _state["status"] in ("warming", "warm"):
+            return None
+    t = threading.Thread(target=run_prewarm, name="kf-prewarm", daemon=True)
+    t.start()
+    return t
@@ -0,0 +1,98 @@
+"""
+进程内采样分析：后台线程按固定间隔读取 sys._current_frames()，把各线程的调用栈累计为折叠栈
+（collapsed stacks，每行 "根;...;叶 次数"，可直接用于 flamegraph.pl / speedscope）。
+
+不插桩、不影响被采样线程，开销只在采样线程本身（默认 100 Hz），可在生产环境短时间开启。
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Optional
+
+# 空闲等待的叶子函数（文件名, 函数名）：默认不计入，避免结果被阻塞在 accept/get/wait 上的线程淹没
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("connection.py", "accept"),
+    ("connection.py", "_recv"),
+    ("connection.py", "_poll"),
+    ("connection.py", "wait"),
+    ("base_events.py", "_run_once"),
+}
+
+# 同一时刻只允许一次采样
+_busy = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """已有采样在进行。"""
+    pass
+
+
+def _label(code: Any) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame: Any) -> tuple[list[str], tuple[str, str]]:
+    """根在前的调用栈标签与叶子 (文件名, 函数名)。"""
+    leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return labels, leaf
+
+
+def sample(seconds: float, interval: float = 0.01, include_idle: bool = False, root: Optional[str] = None) -> dict[str, Any]:
+    """
+    采样 seconds 秒，返回 {"samples", "stacks"（折叠栈 -> 次数）, "threads"（线程名 -> 次数）, "top"（自身耗时最多的函数）}。
+    root 为所有栈额外加的根节点（如进程名），便于合并多个进程的结果。
+    """
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("a profile is already running")
+    try:
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        threads: Counter = Counter()
+        leaves: Counter = Counter()
+        samples = 0
+        started = time.monotonic()
+        deadline = started + seconds
+        while True:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                labels, leaf = _stack(frame)
+                if not include_idle and leaf in _IDLE_LEAVES:
+                    continue
+                name = names.get(ident, f"thread-{ident}")
+                prefix = [root, name] if root else [name]
+                stacks[";".join(prefix + labels)] += 1
+                threads[name] += 1
+                leaves[labels[-1]] += 1
+            samples += 1
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            time.sleep(min(interval, deadline - now))
+        return {
+            "seconds": round(time.monotonic() - started, 3),
+            "interval": interval,
+            "samples": samples,
+            "threads": dict(threads.most_common()),
+            "top": [{"function": f, "samples": n} for f, n in leaves.most_common(20)],
+            "stacks": dict(stacks),
+        }
+    finally:
+        _busy.release()
+
+
+def collapsed(stacks: dict[str, int]) -> str:
+    """折叠栈文本（按次数降序），每行 "栈 次数"。"""
+    return "\n".join(f"{stack} {n}" for stack, n in sorted(stacks.items(), key=lambda kv: -kv[1])) + "\n"
@@ -1,62 +1,297 @@
 """业务服务层：打开/关闭流程编排，调用引擎与存储。"""
 import logging
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
+from uuid import uuid4
 
 from kf_agent.config import get_settings
+from kf_agent.config.logging_setup import log_context
+from kf_agent.core import executor
+from kf_agent.core.checkpoint import CheckpointStore, flow_fingerprint
 from kf_agent.core.engine import run_steps, EngineError
-from kf_agent.core.models import PlatformConfig
-from kf_agent.drivers import get_default_driver
+from kf_agent.core.jobs import JobStore
+from kf_agent.core.memory import RunMemory
+from kf_agent.core.models import PlatformConfig, step_from_dict
+from kf_agent.core.wait_tuning import TUNE_MODES, WaitTuner
+from kf_agent.drivers.pool import get_driver_manager
 from kf_agent.storage.platform_config import load_platform_config, list_platform_ids
 
 logger = logging.getLogger(__name__)
 
+# 桌面操作全局互斥：执行流程的进程内同一时刻只有一个流程在操作桌面
+_desktop_lock = threading.Lock()
+_job_store: Optional[JobStore] = None
+_checkpoints = CheckpointStore()
+
 
 def _templates_base() -> Path:
     settings = get_settings()
     return settings.platforms_dir / settings.templates_dir_name
 
 
-def open_platform(platform_id: str) -> dict:
+def _via_executor(op: str, platform_id: str, **kwargs) -> dict:
+    """转发到执行器进程执行，通信失败时按失败结果返回。"""
+    try:
+        return executor.call(op, platform_id=platform_id, **kwargs)
+    except executor.ExecutorError as e:
+        logger.warning("%s_platform via executor failed: %s", op, e)
+        return {"success": False, "message": str(e)}
+
+
+def open_platform(platform_id: str, resume: bool = False) -> dict:
+    """
+    打开并上线。返回 {"success": bool, "message": str}。
+    executor_mode=process 时转发给执行器进程，否则在本进程执行。
+    resume=True 时若上次 open 失败且会话仍有效，从失败的步骤继续。
+    """
+    if executor.use_executor_process():
+        return _via_executor("open", platform_id, resume=resume)
+    return execute_open(platform_id, resume=resume)
+
+
+def close_platform(platform_id: str, resume: bool = False) -> dict:
+    """下线并关闭，执行位置与 resume 语义同 open_platform。"""
+    if executor.use_executor_process():
+        return _via_executor("close", platform_id, resume=resume)
+    return execute_close(platform_id, resume=resume)
+
+
+def run_flow(platform_id: str, steps: list[dict]) -> dict:
+    """执行任意步骤列表（如集群广播下发的流程），执行位置同 open_platform。"""
+    if executor.use_executor_process():
+        return _via_executor("run", platform_id, steps=steps)
+    return execute_flow(platform_id, steps)
+
+
+def execute_open(platform_id: str, resume: bool = False) -> dict:
     """
-    执行该平台的 open 流程。返回 {"success": bool, "message": str}。
+    在当前进程执行该平台的 open 流程。返回 {"success": bool, "message": str}。
     """
     config = load_platform_config(platform_id)
     if not config:
         return {"success": False, "message": f"platform config not found: {platform_id}"}
-    steps = config.get_open_steps()
-    if not steps:
-        return {"success": False, "message": "open flow is empty"}
-    try:
-        driver = get_default_driver()
-        run_steps(steps, driver, templates_base=_templates_base())
-        return {"success": True, "message": "ok"}
-    except EngineError as e:
-        logger.exception("open_platform engine error: %s", e)
-        return {"success": False, "message": str(e)}
-    except Exception as e:
-        logger.exception("open_platform error: %s", e)
-        return {"success": False, "message": str(e)}
+    return _execute_steps(platform_id, "open", config.get_open_steps(), resume=resume)
 
 
-def close_platform(platform_id: str) -> dict:
-    """执行该平台的 close 流程。"""
+def execute_close(platform_id: str, resume: bool = False) -> dict:
+    """在当前进程执行该平台的 close 流程。"""
     config = load_platform_config(platform_id)
     if not config:
         return {"success": False, "message": f"platform config not found: {platform_id}"}
-    steps = config.get_close_steps()
+    return _execute_steps(platform_id, "close", config.get_close_steps(), resume=resume)
+
+
+def execute_flow(platform_id: str, steps: list[dict]) -> dict:
+    """在当前进程执行调用方给出的任意步骤列表（步骤 JSON 同平台配置）。"""
+    try:
+        parsed = [step_from_dict(s) for s in steps]
+    except Exception as e:
+        return {"success": False, "message": f"invalid steps: {e}"}
+    return _execute_steps(platform_id, "run", parsed)
+
+
+def _resume_index(platform_id: str, flow: str, fingerprint: str, steps: list, driver: Any) -> int:
+    """
+    断点续跑的起始下标：上次同一流程失败、步骤未改、驱动会话未重建，且失败点之前最后一个
+    wait_window 的窗口仍然存在时，返回失败的步骤下标；否则返回 0（从头执行）。
+    """
+    cp = _checkpoints.get(platform_id, flow)
+    if cp is None or cp.status != "failed" or cp.next_index <= 0:
+        return 0
+    if cp.fingerprint != fingerprint or not cp.same_session(driver):
+        logger.info("%s %s: checkpoint stale, running from start", platform_id, flow)
+        return 0
+    window = next((s for s in reversed(steps[:cp.next_index]) if getattr(s, "type", None) == "wait_window"), None)
+    if window is not None:
+        timeout = get_settings().resume_verify_timeout_seconds
+        if not driver.wait_window(title=window.title, class_name=window.class_name, timeout_seconds=timeout):
+            logger.info("%s %s: window gone, running from start", platform_id, flow)
+            return 0
+    return cp.next_index
+
+
+def _wait_tuner(platform_id: str, flow: str, steps: list) -> Optional[WaitTuner]:
+    """open/close 流程按配置观测/调优固定等待；临时下发的 run 流程不观测。"""
+    mode = get_settings().wait_tune_mode
+    if flow == "run" or mode == "off":
+        return None
+    if mode not in TUNE_MODES:
+        logger.warning("unknown wait_tune_mode: %s", mode)
+        return None
+    return WaitTuner(platform_id, flow, steps, mode)
+
+
+def _record_run(run: dict) -> None:
+    """交给执行历史的后台写入线程，不阻塞流程。"""
+    from kf_agent.storage.run_history import get_run_history
+
+    try:
+        store = get_run_history()
+        if store is not None:
+            store.record(run)
+    except Exception as e:
+        logger.warning("record run failed: %s", e)
+
+
+def _save_failure_artifacts(run_id: str, driver: Any, error: EngineError) -> None:
+    """在仍持有桌面锁时取失败现场（图像定位失败时复用匹配帧），编码写盘交给后台线程。"""
+    from kf_agent.storage.artifacts import get_artifact_store
+
+    try:
+        store = get_artifact_store()
+        if store is None:
+            return
+        snapshot = driver.failure_snapshot()
+        if snapshot is not None:
+            store.save_failure(run_id, snapshot, str(error))
+    except Exception as e:
+        logger.warning("save failure artifacts failed: %s", e)
+
+
+def _execute_steps(platform_id: str, flow: str, steps: list, resume: bool = False) -> dict:
     if not steps:
-        return {"success": False, "message": "close flow is empty"}
+        return {"success": False, "message": f"{flow} flow is empty"}
+    manager = get_driver_manager()
+    cp = None
+    start = 0
+    tuner = _wait_tuner(platform_id, flow, steps)
+    memory = RunMemory()
+    run = {
+        "run_id": uuid4().hex,
+        "platform": platform_id,
+        "flow": flow,
+        "host": get_settings().agent_id,
+        "started_at": time.time(),
+        "steps": [],
+    }
+
+    def step_done(i: int, kind: str, status: str, seconds: float, locate: Optional[dict]) -> None:
+        run["steps"].append({
+            "index": i, "type": kind, "status": status, "duration_ms": round(seconds * 1000, 3), "locate": locate,
+        })
+
     try:
-        driver = get_default_driver()
-        run_steps(steps, driver, templates_base=_templates_base())
-        return {"success": True, "message": "ok"}
+        with log_context(run["run_id"], platform_id), _desktop_lock, memory:
+            driver = manager.acquire(platform_id)
+            fingerprint = flow_fingerprint(steps)
+            if resume:
+                start = _resume_index(platform_id, flow, fingerprint, steps, driver)
+                if start:
+                    logger.info("%s %s: resuming from step %s", platform_id, flow, start + 1)
+            cp = _checkpoints.start(platform_id, flow, fingerprint, len(steps), driver, start)
+            try:
+                run_steps(
+                    steps, driver, templates_base=_templates_base(),
+                    start_index=start, on_step=lambda i: _checkpoints.advance(cp, i),
+                    wait_tuner=tuner, on_step_done=step_done,
+                )
+            except EngineError as e:
+                _save_failure_artifacts(run["run_id"], driver, e)
+                raise
+            _checkpoints.finish(cp)
+        result = {"success": True, "message": "ok"}
+        if resume:
+            result["resumed_from"] = start
     except EngineError as e:
-        logger.exception("close_platform engine error: %s", e)
-        return {"success": False, "message": str(e)}
+        logger.exception("%s_platform engine error: %s", flow, e)
+        if cp is not None:
+            _checkpoints.finish(cp, error=str(e))
+        result = {"success": False, "message": str(e), "failed_step": cp.next_index if cp else None}
     except Exception as e:
-        logger.exception("close_platform error: %s", e)
-        return {"success": False, "message": str(e)}
+        # 非预期异常可能意味着驱动会话已损坏，丢弃后下次重建（断点随之失效）
+        logger.exception("%s_platform error: %s", flow, e)
+        if cp is not None:
+            _checkpoints.finish(cp, error=str(e))
+        manager.invalidate(platform_id)
+        result = {"success": False, "message": str(e), "failed_step": cp.next_index if cp else None}
+    finally:
+        if tuner is not None:
+            tuner.flush()
+    result["run_id"] = run["run_id"]
+    peaks = memory.summary()
+    run.update(
+        ended_at=time.time(),
+        success=result["success"],
+        message=result["message"],
+        failed_step=result.get("failed_step"),
+        resumed_from=start if resume else None,
+        peak_rss_mb=peaks["peak_rss_mb"],
+        traced_peak_mb=peaks["traced_peak_mb"],
+    )
+    _record_run(run)
+    return result
+
+
+def execute_job(
+    action: str,
+    platform_id: str,
+    steps: Optional[list[dict[str, Any]]] = None,
+    resume: bool = False,
+) -> dict:
+    """任务执行入口：按 action 分发到 open/close/run。"""
+    if action == "open":
+        return execute_open(platform_id, resume=resume)
+    if action == "close":
+        return execute_close(platform_id, resume=resume)
+    if action == "run":
+        return execute_flow(platform_id, steps or [])
+    return {"success": False, "message": f"unknown action: {action}"}
+
+
+def _local_job_store() -> JobStore:
+    global _job_store
+    if _job_store is None:
+        _job_store = JobStore(runner=execute_job)
+    return _job_store
+
+
+def submit_local_job(
+    action: str,
+    platform_id: str,
+    steps: Optional[list[dict[str, Any]]] = None,
+    idempotency_key: Optional[str] = None,
+    resume: bool = False,
+) -> dict:
+    """在当前进程的任务表提交任务。"""
+    return _local_job_store().submit(
+        action, platform_id, steps=steps, idempotency_key=idempotency_key, resume=resume,
+    )
+
+
+def get_local_job(job_id: str) -> Optional[dict]:
+    return _local_job_store().get(job_id)
+
+
+def submit_job(
+    action: str,
+    platform_id: str,
+    steps: Optional[list[dict[str, Any]]] = None,
+    idempotency_key: Optional[str] = None,
+    resume: bool = False,
+) -> dict:
+    """
+    提交异步任务，返回任务快照。executor_mode=process 时任务表在执行器进程内，
+    多个 HTTP worker 看到的是同一份任务状态。通信失败抛出 ExecutorError。
+    """
+    if executor.use_executor_process():
+        return executor.call(
+            "job_submit",
+            action=action,
+            platform_id=platform_id,
+            steps=steps,
+            idempotency_key=idempotency_key,
+            resume=resume,
+        )
+    return submit_local_job(action, platform_id, steps=steps, idempotency_key=idempotency_key, resume=resume)
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    """查询任务；不存在返回 None。"""
+    if executor.use_executor_process():
+        return executor.call("job_get", job_id=job_id)
+    return get_local_job(job_id)
 
 
 def get_platform_status(platform_id: str) -> dict:
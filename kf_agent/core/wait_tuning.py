@@ -0,0 +1,281 @@
+"""
+固定等待调优：wait 步骤执行期间在后台线程探测“下一步的定位目标”何时出现，记录就绪耗时；
+按主机统计 p50 / p99，给出缩短建议（p99 × 系数 + 余量），auto 模式下直接按建议缩短等待。
+建议可通过配置 API 查看并写回平台 JSON。
+
+只有下一步可探测时才观测：click / input_text / sequence 的图像或控件元素、wait_window 的窗口。
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from pydantic import BaseModel
+
+from kf_agent.config import get_settings
+from kf_agent.config.logging_setup import POLL
+from kf_agent.core.models import PlatformConfig, StepWait, WaitStats, WaitStatsEntry
+from kf_agent.drivers.base import UIDriver
+
+logger = logging.getLogger(__name__)
+
+# 每个步骤保留的最近样本数
+MAX_SAMPLES = 200
+
+TUNE_MODES = ("off", "observe", "auto")
+
+# wait 结束后等待探测线程退出的上限（一次探测通常为一次整屏匹配或一次控件查找）
+PROBE_JOIN_TIMEOUT_SECONDS = 10.0
+
+
+def step_paths(flow: str, steps: list[BaseModel]) -> dict[int, tuple[str, BaseModel, Optional[BaseModel]]]:
+    """id(step) -> (路径, 步骤, 同一层的下一步)。路径形如 open[3]、open[2].steps[0]、open[1].branches[0][2]。"""
+    out: dict[int, tuple[str, BaseModel, Optional[BaseModel]]] = {}
+
+    def walk(block: list[BaseModel], prefix: str) -> None:
+        for i, step in enumerate(block):
+            path = f"{prefix}[{i}]"
+            out[id(step)] = (path, step, block[i + 1] if i + 1 < len(block) else None)
+            for name in ("steps", "else_steps"):
+                if getattr(step, name, None):
+                    walk(getattr(step, name), f"{path}.{name}")
+            for k, branch in enumerate(getattr(step, "branches", None) or []):
+                walk(branch, f"{path}.branches[{k}]")
+
+    walk(steps, flow)
+    return out
+
+
+def readiness_target(step: Optional[BaseModel]) -> Optional[dict[str, Any]]:
+    """下一步可探测的定位目标；坐标点击等无法探测时返回 None。"""
+    if step is None:
+        return None
+    kind = getattr(step, "type", None)
+    if kind == "wait_window":
+        return {"window": {"title": step.title, "class_name": step.class_name}}
+    el = getattr(step, "element", None)
+    if kind == "sequence":
+        el = next((a.element for a in step.actions if a.element is not None), None)
+    if kind in ("click", "input_text", "sequence") and el is not None:
+        if el.image is not None:
+            return {"image": el.image.model_dump()}
+        if el.control is not None:
+            return {"control": el.control.model_dump(exclude_none=True)}
+    return None
+
+
+def _digest(target: dict[str, Any]) -> str:
+    raw = json.dumps(target, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def percentile(values: list[float], q: float) -> float:
+    """最近秩百分位（q 取 0~100），values 需已排序且非空。"""
+    k = max(0, min(len(values) - 1, math.ceil(q / 100 * len(values)) - 1))
+    return values[k]
+
+
+def summarize(entry: WaitStatsEntry, current_seconds: float) -> dict[str, Any]:
+    """样本汇总与建议秒数。未就绪的样本按无穷大计入，p99 未就绪时不给建议。"""
+    settings = get_settings()
+    ordered = sorted(math.inf if s is None else s for s in entry.samples)
+    n = len(ordered)
+    p50 = percentile(ordered, 50) if n else None
+    p99 = percentile(ordered, 99) if n else None
+    suggested = None
+    if n >= settings.wait_tune_min_samples and p99 is not None and math.isfinite(p99):
+        value = round(p99 * settings.wait_tune_margin_factor + settings.wait_tune_margin_seconds, 2)
+        if value < current_seconds:
+            suggested = value
+    return {
+        "seconds": current_seconds,
+        "samples": n,
+        "not_ready": sum(1 for s in entry.samples if s is None),
+        "p50": None if p50 is None or not math.isfinite(p50) else round(p50, 3),
+        "p99": None if p99 is None or not math.isfinite(p99) else round(p99, 3),
+        "suggested_seconds": suggested,
+        "updated_at": entry.updated_at,
+    }
+
+
+class WaitTuner:
+    """一次流程执行内的等待观测（由 service 创建并传给 run_steps，执行结束后 flush）。"""
+
+    def __init__(self, platform_id: str, flow: str, steps: list[BaseModel], mode: str, host: Optional[str] = None):
+        self.platform_id = platform_id
+        self.mode = mode
+        self.host = host or get_settings().agent_id
+        self._paths = step_paths(flow, steps)
+        self._stats: Optional[WaitStats] = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _entries(self) -> dict[str, WaitStatsEntry]:
+        if self._stats is None:
+            from kf_agent.storage.wait_stats import load_wait_stats
+            self._stats = load_wait_stats(self.platform_id)
+        return self._stats.hosts.setdefault(self.host, {})
+
+    def _entry(self, path: str, target: str) -> WaitStatsEntry:
+        entries = self._entries()
+        entry = entries.get(path)
+        if entry is None or entry.target != target:
+            entry = WaitStatsEntry(target=target)
+            entries[path] = entry
+        return entry
+
+    def _record(self, path: str, target: str, sample: Optional[float]) -> None:
+        with self._lock:
+            entry = self._entry(path, target)
+            entry.samples.append(None if sample is None else round(sample, 3))
+            del entry.samples[:-MAX_SAMPLES]
+            entry.updated_at = datetime.now(timezone.utc).isoformat()
+            self._dirty = True
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty or self._stats is None:
+                return
+            from kf_agent.storage.wait_stats import save_wait_stats
+            if save_wait_stats(self._stats):
+                self._dirty = False
+
+    def run_wait(
+        self,
+        step: StepWait,
+        probe: Callable[[dict[str, Any]], bool],
+        driver: UIDriver,
+        sleep: Callable[[float], None],
+    ) -> None:
+        """
+        执行一个 wait 步骤。probe(target) 探测目标是否已出现（在后台线程调用），须无副作用：
+        只能走驱动的 image_present / control_present / window_exists，不改 last_locate 与失败现场。
+        auto 模式且样本足够时只等建议秒数，到点仍未就绪则继续等到就绪或原秒数。
+        返回前等待探测线程结束，不会有迟到的探测与后续步骤并发使用驱动。
+        """
+        info = self._paths.get(id(step))
+        target = readiness_target(info[2]) if info else None
+        if target is None or step.seconds <= 0:
+            sleep(step.seconds)
+            return
+        path, digest = info[0], _digest(target)
+        seconds = step.seconds
+        if self.mode == "auto":
+            with self._lock:
+                suggested = summarize(self._entry(path, digest), step.seconds)["suggested_seconds"]
+            if suggested is not None:
+                seconds = suggested
+
+        ready = threading.Event()
+        stop = threading.Event()
+        result: dict[str, float] = {}
+        t0 = time.monotonic()
+
+        def watch() -> None:
+            from kf_agent.core.engine import PROBE_INTERVAL_SECONDS
+            with driver.thread_context():
+                while not stop.is_set():
+                    try:
+                        found = probe(target)
+                        if found and not stop.is_set():
+                            result["ready"] = time.monotonic() - t0
+                            ready.set()
+                            return
+                    except Exception as e:
+                        logger.debug("wait probe %s: %s", path, e, extra=POLL)
+                    stop.wait(PROBE_INTERVAL_SECONDS)
+
+        watcher = threading.Thread(
+            target=contextvars.copy_context().run, args=(watch,), name="kf-wait-probe", daemon=True,
+        )
+        watcher.start()
+        try:
+            sleep(seconds)
+            # 缩短后的等待到点仍未就绪：继续等，直到就绪或原秒数
+            while seconds < step.seconds and not ready.is_set():
+                left = step.seconds - (time.monotonic() - t0)
+                if left <= 0:
+                    break
+                sleep(min(0.1, left))
+        finally:
+            stop.set()
+            watcher.join(PROBE_JOIN_TIMEOUT_SECONDS)
+            if watcher.is_alive():
+                logger.warning("wait %s: probe still running after %.0fs", path, PROBE_JOIN_TIMEOUT_SECONDS)
+        if seconds < step.seconds:
+            logger.info("wait %s: tuned %.2fs -> %.2fs (ready=%s)", path, step.seconds, seconds, result.get("ready"))
+        sample = result.get("ready")
+        self._record(path, digest, sample if sample is not None and sample <= step.seconds else None)
+
+
+# ---------- 建议查看与写回 ----------
+
+
+def wait_suggestions(platform_id: str, host: Optional[str] = None) -> Optional[list[dict[str, Any]]]:
+    """平台各 wait 步骤的观测与建议；平台不存在返回 None。"""
+    from kf_agent.storage.platform_config import load_platform_config
+    from kf_agent.storage.wait_stats import load_wait_stats
+
+    config = load_platform_config(platform_id)
+    if config is None:
+        return None
+    host = host or get_settings().agent_id
+    entries = load_wait_stats(platform_id).hosts.get(host, {})
+    items: list[dict[str, Any]] = []
+    for flow, steps in (("open", config.get_open_steps()), ("close", config.get_close_steps())):
+        for path, step, nxt in step_paths(flow, steps).values():
+            if getattr(step, "type", None) != "wait":
+                continue
+            target = readiness_target(nxt)
+            entry = entries.get(path)
+            if target is None or entry is None or entry.target != _digest(target):
+                continue
+            items.append({"step": path, "host": host, **summarize(entry, step.seconds)})
+    return items
+
+
+_PATH_TOKEN = re.compile(r"(\w*)\[(\d+)\]")
+
+
+def _raw_step(config: PlatformConfig, path: str) -> dict[str, Any]:
+    """按 step_paths 生成的路径在原始 JSON 中取步骤字典。"""
+    tokens = _PATH_TOKEN.findall(path)
+    flow, index = tokens[0]
+    node: Any = getattr(config, flow)[int(index)]
+    for name, index in tokens[1:]:
+        seq = node[name] if name else node
+        node = seq[int(index)]
+    return node
+
+
+def accept_wait_suggestions(
+    platform_id: str,
+    steps: Optional[list[str]] = None,
+    host: Optional[str] = None,
+) -> Optional[list[dict[str, Any]]]:
+    """把建议秒数写回平台 JSON（steps 为要接受的步骤路径，默认全部有建议的步骤）。返回已修改的步骤。"""
+    from kf_agent.storage.platform_config import load_platform_config, save_platform_config
+
+    suggestions = wait_suggestions(platform_id, host)
+    config = load_platform_config(platform_id)
+    if suggestions is None or config is None:
+        return None
+    wanted = set(steps) if steps else None
+    accepted: list[dict[str, Any]] = []
+    # 在副本上修改，不动已缓存配置的原始步骤
+    raw = PlatformConfig.model_validate(config.model_dump())
+    for item in suggestions:
+        if item["suggested_seconds"] is None or (wanted is not None and item["step"] not in wanted):
+            continue
+        node = _raw_step(raw, item["step"])
+        accepted.append({"step": item["step"], "from": node.get("seconds"), "to": item["suggested_seconds"]})
+        node["seconds"] = item["suggested_seconds"]
+    if accepted and not save_platform_config(raw):
+        raise RuntimeError("save failed")
+    return accepted
@@ -1,16 +1,12 @@
 # Drivers package
-import sys
-
 from kf_agent.drivers.base import UIDriver
 
 
 def get_default_driver() -> UIDriver:
-    """Windows 优先使用 WinAutomationDriver，否则使用 ImageClickDriver。"""
-    if sys.platform == "win32":
-        try:
-            from kf_agent.drivers.win_automation import WinAutomationDriver
-            return WinAutomationDriver(use_image_for_click=True)
-        except Exception:
-            pass
-    from kf_agent.drivers.image_click import ImageClickDriver
-    return ImageClickDriver()
+    """
+    新建一个默认驱动：按配置 driver 选择，fake 为假驱动（联调用）；
+    auto 时 Windows 优先使用 WinAutomationDriver，否则使用 ImageClickDriver。
+    流程执行应使用 drivers.pool.get_driver_manager() 获取常驻的会话驱动。
+    """
+    from kf_agent.drivers.pool import resolve_driver_factory
+    return resolve_driver_factory()()
@@ -1,14 +1,25 @@
 """UI 驱动抽象接口：定位、点击、输入、快捷键、窗口启停。"""
+import logging
+import os
+import time
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Optional
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Iterator, Optional
 
 if TYPE_CHECKING:
-    from kf_agent.core.models import ElementControl
+    from kf_agent.core.models import ElementControl, InputEvent
+
+logger = logging.getLogger(__name__)
 
 
 class UIDriver(ABC):
     """统一 UI 驱动接口，供流程引擎调用。"""
 
+    # 所属平台，由驱动池在创建时设置（用于按平台保存控件定位记忆等）
+    platform_id: Optional[str] = None
+    # 最近一次定位点击的结果（执行历史记录用），如 {"method": "image", "score": 0.93, "x": .., "y": ..}
+    last_locate: Optional[dict] = None
+
     @abstractmethod
     def launch(self, path: str, args: Optional[list[str]] = None, cwd: Optional[str] = None) -> None:
         """启动进程。"""
@@ -43,11 +54,93 @@ class UIDriver(ABC):
         """在当前焦点输入文本。"""
         ...
 
+    def insert_text(self, text: str) -> None:
+        """在当前焦点整段插入文本（如剪贴板粘贴），默认退回逐字输入。"""
+        self.type_text(text)
+
     @abstractmethod
     def hotkey(self, *keys: str) -> None:
         """按下快捷键。"""
         ...
 
+    def send_input(self, events: list["InputEvent"], delay: float = 0.0) -> None:
+        """批量输入：按顺序背靠背执行，事件之间只等待 delay 秒。驱动可去掉底层库的默认停顿。"""
+        for i, ev in enumerate(events):
+            if i and delay > 0:
+                time.sleep(delay)
+            if ev.action == "click":
+                if ev.x is None or ev.y is None:
+                    raise ValueError("click event requires x and y")
+                self.click(ev.x, ev.y)
+            elif ev.action == "type":
+                self.type_text(ev.text)
+            elif ev.action == "paste":
+                self.insert_text(ev.text)
+            elif ev.action == "hotkey":
+                self.hotkey(*ev.keys)
+            elif ev.action == "wait":
+                time.sleep(ev.seconds)
+            else:
+                raise ValueError(f"unknown input event: {ev.action}")
+
+    # ---------- 状态探测（用于跳过已满足的步骤），默认视为不满足 ----------
+
+    def is_process_running(self, name: str) -> bool:
+        """是否已有同名进程在运行（name 为可执行文件名，不区分大小写）。"""
+        try:
+            import psutil
+        except ImportError:
+            return False
+        target = os.path.basename(name).lower()
+        try:
+            for p in psutil.process_iter(["name"]):
+                if (p.info.get("name") or "").lower() == target:
+                    return True
+        except Exception as e:
+            logger.debug("is_process_running: %s", e)
+        return False
+
+    def window_exists(self, title: Optional[str] = None, class_name: Optional[str] = None) -> bool:
+        """窗口是否已存在（不等待）。"""
+        return False
+
+    def image_present(self, image_path: str, threshold: float = 0.8) -> bool:
+        """模板当前是否在屏幕上（只匹配不点击）。无副作用：不改 last_locate 与失败现场，可用于后台探测。"""
+        return False
+
+    def control_present(self, control: "ElementControl") -> bool:
+        """控件当前是否存在（只查找不点击，不等待）。无副作用，同 image_present。"""
+        return False
+
+    def capture_frame(self, region: Optional[tuple[int, int, int, int]] = None) -> Optional[Any]:
+        """截取当前屏幕（BGR 数组），region 为 (x, y, width, height)；不支持时返回 None。"""
+        return None
+
+    def failure_snapshot(self) -> Optional[dict]:
+        """
+        失败现场：{"frame": 屏幕帧, "template": 模板路径或 None, "locate": last_locate}，用于保存失败截图。
+        图像定位失败时应复用匹配时的那一帧，不重新截屏。不支持时返回 None。
+        """
+        frame = self.capture_frame()
+        return {"frame": frame, "template": None, "locate": self.last_locate} if frame is not None else None
+
+    def held_bytes(self) -> int:
+        """驱动持有的大块内存（如留作失败现场的匹配帧）字节数。"""
+        return 0
+
+    @contextmanager
+    def thread_context(self) -> Iterator[None]:
+        """在非调用线程中使用本驱动（如并行步骤的分支线程）时包在外层，默认无需初始化。"""
+        yield
+
+    def is_healthy(self) -> bool:
+        """驱动会话是否仍可用（驱动池据此决定是否重建），默认总是可用。"""
+        return True
+
+    def reset(self) -> None:
+        """丢弃会话内缓存的连接状态（如已连接的应用句柄），默认无状态。"""
+        pass
+
     @abstractmethod
     def close_window(
         self,
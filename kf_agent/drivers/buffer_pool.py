@@ -0,0 +1,104 @@
+"""
+numpy 缓冲池：截屏后的颜色转换、matchTemplate 结果图、帧变化检测的灰度/缩小图等大数组按 (shape, dtype) 复用，
+通过 OpenCV 的 dst / result 参数直接写入，避免每次定位都新分配几十 MB（4K 屏一帧 BGR 约 25 MB，结果图约 33 MB）。
+
+acquire() 取出（没有空闲的则新建），用完 release() 归还；borrow() 为 with 写法。
+空闲缓冲总字节数超过上限时按最久未用的规格淘汰。numpy 由 image_click.load_dependencies() 导入。
+"""
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from kf_agent.drivers import image_click as _ic
+
+# 每种规格最多保留的空闲缓冲数（并行分支可能同时定位）
+MAX_PER_KEY = 4
+
+
+class BufferPool:
+    """按 (shape, dtype) 复用数组，线程安全。max_bytes 为空闲缓冲总字节数上限。"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._free: "OrderedDict[tuple, list[Any]]" = OrderedDict()
+        self._free_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(shape: tuple, dtype: Any) -> tuple:
+        return (tuple(shape), _ic.np.dtype(dtype).str)
+
+    def acquire(self, shape: tuple, dtype: Any) -> Any:
+        """取一个该规格的数组（内容未初始化）。"""
+        key = self._key(shape, dtype)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                arr = free.pop()
+                self._free_bytes -= arr.nbytes
+                self._free.move_to_end(key)
+                self.hits += 1
+                return arr
+            self.misses += 1
+        return _ic.np.empty(shape, dtype)
+
+    def release(self, arr: Any) -> None:
+        """归还 acquire() 取出的数组；归还后调用方不得再使用。"""
+        if arr is None or not arr.flags.owndata:
+            return
+        key = self._key(arr.shape, arr.dtype)
+        with self._lock:
+            free = self._free.setdefault(key, [])
+            self._free.move_to_end(key)
+            if len(free) >= MAX_PER_KEY:
+                return
+            free.append(arr)
+            self._free_bytes += arr.nbytes
+            while self._free_bytes > self.max_bytes and self._free:
+                _, evicted = self._free.popitem(last=False)
+                self._free_bytes -= sum(a.nbytes for a in evicted)
+
+    @contextmanager
+    def borrow(self, shape: tuple, dtype: Any) -> Iterator[Any]:
+        arr = self.acquire(shape, dtype)
+        try:
+            yield arr
+        finally:
+            self.release(arr)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._free.clear()
+            self._free_bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "free_buffers": sum(len(v) for v in self._free.values()),
+                "free_bytes": self._free_bytes,
+                "shapes": len(self._free),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_pool: Optional[BufferPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_buffer_pool() -> BufferPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from kf_agent.config import get_settings
+                _pool = BufferPool(int(get_settings().buffer_pool_max_mb * 1024 * 1024))
+    return _pool
+
+
+def peek_buffer_pool() -> Optional[BufferPool]:
+    """已创建的缓冲池（未创建时不创建）。"""
+    return _pool
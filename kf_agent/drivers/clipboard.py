@@ -0,0 +1,64 @@
+"""剪贴板文本读写与“粘贴后恢复”（pyperclip，首次使用时导入）。只保存/恢复文本内容。"""
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 目标程序异步读取剪贴板，发送粘贴后稍等再恢复，避免贴出旧内容
+PASTE_SETTLE_SECONDS = 0.15
+
+_paste_lock = threading.Lock()
+
+
+def _pyperclip():
+    try:
+        import pyperclip
+        return pyperclip
+    except Exception as e:
+        logger.debug("pyperclip unavailable: %s", e)
+        return None
+
+
+def get_text() -> Optional[str]:
+    clip = _pyperclip()
+    if clip is None:
+        return None
+    try:
+        return clip.paste()
+    except Exception as e:
+        logger.debug("clipboard get failed: %s", e)
+        return None
+
+
+def set_text(text: str) -> bool:
+    clip = _pyperclip()
+    if clip is None:
+        return False
+    try:
+        clip.copy(text)
+        return True
+    except Exception as e:
+        logger.debug("clipboard set failed: %s", e)
+        return False
+
+
+def paste_text(
+    text: str,
+    send_paste: Callable[[], None],
+    settle_seconds: float = PASTE_SETTLE_SECONDS,
+) -> bool:
+    """把 text 放入剪贴板并调用 send_paste（如 Ctrl+V），再恢复原文本剪贴板。剪贴板不可用返回 False。"""
+    with _paste_lock:
+        previous = get_text()
+        if not set_text(text):
+            return False
+        try:
+            send_paste()
+            if settle_seconds > 0:
+                time.sleep(settle_seconds)
+        finally:
+            if previous is not None:
+                set_text(previous)
+        return True
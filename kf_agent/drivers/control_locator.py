@@ -0,0 +1,286 @@
+"""
+控件定位：按 ElementControl 生成候选查询（先严格后宽松），记住每个控件上次命中的策略并优先尝试，
+复用已连接的应用/窗口句柄，统计各策略耗时。驱动点击与资源库“定位预览”共用这一实现。
+
+UIA 后端可注入：app_factory() 需返回带 connect(**kw) 的对象，connect 结果需提供 windows()
+与 is_process_running()；窗口需提供 child_window(**kw)，其结果提供 wrapper_object() 与
+exists(timeout=...)，控件提供 click_input() 与 rectangle()。默认使用 pywinauto.Application(backend="uia")。
+"""
+import json
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from kf_agent.config.logging_setup import POLL
+from kf_agent.core.models import ElementControl, LocatorMemory, LocatorMemoryEntry, LocatorStrategyStats
+
+logger = logging.getLogger(__name__)
+
+AppFactory = Callable[[], Any]
+
+# 定位记忆累计多少次统计变更后落盘一次（命中策略变化时立即落盘）
+_FLUSH_EVERY = 20
+
+
+def build_candidates(control: ElementControl) -> list[tuple[str, dict]]:
+    """候选查询列表 [(策略名, child_window 参数)]，已去重，先严格后宽松。"""
+    has_control_id = control.control_id is not None
+    has_auto_id = bool(control.automation_id)
+    has_control_type = bool(control.control_type)
+    has_name = bool(control.name)
+    title_re = f".*{re.escape(control.name or '')}.*"
+
+    candidates: list[tuple[str, dict]] = []
+    if has_auto_id and has_control_id:
+        candidates.append(("auto_id+control_id", {"auto_id": control.automation_id, "control_id": control.control_id}))
+    if has_auto_id and has_name:
+        candidates.append(("auto_id+name", {"auto_id": control.automation_id, "title_re": title_re}))
+    if has_control_id and has_name:
+        candidates.append(("control_id+name", {"control_id": control.control_id, "title_re": title_re}))
+    if has_auto_id:
+        candidates.append(("auto_id", {"auto_id": control.automation_id}))
+    if has_control_id:
+        candidates.append(("control_id", {"control_id": control.control_id}))
+    if has_name and has_control_type:
+        candidates.append(("name+control_type", {"title_re": title_re, "control_type": control.control_type}))
+    if has_name:
+        candidates.append(("name", {"title_re": title_re}))
+    if has_control_type:
+        candidates.append(("control_type", {"control_type": control.control_type}))
+    return candidates
+
+
+def control_key(control: ElementControl) -> str:
+    """控件在定位记忆中的键：规范化 JSON（字段有任何变化即视为新控件）。"""
+    return json.dumps(control.model_dump(exclude_none=True), sort_keys=True, ensure_ascii=False)
+
+
+def _default_app_factory() -> Any:
+    from kf_agent.drivers.win_automation import load_pywinauto
+    if not load_pywinauto():
+        raise RuntimeError("control locator requires pywinauto")
+    from kf_agent.drivers import win_automation
+    return win_automation.Application(backend="uia")
+
+
+class ControlLocator:
+    """单个平台的控件定位器。线程安全；memory 为 None 时不做持久化（如未指定平台）。"""
+
+    def __init__(
+        self,
+        platform_id: Optional[str] = None,
+        app_factory: Optional[AppFactory] = None,
+        persist: bool = True,
+        connect_timeout: float = 5.0,
+    ):
+        self.platform_id = platform_id
+        self._app_factory = app_factory or _default_app_factory
+        self._persist = persist and platform_id is not None
+        self._connect_timeout = connect_timeout
+        self._lock = threading.RLock()
+        # (window_title, window_class) -> (app, win)
+        self._windows: dict[tuple, tuple[Any, Any]] = {}
+        self._memory: Optional[LocatorMemory] = None
+        # 自上次落盘以来的增量（落盘时与文件合并，不整份覆盖）
+        self._pending = LocatorMemory(platform=platform_id or "")
+        self._dirty = 0
+
+    # ---------- 定位记忆 ----------
+
+    def _get_memory(self) -> LocatorMemory:
+        if self._memory is None:
+            if self._persist:
+                from kf_agent.storage.locator_memory import load_locator_memory
+                self._memory = load_locator_memory(self.platform_id)
+            else:
+                self._memory = LocatorMemory(platform=self.platform_id or "")
+        return self._memory
+
+    def flush(self) -> None:
+        """把未落盘的定位记忆写回 {platform}.locators.json。"""
+        with self._lock:
+            if not self._persist or self._memory is None or not self._dirty:
+                return
+            from kf_agent.storage.locator_memory import save_locator_memory
+            merged = save_locator_memory(self._pending)
+            if merged is not None:
+                # 合并结果含其他进程写入的统计
+                self._memory = merged
+                self._pending = LocatorMemory(platform=self.platform_id or "")
+                self._dirty = 0
+
+    def _record(self, key: str, strategy: str, ok: bool, elapsed_ms: float) -> None:
+        changed = False
+        now = datetime.now(timezone.utc).isoformat() if ok else None
+        for memory in (self._get_memory(), self._pending):
+            entry = memory.entries.setdefault(key, LocatorMemoryEntry())
+            stats = entry.stats.setdefault(strategy, LocatorStrategyStats())
+            stats.attempts += 1
+            stats.total_ms = round(stats.total_ms + elapsed_ms, 3)
+            if ok:
+                stats.successes += 1
+                if memory is self._memory and entry.strategy != strategy:
+                    changed = True
+                entry.strategy = strategy
+                entry.updated_at = now
+        self._dirty += 1
+        if changed or self._dirty >= _FLUSH_EVERY:
+            self.flush()
+
+    def remembered_strategy(self, control: ElementControl) -> Optional[str]:
+        with self._lock:
+            entry = self._get_memory().entries.get(control_key(control))
+            return entry.strategy if entry else None
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """按策略汇总：attempts / successes / avg_ms。"""
+        with self._lock:
+            total: dict[str, LocatorStrategyStats] = {}
+            for entry in self._get_memory().entries.values():
+                for name, s in entry.stats.items():
+                    agg = total.setdefault(name, LocatorStrategyStats())
+                    agg.attempts += s.attempts
+                    agg.successes += s.successes
+                    agg.total_ms += s.total_ms
+            return {
+                name: {
+                    "attempts": s.attempts,
+                    "successes": s.successes,
+                    "avg_ms": round(s.total_ms / s.attempts, 3) if s.attempts else 0.0,
+                }
+                for name, s in total.items()
+            }
+
+    # ---------- 窗口连接复用 ----------
+
+    def _connect(self, control: ElementControl, timeout: Optional[float] = None) -> Any:
+        app = self._app_factory()
+        if timeout is None:
+            timeout = self._connect_timeout
+        if control.window_title:
+            app = app.connect(title_re=f".*{re.escape(control.window_title)}.*", timeout=timeout)
+        else:
+            app = app.connect(class_name_re=f".*{re.escape(control.window_class or '')}.*", timeout=timeout)
+        return app
+
+    def _window(self, control: ElementControl, fresh: bool = False, connect_timeout: Optional[float] = None) -> Any:
+        key = (control.window_title, control.window_class)
+        if not fresh:
+            hit = self._windows.get(key)
+            if hit is not None:
+                app, win = hit
+                try:
+                    if app.is_process_running():
+                        return win
+                except Exception:
+                    pass
+                self._windows.pop(key, None)
+        app = self._connect(control, connect_timeout)
+        win = app.windows()[0]
+        self._windows[key] = (app, win)
+        return win
+
+    def reset(self) -> None:
+        """丢弃已连接的窗口句柄（定位记忆保留）。"""
+        with self._lock:
+            self._windows.clear()
+
+    # ---------- 定位 ----------
+
+    def _ordered(self, control: ElementControl) -> list[tuple[str, dict]]:
+        candidates = build_candidates(control)
+        entry = self._get_memory().entries.get(control_key(control))
+        if entry is None or not entry.strategy:
+            return candidates
+        first = [c for c in candidates if c[0] == entry.strategy]
+        return first + [c for c in candidates if c[0] != entry.strategy]
+
+    def _try_candidates(
+        self, win: Any, control: ElementControl, timeout: Optional[float] = None, record: bool = True
+    ) -> Optional[Any]:
+        key = control_key(control)
+        for name, kwargs in self._ordered(control):
+            t0 = time.perf_counter()
+            try:
+                spec = win.child_window(**kwargs)
+                if timeout is not None and not spec.exists(timeout=timeout):
+                    raise LookupError(name)
+                wrapper = spec.wrapper_object()
+            except Exception:
+                if record:
+                    self._record(key, name, False, (time.perf_counter() - t0) * 1000)
+                continue
+            if record:
+                self._record(key, name, True, (time.perf_counter() - t0) * 1000)
+            return wrapper
+        return None
+
+    def locate(self, control: ElementControl, timeout: Optional[float] = None, probe: bool = False) -> Optional[Any]:
+        """
+        返回控件 wrapper，未找到返回 None。缓存的窗口句柄下全部失败时重连一次再试。
+        timeout 不为 None 时每个候选最多等待该秒数。
+        probe=True 为状态探测（跳过判断、后置条件、条件分支与循环轮询）：连接窗口不等待、不重连重试、
+        不计入策略统计，“控件不存在”的探测既不阻塞也不影响记住的策略。
+        """
+        if not control.window_title and not control.window_class:
+            logger.warning("control locate: need window_title or window_class")
+            return None
+        if not build_candidates(control):
+            logger.warning("control locate: need at least one of control_id, automation_id, control_type, name")
+            return None
+        with self._lock:
+            cached = (control.window_title, control.window_class) in self._windows
+            try:
+                if probe:
+                    return self._try_candidates(self._window(control, connect_timeout=0), control, 0, record=False)
+                wrapper = self._try_candidates(self._window(control), control, timeout)
+                if wrapper is None and cached:
+                    # 窗口可能已重建，旧句柄下子控件全部失效
+                    wrapper = self._try_candidates(self._window(control, fresh=True), control, timeout)
+                return wrapper
+            except Exception as e:
+                if probe:
+                    logger.debug("control probe: %s", e, extra=POLL)
+                else:
+                    logger.warning("control locate failed: %s", e, extra=POLL)
+                self._windows.pop((control.window_title, control.window_class), None)
+                return None
+
+    def click(self, control: ElementControl) -> bool:
+        wrapper = self.locate(control)
+        if wrapper is None:
+            return False
+        try:
+            wrapper.click_input()
+            return True
+        except Exception as e:
+            logger.warning("control click failed: %s", e)
+            return False
+
+    def rect(self, control: ElementControl) -> Optional[tuple[int, int, int, int]]:
+        wrapper = self.locate(control)
+        if wrapper is None:
+            return None
+        try:
+            r = wrapper.rectangle()
+            return (int(r.left), int(r.top), int(r.right), int(r.bottom))
+        except Exception as e:
+            logger.debug("control rect failed: %s", e)
+            return None
+
+
+_locators: dict[Optional[str], ControlLocator] = {}
+_locators_lock = threading.Lock()
+
+
+def get_control_locator(platform_id: Optional[str] = None) -> ControlLocator:
+    """按平台共享的定位器（驱动与资源库 API 共用同一份记忆和窗口句柄）。"""
+    with _locators_lock:
+        locator = _locators.get(platform_id)
+        if locator is None:
+            locator = ControlLocator(platform_id)
+            _locators[platform_id] = locator
+        return locator
@@ -0,0 +1,76 @@
+"""假驱动：不操作桌面，只记录调用，用于本地多 agent 联调与无桌面环境。"""
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Any, Optional
+
+from kf_agent.drivers.base import UIDriver
+
+if TYPE_CHECKING:
+    from kf_agent.core.models import ElementControl
+
+logger = logging.getLogger(__name__)
+
+
+class FakeDriver(UIDriver):
+    """所有操作立即成功；action_delay 可模拟每步耗时。calls 保存调用记录便于观察。"""
+
+    def __init__(self, action_delay: float = 0.0):
+        self.action_delay = action_delay
+        self.calls: list[tuple[str, tuple[Any, ...]]] = []
+        self._launched: set[str] = set()
+
+    def _record(self, name: str, *args: Any) -> None:
+        self.calls.append((name, args))
+        logger.info("fake driver: %s %s", name, args)
+        if self.action_delay > 0:
+            time.sleep(self.action_delay)
+
+    def launch(self, path: str, args: Optional[list[str]] = None, cwd: Optional[str] = None) -> None:
+        self._record("launch", path, args, cwd)
+        self._launched.add(os.path.basename(path).lower())
+
+    def is_process_running(self, name: str) -> bool:
+        """本驱动启动过的程序视为仍在运行（模拟重复 open）。"""
+        return os.path.basename(name).lower() in self._launched
+
+    def wait_window(
+        self,
+        title: Optional[str] = None,
+        class_name: Optional[str] = None,
+        timeout_seconds: float = 30.0,
+    ) -> bool:
+        self._record("wait_window", title, class_name)
+        return True
+
+    def click(self, x: int, y: int) -> None:
+        self._record("click", x, y)
+
+    def find_and_click_image(self, image_path: str, threshold: float = 0.8) -> bool:
+        self._record("find_and_click_image", image_path, threshold)
+        return True
+
+    def find_and_click_control(self, control: "ElementControl") -> bool:
+        self._record("find_and_click_control", control.model_dump(exclude_none=True))
+        return True
+
+    def type_text(self, text: str) -> None:
+        self._record("type_text", text)
+
+    def insert_text(self, text: str) -> None:
+        self._record("insert_text", text)
+
+    def hotkey(self, *keys: str) -> None:
+        self._record("hotkey", *keys)
+
+    def send_input(self, events: list, delay: float = 0.0) -> None:
+        self._record("send_input", [ev.model_dump(exclude_defaults=True) for ev in events], delay)
+
+    def close_window(
+        self,
+        title: Optional[str] = None,
+        class_name: Optional[str] = None,
+        kill_process: bool = False,
+    ) -> bool:
+        self._record("close_window", title, class_name, kill_process)
+        return True
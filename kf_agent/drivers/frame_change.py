@@ -0,0 +1,167 @@
+"""
+屏幕帧变化检测：每帧按 BGR 三个通道缩小为分块网格（每块 16×16 个均值，64 像素的块即每 4×4 像素一个均值），
+每块算一个 64 位哈希，与上一帧比较得到变化的块。不转灰度：亮度相同的颜色变化（按钮高亮、红色角标）也能检出。每块记录最后一次变化时的帧代数（generation），用于判断某个区域自某一帧以来是否变化过。
+
+模板匹配据此复用结果：整屏未变直接用上次结果；上次最高分所在区域未变时只在变化区域附近重新匹配。
+wait_stable 步骤用 downsample() / changed_fraction() 比较相邻两帧的灰度小图。
+cv2/numpy 由 image_click.load_dependencies() 导入。
+"""
+import threading
+from typing import Any, Optional, Tuple
+
+from kf_agent.drivers import image_click as _ic
+
+# 每块缩成 SAMPLES × SAMPLES 个像素均值（每个通道）再求哈希
+SAMPLES = 16
+
+Rect = Tuple[int, int, int, int]  # (x0, y0, x1, y1)，x1/y1 不含
+
+# 稳定判断：小图的宽度上限；灰度差超过该值的采样点才算变化（吸收缩放与压缩带来的细微差异）
+STABLE_SAMPLE_WIDTH = 160
+STABLE_PIXEL_THRESHOLD = 12
+
+
+def downsample(frame: Any, width: int = STABLE_SAMPLE_WIDTH) -> Any:
+    """缩小为灰度小图（保持宽高比，INTER_AREA 取区域均值）。整幅灰度图的中间结果取自缓冲池。"""
+    from kf_agent.drivers.buffer_pool import get_buffer_pool
+
+    cv2 = _ic.cv2
+    h, w = frame.shape[:2]
+    if frame.ndim != 3:
+        return frame if w <= width else cv2.resize(frame, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+    if w <= width:
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    with get_buffer_pool().borrow((h, w), _ic.np.uint8) as gray:
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray)
+        return cv2.resize(gray, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+
+
+def changed_fraction(a: Any, b: Any, pixel_threshold: int = STABLE_PIXEL_THRESHOLD) -> float:
+    """两张同尺寸小图中灰度差超过 pixel_threshold 的采样点比例；尺寸不同返回 1。"""
+    if a.shape != b.shape:
+        return 1.0
+    diff = _ic.cv2.absdiff(a, b)
+    return float((diff > pixel_threshold).mean())
+
+
+class FrameChangeDetector:
+    """按块比较相邻帧。tile_size 为块的边长（像素），线程安全。"""
+
+    def __init__(self, tile_size: int = 64):
+        self.tile_size = max(8, tile_size)
+        self.generation = 0
+        self._shape: Optional[Tuple[int, int]] = None
+        self._grid: Tuple[int, int] = (0, 0)
+        self._hashes: Any = None
+        self._tile_gen: Any = None
+        self._weights: Any = None
+        self._channels = 0
+        self._lock = threading.Lock()
+
+    def _tile_hashes(self, frame: Any) -> Any:
+        """缩小图与加权乘积写入缓冲池中的数组，只有结果（每块一个哈希）是新分配的。"""
+        from kf_agent.drivers.buffer_pool import get_buffer_pool
+
+        cv2, np = _ic.cv2, _ic.np
+        pool = get_buffer_pool()
+        rows, cols = self._grid
+        ch = self._channels
+        small_shape = (rows * SAMPLES, cols * SAMPLES, ch) if ch > 1 else (rows * SAMPLES, cols * SAMPLES)
+        with pool.borrow(small_shape, np.uint8) as small, \
+                pool.borrow((rows, SAMPLES, cols, SAMPLES * ch), np.uint64) as weighted:
+            cv2.resize(frame, (cols * SAMPLES, rows * SAMPLES), dst=small, interpolation=cv2.INTER_AREA)
+            # 块内各采样点（含各通道）乘随机奇数权重后求和（按 2^64 取模）作为块哈希
+            np.multiply(small.reshape(rows, SAMPLES, cols, SAMPLES * ch), self._weights, out=weighted)
+            return weighted.sum(axis=(1, 3), dtype=np.uint64)
+
+    def update(self, frame: Any) -> int:
+        """登记一帧，返回该帧的代数；与上一帧有块不同时代数加一。首帧或分辨率变化视为全部变化。"""
+        np = _ic.np
+        h, w = frame.shape[:2]
+        ch = frame.shape[2] if frame.ndim == 3 else 1
+        with self._lock:
+            if self._shape != (h, w) or self._channels != ch:
+                self._shape = (h, w)
+                self._grid = (max(1, -(-h // self.tile_size)), max(1, -(-w // self.tile_size)))
+                if self._channels != ch:
+                    self._channels = ch
+                    rng = np.random.default_rng(0x6B66)
+                    weights = rng.integers(1, 2**63, size=SAMPLES * SAMPLES * ch, dtype=np.uint64) | np.uint64(1)
+                    self._weights = weights.reshape(1, SAMPLES, 1, SAMPLES * ch)
+                self._hashes = None
+            hashes = self._tile_hashes(frame)
+            if self._hashes is None:
+                changed = np.ones(self._grid, dtype=bool)
+            else:
+                changed = hashes != self._hashes
+            if changed.any():
+                self.generation += 1
+                if self._tile_gen is None or self._tile_gen.shape != changed.shape:
+                    self._tile_gen = np.full(self._grid, self.generation, dtype=np.int64)
+                else:
+                    self._tile_gen[changed] = self.generation
+            self._hashes = hashes
+            return self.generation
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "generation": self.generation,
+                "frame_shape": list(self._shape) if self._shape else None,
+                "grid": list(self._grid),
+                "bytes": sum(a.nbytes for a in (self._hashes, self._tile_gen) if a is not None),
+            }
+
+    def _tile_range(self, rect: Rect) -> Tuple[int, int, int, int]:
+        """像素矩形覆盖的块下标范围 (r0, r1, c0, c1)，r1/c1 不含。"""
+        h, w = self._shape
+        rows, cols = self._grid
+        x0, y0, x1, y1 = max(0, rect[0]), max(0, rect[1]), min(w, rect[2]), min(h, rect[3])
+        return (y0 * rows // h, -(-y1 * rows // h), x0 * cols // w, -(-x1 * cols // w))
+
+    def _tile_rect(self, r0: int, r1: int, c0: int, c1: int) -> Rect:
+        h, w = self._shape
+        rows, cols = self._grid
+        return (c0 * w // cols, r0 * h // rows, -(-c1 * w // cols), -(-r1 * h // rows))
+
+    def unchanged_since(self, generation: int, rect: Optional[Rect] = None) -> bool:
+        """自代数 generation 的帧以来，rect（默认整屏）内的块都没有变化。"""
+        with self._lock:
+            if self._tile_gen is None:
+                return False
+            if rect is None:
+                return self.generation <= generation
+            r0, r1, c0, c1 = self._tile_range(rect)
+            region = self._tile_gen[r0:r1, c0:c1]
+            return region.size == 0 or int(region.max()) <= generation
+
+    def changed_bounds_since(self, generation: int) -> Optional[Rect]:
+        """自代数 generation 以来变化过的块的外接矩形（像素）；没有变化返回 None。"""
+        np = _ic.np
+        with self._lock:
+            if self._tile_gen is None:
+                return None
+            rows, cols = np.nonzero(self._tile_gen > generation)
+            if rows.size == 0:
+                return None
+            return self._tile_rect(int(rows.min()), int(rows.max()) + 1, int(cols.min()), int(cols.max()) + 1)
+
+
+_detector: Optional[FrameChangeDetector] = None
+_detector_lock = threading.Lock()
+
+
+def peek_frame_detector() -> Optional[FrameChangeDetector]:
+    """已创建的检测器（未创建时不创建）。"""
+    return _detector
+
+
+def get_frame_detector() -> FrameChangeDetector:
+    """整个进程共用一个（只有一块屏幕）。"""
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                from kf_agent.config import get_settings
+                _detector = FrameChangeDetector(get_settings().frame_tile_size)
+    return _detector
@@ -1,54 +1,227 @@
-"""图像模板匹配 + 点击（OpenCV + PyAutoGUI）。"""
+"""图像模板匹配 + 点击（OpenCV + PyAutoGUI）。cv2/numpy/pyautogui 较重，首次使用时才导入。"""
 import logging
+import threading
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Optional, Tuple
 
+from kf_agent.config.logging_setup import POLL
 from kf_agent.drivers.base import UIDriver
 
 logger = logging.getLogger(__name__)
 
-try:
-    import cv2
-    import numpy as np
-    import pyautogui
-    _CV2_AVAILABLE = True
-except ImportError:
-    _CV2_AVAILABLE = False
-    cv2 = None
-    np = None
-    pyautogui = None
+# 由 load_dependencies() 填充
+cv2 = None
+np = None
+pyautogui = None
+_CV2_AVAILABLE = False
+_deps_loaded = False
+_deps_lock = threading.Lock()
 
+# 批量输入期间临时把 pyautogui.PAUSE 置 0（全局设置，需串行）
+_pause_lock = threading.Lock()
 
-def _locate_image_opencv(image_path: str, threshold: float = 0.8) -> Optional[Tuple[int, int]]:
-    """使用 OpenCV 模板匹配，返回匹配区域中心 (x, y)，未找到返回 None。"""
-    if not _CV2_AVAILABLE or cv2 is None or np is None:
+# 模板缓存：路径 -> (mtime_ns, BGR 数组)，文件更新后自动失效
+_template_cache: dict[str, tuple[int, Any]] = {}
+_template_lock = threading.Lock()
+
+# 匹配结果缓存：模板路径 -> (帧代数, 模板数组, 最高分, 最高分处左上角)；配合 frame_change 跳过重复匹配
+_match_cache: dict[str, tuple[int, Any, float, Tuple[int, int]]] = {}
+_match_lock = threading.Lock()
+# reused 整屏未变直接复用；partial 只在变化区域附近重新匹配；full 整屏匹配；
+# verify_failed 复用前在原位置重算的得分与缓存不符（块哈希漏检的变化），改为整屏匹配
+_match_stats = {"reused": 0, "partial": 0, "full": 0, "verify_failed": 0}
+# 复用前在原位置重算得分，与缓存得分之差超过该值视为已变化（吸收整屏与小窗口匹配的浮点误差）
+_VERIFY_TOLERANCE = 1e-3
+
+
+def load_dependencies() -> bool:
+    """导入 cv2/numpy/pyautogui（只做一次），返回是否可用。"""
+    global cv2, np, pyautogui, _CV2_AVAILABLE, _deps_loaded
+    if _deps_loaded:
+        return _CV2_AVAILABLE
+    with _deps_lock:
+        if _deps_loaded:
+            return _CV2_AVAILABLE
+        try:
+            import cv2 as _cv2
+            import numpy as _np
+            import pyautogui as _pyautogui
+            cv2, np, pyautogui = _cv2, _np, _pyautogui
+            _CV2_AVAILABLE = True
+            from kf_agent.config import get_settings
+            pyautogui.PAUSE = get_settings().input_pause_seconds
+        except Exception as e:
+            # 无显示环境时 pyautogui 导入会抛非 ImportError 异常
+            logger.debug("image_click dependencies unavailable: %s", e)
+            _CV2_AVAILABLE = False
+        _deps_loaded = True
+    return _CV2_AVAILABLE
+
+
+def load_template(image_path: str) -> Optional[Any]:
+    """读取模板图（BGR），按文件 mtime 缓存；不存在或读取失败返回 None。"""
+    if not load_dependencies():
+        return None
+    path = Path(image_path)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    key = str(path)
+    with _template_lock:
+        hit = _template_cache.get(key)
+        if hit is not None and hit[0] == mtime:
+            return hit[1]
+    template = cv2.imread(key)
+    if template is None:
+        return None
+    with _template_lock:
+        _template_cache[key] = (mtime, template)
+    return template
+
+
+def _pool() -> Any:
+    from kf_agent.drivers.buffer_pool import get_buffer_pool
+    return get_buffer_pool()
+
+
+def _capture_bgr(region: Optional[tuple[int, int, int, int]] = None, pooled: bool = True) -> Any:
+    """
+    截屏（可只截 region）并转为 BGR，兼容 RGB 与 RGBA 截图。pooled 为 True 时写入缓冲池中的数组
+    （用完由调用方 _pool().release 归还），否则新分配（调用方可长期持有）。
+    """
+    rgb = np.asarray(pyautogui.screenshot(region=region))
+    shape = (rgb.shape[0], rgb.shape[1], 3)
+    bgr = _pool().acquire(shape, np.uint8) if pooled else np.empty(shape, np.uint8)
+    code = cv2.COLOR_RGBA2BGR if rgb.ndim == 3 and rgb.shape[2] == 4 else cv2.COLOR_RGB2BGR
+    cv2.cvtColor(rgb, code, dst=bgr)
+    return bgr
+
+
+def _match_image_opencv(image_path: str, use_cache: bool = True) -> Optional[Tuple[float, Tuple[int, int], Any]]:
+    """
+    OpenCV 模板匹配，返回 (最高分, 最高分处中心 (x, y), 匹配所用的屏幕帧 BGR 数组)，不做阈值判断；
+    无法匹配返回 None。屏幕帧来自缓冲池，调用方用完后归还（_pool().release）或自行保留。
+    use_cache 为 False 时不复用上次匹配结果（match_cache_enabled，驱动构造时读取）。
+    """
+    if not load_dependencies():
         return None
     path = Path(image_path)
     if not path.exists():
         logger.warning("template image not found: %s", image_path)
         return None
+    screen_cv = None
     try:
-        template = cv2.imread(str(path))
+        template = load_template(str(path))
         if template is None:
             return None
-        screen = pyautogui.screenshot()
-        screen_cv = cv2.cvtColor(np.array(screen), cv2.COLOR_RGB2BGR)
-        result = cv2.matchTemplate(screen_cv, template, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-        if max_val < threshold:
-            return None
+        screen_cv = _capture_bgr()
+        score, loc = _best_match(str(path), screen_cv, template, use_cache)
         h, w = template.shape[:2]
-        cx = max_loc[0] + w // 2
-        cy = max_loc[1] + h // 2
-        return (cx, cy)
+        return (score, (loc[0] + w // 2, loc[1] + h // 2), screen_cv)
     except Exception as e:
+        _pool().release(screen_cv)
         logger.warning("opencv locate failed: %s", e)
         return None
 
 
+def _match_in(screen_cv: Any, template: Any, x0: int = 0, y0: int = 0) -> Tuple[float, Tuple[int, int]]:
+    """在 screen_cv 中匹配，返回 (最高分, 最高分处左上角)；x0/y0 为 screen_cv 在整屏中的偏移。结果图取自缓冲池。"""
+    sh, sw = screen_cv.shape[:2]
+    h, w = template.shape[:2]
+    with _pool().borrow((sh - h + 1, sw - w + 1), np.float32) as result:
+        result = cv2.matchTemplate(screen_cv, template, cv2.TM_CCOEFF_NORMED, result=result)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return float(max_val), (max_loc[0] + x0, max_loc[1] + y0)
+
+
+def _score_at(screen_cv: Any, template: Any, loc: Tuple[int, int]) -> Optional[float]:
+    """模板在左上角 loc 处的得分（只算一个模板大小的窗口）；越界返回 None。"""
+    h, w = template.shape[:2]
+    x, y = loc
+    window = screen_cv[y:y + h, x:x + w]
+    if window.shape[:2] != (h, w):
+        return None
+    return float(cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)[0, 0])
+
+
+def _best_match(key: str, screen_cv: Any, template: Any, use_cache: bool = True) -> Tuple[float, Tuple[int, int]]:
+    """
+    整屏最高分与位置。某位置的得分只取决于模板大小的窗口内像素，因此：
+    整屏自上次匹配后未变时直接复用；上次最高分的窗口未变时，只需在与变化块相交的窗口中找是否有更高分。
+    复用前先在原位置重算一次得分（一个窗口的匹配），与缓存不符说明块哈希漏掉了变化，改为整屏匹配。
+    """
+    if not use_cache:
+        return _match_in(screen_cv, template)
+    from kf_agent.drivers.frame_change import get_frame_detector
+
+    frames = get_frame_detector()
+    gen = frames.update(screen_cv)
+    with _match_lock:
+        cached = _match_cache.get(key)
+    h, w = template.shape[:2]
+    best: Optional[Tuple[float, Tuple[int, int]]] = None
+    if cached is not None and cached[1] is template and cached[0] <= gen:
+        cached_gen, _, score, loc = cached
+        if frames.unchanged_since(cached_gen):
+            best, kind = (score, loc), "reused"
+        elif frames.unchanged_since(cached_gen, (loc[0], loc[1], loc[0] + w, loc[1] + h)):
+            best, kind = (score, loc), "partial"
+        if best is not None:
+            actual = _score_at(screen_cv, template, loc)
+            if actual is None or abs(actual - score) > _VERIFY_TOLERANCE:
+                with _match_lock:
+                    _match_stats["verify_failed"] += 1
+                best = None
+        if best is not None and kind == "partial":
+            bounds = frames.changed_bounds_since(cached_gen)
+            if bounds is not None:
+                sh, sw = screen_cv.shape[:2]
+                x0, y0 = max(0, bounds[0] - w + 1), max(0, bounds[1] - h + 1)
+                x1, y1 = min(sw, bounds[2] + w - 1), min(sh, bounds[3] + h - 1)
+                if x1 - x0 >= w and y1 - y0 >= h:
+                    found = _match_in(screen_cv[y0:y1, x0:x1], template, x0, y0)
+                    if found[0] > score:
+                        best = found
+    if best is None:
+        best, kind = _match_in(screen_cv, template), "full"
+    with _match_lock:
+        _match_cache[key] = (gen, template, best[0], best[1])
+        _match_stats[kind] += 1
+    logger.debug("match %s: %s score=%.4f", Path(key).name, kind, best[0], extra=POLL)
+    return best
+
+
+def match_cache_stats() -> dict[str, int]:
+    """匹配复用计数（进程启动以来）与当前缓存条数。"""
+    with _match_lock:
+        return {**_match_stats, "entries": len(_match_cache)}
+
+
+def template_cache_stats(largest: int = 10) -> dict[str, Any]:
+    """模板缓存的条数、总字节数与最大的几个模板（名称、字节数、尺寸）。"""
+    with _template_lock:
+        items = [(Path(k).name, t.nbytes, tuple(t.shape[:2])) for k, (_, t) in _template_cache.items()]
+    items.sort(key=lambda item: -item[1])
+    return {
+        "count": len(items),
+        "bytes": sum(item[1] for item in items),
+        "largest": [{"name": n, "bytes": b, "height": s[0], "width": s[1]} for n, b, s in items[:largest]],
+    }
+
+
+def _locate_image_opencv(image_path: str, threshold: float = 0.8, use_cache: bool = True) -> Optional[Tuple[int, int]]:
+    """使用 OpenCV 模板匹配，返回匹配区域中心 (x, y)，未找到返回 None。"""
+    match = _match_image_opencv(image_path, use_cache)
+    if match is None:
+        return None
+    _pool().release(match[2])
+    return match[1] if match[0] >= threshold else None
+
+
 def _locate_image_pyautogui(image_path: str) -> Optional[Tuple[int, int]]:
     """使用 PyAutoGUI 的 locateOnScreen（PIL 匹配），返回中心。"""
-    if not _CV2_AVAILABLE or pyautogui is None:
+    if not load_dependencies():
         return None
     path = Path(image_path)
     if not path.exists():
@@ -62,16 +235,26 @@ def _locate_image_pyautogui(image_path: str) -> Optional[Tuple[int, int]]:
             return None
         return (loc.left + loc.width // 2, loc.top + loc.height // 2)
     except Exception as e:
-        logger.debug("pyautogui locate failed: %s", e)
+        logger.debug("pyautogui locate failed: %s", e, extra=POLL)
         return None
 
 
 class ImageClickDriver(UIDriver):
     """仅实现图像定位 + 点击与键盘；启动/窗口等待/关窗由调用方或组合驱动实现。"""
 
-    def __init__(self):
-        if not _CV2_AVAILABLE or pyautogui is None:
+    def __init__(self, type_interval: Optional[float] = None):
+        if not load_dependencies():
             raise RuntimeError("image_click driver requires opencv-python and pyautogui")
+        from kf_agent.config import get_settings
+
+        settings = get_settings()
+        if type_interval is None:
+            type_interval = settings.input_type_interval_seconds
+        self.type_interval = type_interval
+        # 每次匹配都读配置开销比复用路径本身还大，构造时读一次
+        self.match_cache_enabled = settings.match_cache_enabled
+        # 最近一次 find_and_click_image 的 (屏幕帧, 模板路径, 是否命中)；只在未命中时保留帧，失败时作为现场截图
+        self._last_match: Optional[Tuple[Any, str, bool]] = None
 
     def launch(self, path: str, args: Optional[list[str]] = None, cwd: Optional[str] = None) -> None:
         import subprocess
@@ -90,24 +273,91 @@ class ImageClickDriver(UIDriver):
         time.sleep(min(3.0, timeout_seconds))
         return True
 
+    def window_exists(self, title: Optional[str] = None, class_name: Optional[str] = None) -> bool:
+        """按标题查找（pygetwindow，仅 Windows 可用）；只有类名时无法判断。"""
+        if not title:
+            return False
+        try:
+            return bool(pyautogui.getWindowsWithTitle(title))
+        except Exception as e:
+            logger.debug("window_exists: %s", e, extra=POLL)
+            return False
+
+    def image_present(self, image_path: str, threshold: float = 0.8) -> bool:
+        return _locate_image_opencv(image_path, threshold, self.match_cache_enabled) is not None
+
     def click(self, x: int, y: int) -> None:
         pyautogui.click(x, y)
 
     def find_and_click_image(self, image_path: str, threshold: float = 0.8) -> bool:
-        center = _locate_image_opencv(image_path, threshold)
+        match = _match_image_opencv(image_path, self.match_cache_enabled)
+        self.last_locate = {"method": "image", "image": Path(image_path).name, "threshold": threshold}
+        if match is not None:
+            self.last_locate.update(score=round(match[0], 4), x=match[1][0], y=match[1][1])
+        center = match[1] if match is not None and match[0] >= threshold else None
+        self._last_match = None
+        if match is not None:
+            if center is not None:
+                _pool().release(match[2])
+                self._last_match = (None, image_path, True)
+            else:
+                # 未命中：这一帧留作失败现场，不再归还缓冲池（写盘线程可能稍后才读取）
+                self._last_match = (match[2], image_path, False)
         if center is None:
             center = _locate_image_pyautogui(image_path)
+            if center is not None:
+                self.last_locate["fallback"] = "pyautogui"
         if center is None:
             return False
         pyautogui.click(center[0], center[1])
         return True
 
+    def capture_frame(self, region: Optional[tuple[int, int, int, int]] = None) -> Optional[Any]:
+        if not load_dependencies():
+            return None
+        try:
+            return _capture_bgr(region, pooled=False)
+        except Exception as e:
+            logger.warning("capture_frame failed: %s", e)
+            return None
+
+    def failure_snapshot(self) -> Optional[dict]:
+        """最近一次图像点击未命中时直接用匹配时的帧与模板；其他失败才重新截屏。"""
+        locate = self.last_locate
+        if self._last_match is not None and locate and locate.get("method") == "image":
+            frame, template, found = self._last_match
+            if not found:
+                return {"frame": frame, "template": template, "locate": locate}
+        return super().failure_snapshot()
+
+    def reset(self) -> None:
+        self._last_match = None
+
+    def held_bytes(self) -> int:
+        return self._last_match[0].nbytes if self._last_match is not None else 0
+
     def type_text(self, text: str) -> None:
-        pyautogui.write(text, interval=0.05)
+        pyautogui.write(text, interval=self.type_interval)
+
+    def insert_text(self, text: str) -> None:
+        """剪贴板粘贴整段文本，结束后恢复原剪贴板；剪贴板不可用时退回逐字输入。"""
+        from kf_agent.drivers.clipboard import paste_text
+        if not paste_text(text, lambda: pyautogui.hotkey("ctrl", "v")):
+            self.type_text(text)
 
     def hotkey(self, *keys: str) -> None:
         pyautogui.hotkey(*keys)
 
+    def send_input(self, events: list, delay: float = 0.0) -> None:
+        """批量输入时去掉 pyautogui 每次调用后的默认停顿，只按 delay 间隔。"""
+        with _pause_lock:
+            saved = pyautogui.PAUSE
+            pyautogui.PAUSE = 0
+            try:
+                super().send_input(events, delay)
+            finally:
+                pyautogui.PAUSE = saved
+
     def close_window(
         self,
         title: Optional[str] = None,
@@ -0,0 +1,115 @@
+"""
+驱动池：驱动类型只解析一次，每个平台保持一个长期存活的会话驱动（含已连接的应用句柄与缓存），
+使用前做健康检查，失效或执行中出现非预期异常时重建。
+"""
+import logging
+import sys
+import threading
+from typing import Callable, Optional
+
+from kf_agent.drivers.base import UIDriver
+
+logger = logging.getLogger(__name__)
+
+DriverFactory = Callable[[], UIDriver]
+
+
+def resolve_driver_factory() -> DriverFactory:
+    """按配置与系统选择驱动构造方式；驱动池只解析一次，之后直接调用返回的工厂。"""
+    from kf_agent.config import get_settings
+
+    settings = get_settings()
+    if settings.driver == "fake":
+        from kf_agent.drivers.fake import FakeDriver
+        delay = settings.fake_driver_delay_seconds
+        return lambda: FakeDriver(action_delay=delay)
+
+    def image_driver() -> UIDriver:
+        # 每个平台一个实例：最近一次匹配（失败现场）等按平台保存；模板缓存、匹配缓存与缓冲池在模块级共享
+        from kf_agent.drivers.image_click import ImageClickDriver
+        return ImageClickDriver()
+
+    if sys.platform == "win32":
+        try:
+            from kf_agent.drivers.win_automation import WinAutomationDriver
+
+            def win_driver() -> UIDriver:
+                try:
+                    fallback = image_driver()
+                except Exception as e:
+                    logger.warning("fallback ImageClickDriver not available: %s", e)
+                    fallback = None
+                return WinAutomationDriver(use_image_for_click=True, fallback=fallback)
+
+            return win_driver
+        except Exception as e:
+            logger.warning("WinAutomationDriver not available: %s", e)
+    return image_driver
+
+
+class DriverManager:
+    """按平台持有会话驱动。线程安全；同一平台的流程由上层桌面锁串行执行。"""
+
+    def __init__(self, factory: Optional[DriverFactory] = None):
+        self._factory = factory
+        self._drivers: dict[str, UIDriver] = {}
+        self._lock = threading.Lock()
+
+    def _get_factory(self) -> DriverFactory:
+        if self._factory is None:
+            self._factory = resolve_driver_factory()
+        return self._factory
+
+    def acquire(self, platform_id: str) -> UIDriver:
+        """返回该平台的会话驱动；不存在或健康检查失败时新建。"""
+        with self._lock:
+            driver = self._drivers.get(platform_id)
+            if driver is not None:
+                try:
+                    if driver.is_healthy():
+                        return driver
+                except Exception as e:
+                    logger.warning("driver health check failed for %s: %s", platform_id, e)
+                logger.info("rebuilding driver for %s", platform_id)
+            driver = self._get_factory()()
+            driver.platform_id = platform_id
+            self._drivers[platform_id] = driver
+            return driver
+
+    def invalidate(self, platform_id: str) -> None:
+        """丢弃该平台的会话驱动，下次 acquire 时重建。"""
+        with self._lock:
+            driver = self._drivers.pop(platform_id, None)
+        if driver is not None:
+            try:
+                driver.reset()
+            except Exception:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            platform_ids = list(self._drivers)
+        for platform_id in platform_ids:
+            self.invalidate(platform_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {pid: type(d).__name__ for pid, d in self._drivers.items()}
+
+    def held_bytes(self) -> dict[str, int]:
+        """各会话驱动持有的大块内存字节数。"""
+        with self._lock:
+            return {pid: d.held_bytes() for pid, d in self._drivers.items()}
+
+
+_manager: Optional[DriverManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_driver_manager() -> DriverManager:
+    """进程级单例（在执行器模式下即执行器进程内的唯一驱动池）。"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = DriverManager()
+        return _manager
@@ -1,24 +1,44 @@
-"""Windows UI 自动化（pywinauto）：窗口等待、关窗、可选控件点击。"""
+"""Windows UI 自动化（pywinauto）：窗口等待、关窗、可选控件点击。pywinauto/comtypes 首次使用时才导入。"""
 import logging
 import re
 import subprocess
 import sys
+import threading
 import time
-from typing import Optional
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
 
+from kf_agent.config.logging_setup import POLL
 from kf_agent.core.models import ElementControl
 from kf_agent.drivers.base import UIDriver
 
 logger = logging.getLogger(__name__)
 
+# 由 load_pywinauto() 填充
 _PYWINAUTO_AVAILABLE = False
-try:
-    from pywinauto import Application
-    from pywinauto.findwindows import ElementNotFoundError
-    _PYWINAUTO_AVAILABLE = True
-except ImportError:
-    Application = None
-    ElementNotFoundError = Exception
+Application: Any = None
+ElementNotFoundError: Any = Exception
+_pywinauto_loaded = False
+_pywinauto_lock = threading.Lock()
+
+
+def load_pywinauto() -> bool:
+    """导入 pywinauto（连带 comtypes 的 UIA 初始化，只做一次），返回是否可用。"""
+    global Application, ElementNotFoundError, _PYWINAUTO_AVAILABLE, _pywinauto_loaded
+    if _pywinauto_loaded:
+        return _PYWINAUTO_AVAILABLE
+    with _pywinauto_lock:
+        if _pywinauto_loaded:
+            return _PYWINAUTO_AVAILABLE
+        try:
+            from pywinauto import Application as _Application
+            from pywinauto.findwindows import ElementNotFoundError as _ElementNotFoundError
+            Application, ElementNotFoundError = _Application, _ElementNotFoundError
+            _PYWINAUTO_AVAILABLE = True
+        except ImportError:
+            _PYWINAUTO_AVAILABLE = False
+        _pywinauto_loaded = True
+    return _PYWINAUTO_AVAILABLE
 
 
 def _get_fallback_driver() -> UIDriver:
@@ -30,14 +50,55 @@ def _get_fallback_driver() -> UIDriver:
 class WinAutomationDriver(UIDriver):
     """Windows 下使用 pywinauto 等待/关窗，点击与键盘可委托给 ImageClickDriver。"""
 
-    def __init__(self, use_image_for_click: bool = True):
-        self._fallback: Optional[UIDriver] = None
-        if use_image_for_click or not _PYWINAUTO_AVAILABLE:
+    def __init__(self, use_image_for_click: bool = True, fallback: Optional[UIDriver] = None):
+        load_pywinauto()
+        self._fallback: Optional[UIDriver] = fallback
+        if fallback is None and (use_image_for_click or not _PYWINAUTO_AVAILABLE):
             try:
                 self._fallback = _get_fallback_driver()
             except Exception as e:
                 logger.warning("fallback ImageClickDriver not available: %s", e)
-        self._app: Optional[Application] = None
+        self._app: Optional[Any] = None
+
+    @contextmanager
+    def thread_context(self) -> Iterator[None]:
+        """pywinauto UIA 在新线程中使用前需初始化 COM（STA），结束时释放。"""
+        ole32 = None
+        if sys.platform == "win32":
+            try:
+                import ctypes
+                ole32 = ctypes.windll.ole32
+                ole32.CoInitializeEx(0, 0x2)
+            except Exception as e:
+                logger.debug("CoInitializeEx: %s", e)
+                ole32 = None
+        try:
+            yield
+        finally:
+            if ole32 is not None:
+                try:
+                    ole32.CoUninitialize()
+                except Exception:
+                    pass
+
+    def is_healthy(self) -> bool:
+        """已连接的应用进程退出时丢弃句柄；驱动本身仍可用。"""
+        if self._app is not None:
+            try:
+                if not self._app.is_process_running():
+                    self._app = None
+            except Exception:
+                self._app = None
+        if self._fallback is not None and not self._fallback.is_healthy():
+            return False
+        return True
+
+    def reset(self) -> None:
+        self._app = None
+        from kf_agent.drivers.control_locator import get_control_locator
+        get_control_locator(self.platform_id).reset()
+        if self._fallback is not None:
+            self._fallback.reset()
 
     def _click_driver(self) -> UIDriver:
         if self._fallback is not None:
@@ -58,6 +119,8 @@ class WinAutomationDriver(UIDriver):
     ) -> bool:
         if not _PYWINAUTO_AVAILABLE or Application is None:
             return self._click_driver().wait_window(title, class_name, timeout_seconds)
+        if self._has_connected_window(title, class_name):
+            return True
         deadline = time.monotonic() + timeout_seconds
         while time.monotonic() < deadline:
             try:
@@ -73,85 +136,98 @@ class WinAutomationDriver(UIDriver):
                 time.sleep(0.5)
                 continue
             except Exception as e:
-                logger.debug("wait_window: %s", e)
+                logger.debug("wait_window: %s", e, extra=POLL)
                 time.sleep(0.5)
         return False
 
+    def _has_connected_window(self, title: Optional[str], class_name: Optional[str]) -> bool:
+        """会话内已连接的应用中是否已有匹配窗口（复用连接，免去重新 connect）。"""
+        if self._app is None or (not title and not class_name):
+            return False
+        try:
+            for w in self._app.windows():
+                if title and title in (w.window_text() or ""):
+                    return True
+                if not title and class_name and class_name in (w.class_name() or ""):
+                    return True
+        except Exception as e:
+            logger.debug("connected window check: %s", e, extra=POLL)
+            self._app = None
+        return False
+
+    def window_exists(self, title: Optional[str] = None, class_name: Optional[str] = None) -> bool:
+        """已连接的应用中有该窗口，或单次 connect（不等待）成功即存在。"""
+        if not _PYWINAUTO_AVAILABLE or Application is None:
+            return self._fallback.window_exists(title, class_name) if self._fallback else False
+        if self._has_connected_window(title, class_name):
+            return True
+        try:
+            if title:
+                app = Application(backend="uia").connect(title_re=f".*{re.escape(title)}.*")
+            elif class_name:
+                app = Application(backend="uia").connect(class_name_re=f".*{re.escape(class_name)}.*")
+            else:
+                return False
+            if app.windows():
+                self._app = app
+                return True
+        except Exception as e:
+            logger.debug("window_exists: %s", e, extra=POLL)
+        return False
+
+    def image_present(self, image_path: str, threshold: float = 0.8) -> bool:
+        return self._fallback.image_present(image_path, threshold) if self._fallback else False
+
+    def control_present(self, control: ElementControl) -> bool:
+        if sys.platform != "win32" or not _PYWINAUTO_AVAILABLE or Application is None:
+            return False
+        from kf_agent.drivers.control_locator import get_control_locator
+        return get_control_locator(self.platform_id).locate(control, probe=True) is not None
+
     def click(self, x: int, y: int) -> None:
         self._click_driver().click(x, y)
 
     def find_and_click_image(self, image_path: str, threshold: float = 0.8) -> bool:
-        return self._click_driver().find_and_click_image(image_path, threshold)
+        driver = self._click_driver()
+        try:
+            return driver.find_and_click_image(image_path, threshold)
+        finally:
+            self.last_locate = driver.last_locate
 
-    def find_and_click_control(self, control: ElementControl) -> bool:
-        """使用 pywinauto 查找控件并点击。需 Windows + pywinauto。"""
-        if sys.platform != "win32" or not _PYWINAUTO_AVAILABLE or Application is None:
-            return super().find_and_click_control(control)
+    def capture_frame(self, region: Optional[tuple[int, int, int, int]] = None) -> Optional[Any]:
+        return self._fallback.capture_frame(region) if self._fallback else None
 
-        if not control.window_title and not control.window_class:
-            logger.warning("find_and_click_control: need window_title or window_class")
-            return False
+    def failure_snapshot(self) -> Optional[dict]:
+        """图像点击失败时由回退驱动给出匹配时的帧；控件等其他失败截当前屏幕。"""
+        if self._fallback is not None and (self.last_locate or {}).get("method") == "image":
+            return self._fallback.failure_snapshot()
+        return super().failure_snapshot()
 
-        has_control_id = control.control_id is not None
-        has_auto_id = bool(control.automation_id)
-        has_control_type = bool(control.control_type)
-        has_name = bool(control.name)
-        if not (has_control_id or has_auto_id or has_control_type or has_name):
-            logger.warning("find_and_click_control: need at least one of control_id, automation_id, control_type, name")
-            return False
+    def held_bytes(self) -> int:
+        return self._fallback.held_bytes() if self._fallback else 0
 
-        try:
-            app = Application(backend="uia")
-            if control.window_title:
-                app = app.connect(title_re=f".*{re.escape(control.window_title)}.*", timeout=5)
-            else:
-                app = app.connect(class_name_re=f".*{re.escape(control.window_class or '')}.*", timeout=5)
-
-            win = app.windows()[0]
-            candidates: list[dict] = []
-            if has_auto_id and has_control_id:
-                candidates.append({"auto_id": control.automation_id, "control_id": control.control_id})
-            if has_auto_id and has_name:
-                candidates.append({"auto_id": control.automation_id, "title_re": f".*{re.escape(control.name or '')}.*"})
-            if has_control_id and has_name:
-                candidates.append({"control_id": control.control_id, "title_re": f".*{re.escape(control.name or '')}.*"})
-            if has_auto_id:
-                candidates.append({"auto_id": control.automation_id})
-            if has_control_id:
-                candidates.append({"control_id": control.control_id})
-            if has_name and has_control_type:
-                candidates.append({"title_re": f".*{re.escape(control.name or '')}.*", "control_type": control.control_type})
-            if has_name:
-                candidates.append({"title_re": f".*{re.escape(control.name or '')}.*"})
-            if has_control_type:
-                candidates.append({"control_type": control.control_type})
-
-            tried = set()
-            for kwargs in candidates:
-                key = tuple(sorted(kwargs.items()))
-                if key in tried:
-                    continue
-                tried.add(key)
-                try:
-                    ctrl = win.child_window(**kwargs)
-                    ctrl.click_input()
-                    return True
-                except Exception:
-                    continue
-            return False
-        except ElementNotFoundError as e:
-            logger.warning("find_and_click_control: element not found: %s", e)
-            return False
-        except Exception as e:
-            logger.warning("find_and_click_control: %s", e)
-            return False
+    def find_and_click_control(self, control: ElementControl) -> bool:
+        """使用 pywinauto 查找控件并点击（优先上次命中的查询策略）。需 Windows + pywinauto。"""
+        if sys.platform != "win32" or not _PYWINAUTO_AVAILABLE or Application is None:
+            return super().find_and_click_control(control)
+        from kf_agent.drivers.control_locator import get_control_locator
+        locator = get_control_locator(self.platform_id)
+        ok = locator.click(control)
+        self.last_locate = {"method": "control", "strategy": locator.remembered_strategy(control) if ok else None}
+        return ok
 
     def type_text(self, text: str) -> None:
         self._click_driver().type_text(text)
 
+    def insert_text(self, text: str) -> None:
+        self._click_driver().insert_text(text)
+
     def hotkey(self, *keys: str) -> None:
         self._click_driver().hotkey(*keys)
 
+    def send_input(self, events: list, delay: float = 0.0) -> None:
+        self._click_driver().send_input(events, delay)
+
     def close_window(
         self,
         title: Optional[str] = None,
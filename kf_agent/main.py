@@ -1,11 +1,13 @@
 """客服软件操控服务 - FastAPI 入口。"""
+import asyncio
 import logging
+import os
 from pathlib import Path
 from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.openapi.docs import (
     get_redoc_html,
     get_swagger_ui_html,
@@ -14,12 +16,10 @@ from fastapi.openapi.docs import (
 from fastapi.staticfiles import StaticFiles
 
 from kf_agent.config import get_settings
-from kf_agent.api.routes import customer_service, config_editor, editor_tools, resource_library
+from kf_agent.config.logging_setup import setup_logging
+from kf_agent.api.routes import customer_service, config_editor, debug, editor_tools, resource_library, runs
 
-logging.basicConfig(
-    level=getattr(logging, get_settings().log_level.upper(), logging.INFO),
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # 静态资源目录（包内 static，安装后随包一起）
@@ -30,7 +30,19 @@ STATIC_DIR = Path(__file__).resolve().parent / "static"
 async def lifespan(app: FastAPI):
     settings = get_settings()
     settings.platforms_dir.mkdir(parents=True, exist_ok=True)
+    from kf_agent.core.memory import start_tracing_if_configured
+    start_tracing_if_configured()
+    # 执行器模式下预热发生在执行器进程内（见 executor.serve_forever）
+    if settings.prewarm_on_startup and settings.executor_mode != "process":
+        from kf_agent.core.prewarm import start_prewarm
+        start_prewarm()
+    heartbeat_task = None
+    if settings.coordinator_url:
+        from kf_agent.core.heartbeat import heartbeat_loop
+        heartbeat_task = asyncio.create_task(heartbeat_loop())
     yield
+    if heartbeat_task is not None:
+        heartbeat_task.cancel()
 
 
 app = FastAPI(
@@ -74,6 +86,8 @@ app.include_router(customer_service.router, prefix="/customer_service", tags=["c
 app.include_router(config_editor.router, prefix="/config", tags=["config"])
 app.include_router(editor_tools.router, prefix="/config", tags=["config"])
 app.include_router(resource_library.router, prefix="/config", tags=["config"])
+app.include_router(runs.router, prefix="/runs", tags=["runs"])
+app.include_router(debug.router, prefix="/debug", tags=["debug"])
 
 
 @app.get("/editor", include_in_schema=False)
@@ -90,12 +104,57 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+    """就绪检查：驱动依赖、模板与流程预热完成（warm）时返回 200，否则 503 并附带进度。"""
+    settings = get_settings()
+    if settings.executor_mode == "process":
+        from kf_agent.core import executor
+        loop = asyncio.get_event_loop()
+        try:
+            status = await loop.run_in_executor(None, lambda: executor.call("prewarm_status", timeout=2.0))
+        except executor.ExecutorError as e:
+            return JSONResponse(status_code=503, content={"status": "cold", "ready": False, "detail": str(e)})
+    else:
+        from kf_agent.core.prewarm import prewarm_status
+        status = prewarm_status()
+    return JSONResponse(status_code=200 if status.get("ready") else 503, content=status)
+
+
 def run() -> None:
-    """命令行入口：读取配置并启动 uvicorn。"""
+    """
+    命令行入口：读取配置并启动 uvicorn。
+    workers > 1 或 executor_mode=process 时，先拉起独立执行器进程，各 worker 通过本地 IPC 提交桌面操作。
+    """
     settings = get_settings()
-    uvicorn.run(
-        "kf_agent.main:app",
-        host=settings.host,
-        port=settings.port,
-        reload=False,
-    )
+    executor_proc = None
+    if settings.workers > 1 and settings.executor_mode != "process":
+        logger.warning("workers=%s requires executor_mode=process, switching", settings.workers)
+        # worker 进程会重新读取 Settings，通过环境变量传递
+        os.environ["EXECUTOR_MODE"] = "process"
+        settings = get_settings()
+    if settings.executor_mode == "process":
+        from kf_agent.core import executor
+        # 未配置密钥时随机生成（写入环境变量），worker 与执行器进程都继承这一把
+        try:
+            executor.ensure_authkey()
+        except executor.ExecutorError as e:
+            logger.error("%s", e)
+            raise SystemExit(1)
+        try:
+            executor.call("ping", timeout=1.0)
+            logger.info("using running executor at %s:%s", settings.executor_host, settings.executor_port)
+        except executor.ExecutorError:
+            executor_proc = executor.start_executor_process()
+    try:
+        uvicorn.run(
+            "kf_agent.main:app",
+            host=settings.host,
+            port=settings.port,
+            workers=settings.workers,
+            reload=False,
+        )
+    finally:
+        if executor_proc is not None and executor_proc.is_alive():
+            executor_proc.terminate()
+            executor_proc.join(timeout=5)
@@ -8,26 +8,43 @@
     { id: 'click', label: '点击' },
     { id: 'input_text', label: '输入文本' },
     { id: 'wait', label: '等待' },
+    { id: 'wait_stable', label: '等待画面稳定' },
     { id: 'hotkey', label: '快捷键' },
     { id: 'close_window', label: '关闭窗口' },
+    { id: 'sequence', label: '连续输入' },
+    { id: 'if_present', label: '如果出现' },
+    { id: 'if_absent', label: '如果未出现' },
+    { id: 'repeat_until', label: '重复直到' },
+    { id: 'parallel', label: '并行' },
   ];
 
   function defaultStep(type) {
     switch (type) {
       case 'launch':
-        return { type: 'launch', path: '', args: null, cwd: null };
+        return { type: 'launch', path: '', args: null, cwd: null, skip_if_running: false, process_name: null };
       case 'wait_window':
-        return { type: 'wait_window', title: null, class_name: null, timeout_seconds: 30 };
+        return { type: 'wait_window', title: null, class_name: null, timeout_seconds: 30, skip_if_exists: false };
       case 'click':
         return { type: 'click', element: null, x: null, y: null };
       case 'input_text':
-        return { type: 'input_text', element: null, text: '', clear_first: true };
+        return { type: 'input_text', element: null, text: '', clear_first: true, mode: 'type' };
       case 'wait':
         return { type: 'wait', seconds: 1 };
+      case 'wait_stable':
+        return { type: 'wait_stable', region: null, tolerance: 0, stable_samples: 3, interval_seconds: 0.1, timeout_seconds: 10 };
       case 'hotkey':
         return { type: 'hotkey', keys: ['ctrl', 'c'] };
       case 'close_window':
         return { type: 'close_window', title: null, class_name: null, kill_process: false };
+      case 'sequence':
+        return { type: 'sequence', actions: [], delay_seconds: 0 };
+      case 'if_present':
+      case 'if_absent':
+        return { type: type, element: null, timeout_seconds: 0, steps: [], else_steps: [] };
+      case 'repeat_until':
+        return { type: 'repeat_until', element: null, until_absent: false, steps: [], max_iterations: 10, interval_seconds: 0.5 };
+      case 'parallel':
+        return { type: 'parallel', branches: [[], []], join: 'all', timeout_seconds: null };
       default:
         return { type: 'wait', seconds: 1 };
     }
@@ -52,10 +69,21 @@
         return step.text ? `"${step.text.substring(0, 20)}${step.text.length > 20 ? '...' : ''}"` : '(空)';
       case 'wait':
         return `${step.seconds || 0} 秒`;
+      case 'wait_stable':
+        return `连续 ${step.stable_samples || 3} 次不变，超时 ${step.timeout_seconds ?? 10}s${step.region ? '（区域）' : ''}`;
       case 'hotkey':
         return (step.keys && step.keys.length) ? step.keys.join('+') : '(未设置)';
       case 'close_window':
         return step.title ? `关闭: ${step.title}` : '关闭窗口';
+      case 'sequence':
+        return (step.actions && step.actions.length) ? step.actions.map(function (a) { return a.action; }).join(' → ') : '(无动作)';
+      case 'if_present':
+      case 'if_absent':
+        return `${(step.steps || []).length} 步 / 否则 ${(step.else_steps || []).length} 步`;
+      case 'repeat_until':
+        return `${(step.steps || []).length} 步，最多 ${step.max_iterations || 10} 轮`;
+      case 'parallel':
+        return `${(step.branches || []).length} 个分支，${step.join === 'first' ? '任一完成' : '全部完成'}`;
       default:
         return step.type;
     }
@@ -384,12 +412,15 @@
         '<div class="path-row"><input type="text" data-field="path" value="' + escapeHtml(step.path || '') + '" placeholder="可执行文件完整路径" />' +
         '<button type="button" class="btn-choose-file" data-action="launch-choose-file">选择服务器文件</button></div></div>' +
         '<div class="form-group"><label>参数 args (逗号分隔)</label><input type="text" data-field="args" value="' + escapeHtml(Array.isArray(step.args) ? step.args.join(', ') : '') + '" placeholder="可选" /></div>' +
-        '<div class="form-group"><label>工作目录 (cwd)</label><input type="text" data-field="cwd" value="' + escapeHtml(step.cwd || '') + '" placeholder="建议与 path 所在目录一致，如 C:\\Program Files (x86)\\AliWorkbench" /></div>';
+        '<div class="form-group"><label>工作目录 (cwd)</label><input type="text" data-field="cwd" value="' + escapeHtml(step.cwd || '') + '" placeholder="建议与 path 所在目录一致，如 C:\\Program Files (x86)\\AliWorkbench" /></div>' +
+        '<div class="form-group"><label><input type="checkbox" data-field="skip_if_running" ' + (step.skip_if_running ? 'checked' : '') + ' /> 进程已运行时跳过</label></div>' +
+        '<div class="form-group"><label>进程名 (process_name)</label><input type="text" data-field="process_name" value="' + escapeHtml(step.process_name || '') + '" placeholder="默认取 path 的文件名" /></div>';
     } else if (type === 'wait_window') {
       html +=
         '<div class="form-group"><label>窗口标题 (title)</label><input type="text" data-field="title" value="' + escapeHtml(step.title || '') + '" /></div>' +
         '<div class="form-group"><label>类名 (class_name)</label><input type="text" data-field="class_name" value="' + escapeHtml(step.class_name || '') + '" /></div>' +
-        '<div class="form-group"><label>超时秒数 (timeout_seconds)</label><input type="number" data-field="timeout_seconds" step="any" value="' + (step.timeout_seconds ?? 30) + '" /></div>';
+        '<div class="form-group"><label>超时秒数 (timeout_seconds)</label><input type="number" data-field="timeout_seconds" step="any" value="' + (step.timeout_seconds ?? 30) + '" /></div>' +
+        '<div class="form-group"><label><input type="checkbox" data-field="skip_if_exists" ' + (step.skip_if_exists ? 'checked' : '') + ' /> 窗口已存在时立即继续</label></div>';
     } else if (type === 'click') {
       html += renderElementEditor(step.element, 'click');
       html += '<div class="form-group"><label>或直接坐标 x</label><input type="number" data-field="x" value="' + (step.x ?? '') + '" placeholder="可选" /></div>';
@@ -398,9 +429,23 @@
       html += renderElementEditor(step.element, 'input_text');
       html +=
         '<div class="form-group"><label>文本 (text)</label><textarea data-field="text" rows="2">' + escapeHtml(step.text || '') + '</textarea></div>' +
-        '<div class="form-group"><label><input type="checkbox" data-field="clear_first" ' + (step.clear_first !== false ? 'checked' : '') + ' /> 先清空</label></div>';
+        '<div class="form-group"><label><input type="checkbox" data-field="clear_first" ' + (step.clear_first !== false ? 'checked' : '') + ' /> 先清空</label></div>' +
+        '<div class="form-group"><label>输入方式 (mode)</label><select data-field="mode">' +
+        [['type', '逐字键入'], ['paste', '剪贴板粘贴'], ['auto', '自动（中文或长文本粘贴）']].map(function (o) {
+          return '<option value="' + o[0] + '"' + ((step.mode || 'type') === o[0] ? ' selected' : '') + '>' + o[1] + '</option>';
+        }).join('') +
+        '</select></div>';
     } else if (type === 'wait') {
       html += '<div class="form-group"><label>秒数 (seconds)</label><input type="number" data-field="seconds" step="any" value="' + (step.seconds ?? 1) + '" /></div>';
+    } else if (type === 'wait_stable') {
+      html +=
+        '<div class="form-group"><label>区域 (region, JSON, 可选)</label>' +
+        '<p class="field-hint">只比较该区域，如 {"x":0,"y":0,"width":800,"height":600}；留空为整屏</p>' +
+        '<textarea data-field="region" rows="2">' + escapeHtml(step.region ? JSON.stringify(step.region) : '') + '</textarea></div>' +
+        '<div class="form-group"><label>允许变化比例 (tolerance, 0~1)</label><input type="number" data-field="tolerance" step="any" min="0" max="1" value="' + (step.tolerance ?? 0) + '" /></div>' +
+        '<div class="form-group"><label>连续不变次数 (stable_samples)</label><input type="number" data-field="stable_samples" step="1" min="1" value="' + (step.stable_samples ?? 3) + '" /></div>' +
+        '<div class="form-group"><label>采样间隔秒数 (interval_seconds)</label><input type="number" data-field="interval_seconds" step="any" value="' + (step.interval_seconds ?? 0.1) + '" /></div>' +
+        '<div class="form-group"><label>超时秒数 (timeout_seconds)</label><input type="number" data-field="timeout_seconds" step="any" value="' + (step.timeout_seconds ?? 10) + '" /></div>';
     } else if (type === 'hotkey') {
       const keys = Array.isArray(step.keys) ? step.keys.join(', ') : '';
       html += '<div class="form-group"><label>按键 (keys, 逗号分隔)</label><input type="text" data-field="keys" value="' + escapeHtml(keys) + '" placeholder="ctrl, c" /></div>';
@@ -409,7 +454,47 @@
         '<div class="form-group"><label>窗口标题 (title)</label><input type="text" data-field="title" value="' + escapeHtml(step.title || '') + '" /></div>' +
         '<div class="form-group"><label>类名 (class_name)</label><input type="text" data-field="class_name" value="' + escapeHtml(step.class_name || '') + '" /></div>' +
         '<div class="form-group"><label><input type="checkbox" data-field="kill_process" ' + (step.kill_process ? 'checked' : '') + ' /> 结束进程</label></div>';
+    } else if (type === 'sequence') {
+      html +=
+        '<div class="form-group"><label>动作 (actions, JSON 数组)</label>' +
+        '<p class="field-hint">每项 action 为 click / type / paste / hotkey / wait，如 [{"action":"click","x":100,"y":200},{"action":"hotkey","keys":["ctrl","a"]},{"action":"paste","text":"您好"},{"action":"hotkey","keys":["enter"]}]</p>' +
+        '<textarea data-field="actions" rows="6">' + escapeHtml(JSON.stringify(step.actions || [], null, 2)) + '</textarea></div>' +
+        '<div class="form-group"><label>动作间隔秒数 (delay_seconds)</label><input type="number" data-field="delay_seconds" step="any" value="' + (step.delay_seconds ?? 0) + '" /></div>';
+    } else if (type === 'if_present' || type === 'if_absent' || type === 'repeat_until') {
+      html += renderElementEditor(step.element, type);
+      if (type === 'repeat_until') {
+        html +=
+          '<div class="form-group"><label><input type="checkbox" data-field="until_absent" ' + (step.until_absent ? 'checked' : '') + ' /> 直到元素消失（默认直到出现）</label></div>' +
+          '<div class="form-group"><label>最多轮数 (max_iterations)</label><input type="number" data-field="max_iterations" step="1" min="1" value="' + (step.max_iterations ?? 10) + '" /></div>' +
+          '<div class="form-group"><label>轮间隔秒数 (interval_seconds)</label><input type="number" data-field="interval_seconds" step="any" value="' + (step.interval_seconds ?? 0.5) + '" /></div>';
+      } else {
+        html += '<div class="form-group"><label>最多等待出现秒数 (timeout_seconds)</label><input type="number" data-field="timeout_seconds" step="any" value="' + (step.timeout_seconds ?? 0) + '" /></div>';
+      }
+      html +=
+        '<div class="form-group"><label>子步骤 (steps, JSON 数组)</label>' +
+        '<p class="field-hint">写法同 open/close 的步骤，可再嵌套分支或循环</p>' +
+        '<textarea data-field="steps" rows="6">' + escapeHtml(JSON.stringify(step.steps || [], null, 2)) + '</textarea></div>';
+      if (type !== 'repeat_until') {
+        html +=
+          '<div class="form-group"><label>否则执行 (else_steps, JSON 数组)</label>' +
+          '<textarea data-field="else_steps" rows="4">' + escapeHtml(JSON.stringify(step.else_steps || [], null, 2)) + '</textarea></div>';
+      }
+    } else if (type === 'parallel') {
+      html +=
+        '<div class="form-group"><label>分支 (branches, JSON 数组，每项为一个步骤数组)</label>' +
+        '<p class="field-hint">各分支同时执行，如 [[{"type":"wait_window","title":"登录"}],[{"type":"wait_window","title":"助手"}]]；点击、键入等输入仍逐个执行</p>' +
+        '<textarea data-field="branches" rows="8">' + escapeHtml(JSON.stringify(step.branches || [], null, 2)) + '</textarea></div>' +
+        '<div class="form-group"><label>汇合方式 (join)</label><select data-field="join">' +
+        [['all', '全部完成'], ['first', '任一完成']].map(function (o) {
+          return '<option value="' + o[0] + '"' + ((step.join || 'all') === o[0] ? ' selected' : '') + '>' + o[1] + '</option>';
+        }).join('') +
+        '</select></div>' +
+        '<div class="form-group"><label>共享超时秒数 (timeout_seconds, 可选)</label><input type="number" data-field="timeout_seconds" step="any" value="' + (step.timeout_seconds ?? '') + '" placeholder="不限" /></div>';
     }
+    html +=
+      '<div class="form-group"><label>已满足条件 (postcondition, JSON, 可选)</label>' +
+      '<p class="field-hint">执行前探测该元素，已存在则跳过本步骤，如 {"image":{"image":"online.png","threshold":0.8}} 或 {"control":{...}}</p>' +
+      '<textarea data-field="postcondition" rows="3">' + escapeHtml(step.postcondition ? JSON.stringify(step.postcondition, null, 2) : '') + '</textarea></div>';
     getEl('stepEditorContent').innerHTML = html;
     bindStepEditorInputs(flow, index);
   }
@@ -471,7 +556,7 @@
     const step = getStep(flow, index);
     if (!step) return;
     const content = getEl('stepEditorContent');
-    content.querySelectorAll('input, textarea').forEach(function (input) {
+    content.querySelectorAll('input, textarea, select[data-field]').forEach(function (input) {
       const field = input.getAttribute('data-field');
       const elem = input.getAttribute('data-elem');
       function apply() {
@@ -482,8 +567,24 @@
           } else if (field === 'keys') {
             const v = input.value.trim();
             step.keys = v ? v.split(',').map(function (s) { return s.trim(); }) : [];
-          } else if (field === 'clear_first' || field === 'kill_process') {
+          } else if (field === 'actions' || field === 'steps' || field === 'else_steps' || field === 'branches') {
+            try {
+              const v = JSON.parse(input.value || '[]');
+              if (Array.isArray(v)) step[field] = v;
+            } catch (e) { /* 输入未完成时忽略 */ }
+          } else if (field === 'postcondition' || field === 'region') {
+            const v = input.value.trim();
+            if (!v) step[field] = null;
+            else {
+              try {
+                const o = JSON.parse(v);
+                if (o && typeof o === 'object' && !Array.isArray(o)) step[field] = o;
+              } catch (e) { /* 输入未完成时忽略 */ }
+            }
+          } else if (field === 'clear_first' || field === 'kill_process' || field === 'skip_if_running' || field === 'skip_if_exists' || field === 'until_absent') {
             step[field] = input.checked;
+          } else if (input.type === 'number' && step.type === 'parallel' && input.value === '') {
+            step[field] = null;
           } else if (input.type === 'number') {
             const n = parseFloat(input.value);
             step[field] = isNaN(n) ? (field === 'timeout_seconds' ? 30 : field === 'seconds' ? 1 : 0) : n;
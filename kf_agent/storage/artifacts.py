@@ -0,0 +1,205 @@
+"""
+失败现场：流程因 EngineError 失败时保存当时的屏幕帧（图像定位失败时即匹配所用的那一帧，并框出最高分位置）、
+模板与定位信息，便于不登录远程桌面排查。目录结构 artifacts_dir/<run_id>/{screen.jpg, template.png, meta.json}。
+
+编码与写盘在后台线程进行（队列满时丢弃），总大小超过上限时按时间从旧到新删除整个 run 目录（环形缓冲）。
+成功路径没有任何开销：驱动只保留匹配帧的引用，失败时才交给这里。
+"""
+import json
+import logging
+import queue
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from kf_agent.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# 待写入的失败现场最多排队数（每项持有一帧整屏图像）
+_QUEUE_MAX = 4
+
+_RUN_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+class ArtifactStore:
+    """失败现场的磁盘环形缓冲。root 为目录，max_bytes 为总大小上限。"""
+
+    def __init__(self, root: Path, max_bytes: int, jpeg_quality: int = 80):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.jpeg_quality = jpeg_quality
+        self._queue: "queue.Queue[Optional[dict[str, Any]]]" = queue.Queue(maxsize=_QUEUE_MAX)
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # run_id -> (修改时间, 字节数)；首次写入时扫描一次目录建立
+        self._index: Optional[dict[str, tuple[float, int]]] = None
+        self.dropped = 0
+
+    # ---------- 写入（后台线程） ----------
+
+    def save_failure(
+        self,
+        run_id: str,
+        snapshot: dict[str, Any],
+        message: str,
+        extra: Optional[dict[str, Any]] = None,
+    ) -> bool:
+        """放入写入队列后立即返回；队列满时丢弃并返回 False。snapshot 为驱动 failure_snapshot() 的结果。"""
+        if not _RUN_ID.match(run_id):
+            return False
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait({"run_id": run_id, "message": message, "extra": extra or {}, **snapshot})
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("artifact queue full, dropped failure snapshot of run %s", run_id)
+            return False
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="kf-artifacts", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._write(job)
+            except Exception as e:
+                logger.warning("write artifacts of run %s failed: %s", job.get("run_id") if job else None, e)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, job: dict[str, Any]) -> None:
+        from kf_agent.drivers import image_click
+
+        run_dir = self.root / job["run_id"]
+        run_dir.mkdir(parents=True, exist_ok=True)
+        locate = job.get("locate") or {}
+        template = job.get("template")
+        meta: dict[str, Any] = {
+            "run_id": job["run_id"],
+            "message": job["message"],
+            "created_at": time.time(),
+            "locate": locate or None,
+            **job["extra"],
+        }
+        frame = job.get("frame")
+        if frame is not None and image_click.load_dependencies():
+            cv2 = image_click.cv2
+            box = self._best_box(template, locate)
+            if box is not None:
+                # 在副本上画框，驱动持有的帧保持不变
+                frame = frame.copy()
+                cv2.rectangle(frame, box[0], box[1], (0, 0, 255), 2)
+                meta["best_box"] = [*box[0], *box[1]]
+            ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if ok:
+                (run_dir / "screen.jpg").write_bytes(buf.tobytes())
+        if template and Path(template).is_file():
+            shutil.copyfile(template, run_dir / ("template" + (Path(template).suffix.lower() or ".png")))
+            meta["template"] = Path(template).name
+        (run_dir / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+        self._account(job["run_id"], run_dir)
+
+    @staticmethod
+    def _best_box(template: Optional[str], locate: dict[str, Any]) -> Optional[tuple[tuple[int, int], tuple[int, int]]]:
+        """最高分位置（locate 的 x/y 为中心）按模板尺寸换算为矩形。"""
+        if not template or locate.get("x") is None or locate.get("y") is None:
+            return None
+        from kf_agent.drivers.image_click import load_template
+
+        tpl = load_template(template)
+        if tpl is None:
+            return None
+        h, w = tpl.shape[:2]
+        x0, y0 = int(locate["x"]) - w // 2, int(locate["y"]) - h // 2
+        return (x0, y0), (x0 + w, y0 + h)
+
+    # ---------- 环形缓冲 ----------
+
+    @staticmethod
+    def _dir_size(path: Path) -> int:
+        return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+
+    def _load_index(self) -> dict[str, tuple[float, int]]:
+        if self._index is None:
+            self._index = {}
+            if self.root.is_dir():
+                for d in self.root.iterdir():
+                    if d.is_dir():
+                        self._index[d.name] = (d.stat().st_mtime, self._dir_size(d))
+        return self._index
+
+    def _account(self, run_id: str, run_dir: Path) -> None:
+        """登记新写入的目录大小，超出上限时从最旧的开始删除（至少保留刚写入的这一个）。"""
+        index = self._load_index()
+        index[run_id] = (time.time(), self._dir_size(run_dir))
+        total = sum(size for _, size in index.values())
+        for old_id, (_, size) in sorted(index.items(), key=lambda kv: kv[1][0]):
+            if total <= self.max_bytes or old_id == run_id:
+                break
+            shutil.rmtree(self.root / old_id, ignore_errors=True)
+            del index[old_id]
+            total -= size
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """等待队列中已提交的失败现场写完。"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    # ---------- 查询 ----------
+
+    def list_artifacts(self, run_id: str) -> Optional[list[dict[str, Any]]]:
+        """某次执行的失败现场文件（名称与字节数）；没有时返回 None。"""
+        if not _RUN_ID.match(run_id):
+            return None
+        run_dir = self.root / run_id
+        if not run_dir.is_dir():
+            return None
+        return [{"name": f.name, "size": f.stat().st_size} for f in sorted(run_dir.iterdir()) if f.is_file()]
+
+    def artifact_path(self, run_id: str, name: str) -> Optional[Path]:
+        if not _RUN_ID.match(run_id) or not _NAME.match(name) or name.startswith("."):
+            return None
+        path = self.root / run_id / name
+        return path if path.is_file() else None
+
+    def read_meta(self, run_id: str) -> Optional[dict[str, Any]]:
+        path = self.artifact_path(run_id, "meta.json")
+        if path is None:
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning("read artifact meta %s: %s", path, e)
+            return None
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> Optional[ArtifactStore]:
+    """进程内共享的失败现场存储；artifacts_enabled=false 时返回 None。"""
+    global _store
+    settings = get_settings()
+    if not settings.artifacts_enabled:
+        return None
+    with _store_lock:
+        if _store is None:
+            root = settings.artifacts_dir or (settings.platforms_dir / "artifacts")
+            _store = ArtifactStore(root, int(settings.artifacts_max_mb * 1024 * 1024), settings.artifacts_jpeg_quality)
+        return _store
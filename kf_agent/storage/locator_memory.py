@@ -0,0 +1,75 @@
+"""按平台读写控件定位记忆 JSON（与资源库并列：{platform}.locators.json）。"""
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from kf_agent.config import get_settings
+from kf_agent.core.models import LocatorMemory, LocatorMemoryEntry, LocatorStrategyStats
+
+logger = logging.getLogger(__name__)
+
+_save_lock = threading.Lock()
+
+
+def get_platforms_dir(platforms_dir: Optional[Path] = None) -> Path:
+    if platforms_dir is not None:
+        return Path(platforms_dir)
+    return get_settings().platforms_dir
+
+
+def path_for_platform_locators(platform_id: str, platforms_dir: Optional[Path] = None) -> Path:
+    root = get_platforms_dir(platforms_dir)
+    return root / f"{platform_id}.locators.json"
+
+
+def load_locator_memory(platform_id: str, platforms_dir: Optional[Path] = None) -> LocatorMemory:
+    """读取定位记忆，不存在或解析失败时返回空记忆。"""
+    path = path_for_platform_locators(platform_id, platforms_dir)
+    if not path.exists():
+        return LocatorMemory(platform=platform_id)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        data.setdefault("platform", platform_id)
+        return LocatorMemory.model_validate(data)
+    except Exception as e:
+        logger.warning("load_locator_memory failed: %s path=%s", e, path)
+        return LocatorMemory(platform=platform_id)
+
+
+def merge_locator_memory(base: LocatorMemory, delta: LocatorMemory) -> LocatorMemory:
+    """把增量 delta 合并进 base（原地修改并返回）：统计累加，命中策略取更新时间较晚的一方。"""
+    for key, d in delta.entries.items():
+        entry = base.entries.setdefault(key, LocatorMemoryEntry())
+        for name, ds in d.stats.items():
+            s = entry.stats.setdefault(name, LocatorStrategyStats())
+            s.attempts += ds.attempts
+            s.successes += ds.successes
+            s.total_ms = round(s.total_ms + ds.total_ms, 3)
+        if d.strategy and (entry.updated_at is None or (d.updated_at or "") >= entry.updated_at):
+            entry.strategy = d.strategy
+            entry.updated_at = d.updated_at
+    return base
+
+
+def save_locator_memory(delta: LocatorMemory, platforms_dir: Optional[Path] = None) -> Optional[LocatorMemory]:
+    """
+    把自上次保存以来的增量合并进文件（原子替换），返回合并后的完整记忆，失败返回 None。
+    写前重新读取文件：执行器进程与 API 进程（编辑器/拾取器）各有一个定位器，整份覆盖会互相丢失统计。
+    """
+    path = path_for_platform_locators(delta.platform, platforms_dir)
+    with _save_lock:
+        try:
+            merged = merge_locator_memory(load_locator_memory(delta.platform, platforms_dir), delta)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            raw = merged.model_dump_json(indent=2, ensure_ascii=False)
+            # 临时文件按进程区分，避免两个进程同时写同一个 .tmp
+            tmp = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+            tmp.write_text(raw, encoding="utf-8")
+            tmp.replace(path)
+            return merged
+        except Exception as e:
+            logger.warning("save_locator_memory failed: %s path=%s", e, path)
+            return None
@@ -1,6 +1,7 @@
 """按平台读写 JSON 配置。"""
 import json
 import logging
+import threading
 from pathlib import Path
 from typing import Optional
 
@@ -9,6 +10,10 @@ from kf_agent.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# 解析结果缓存：路径 -> ((mtime_ns, size), PlatformConfig)，文件变化后重新读取
+_cache: dict[str, tuple[tuple[int, int], PlatformConfig]] = {}
+_cache_lock = threading.Lock()
+
 
 def get_platforms_dir(platforms_dir: Optional[Path] = None) -> Path:
     if platforms_dir is not None:
@@ -24,16 +29,32 @@ def path_for_platform(platform_id: str, platforms_dir: Optional[Path] = None) ->
 def load_platform_config(platform_id: str, platforms_dir: Optional[Path] = None) -> Optional[PlatformConfig]:
     """读取平台配置，不存在或解析失败返回 None。"""
     path = path_for_platform(platform_id, platforms_dir)
-    if not path.exists():
+    try:
+        st = path.stat()
+    except OSError:
         return None
+    version = (st.st_mtime_ns, st.st_size)
+    key = str(path)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == version:
+            return hit[1]
     try:
         raw = path.read_text(encoding="utf-8")
         data = json.loads(raw)
         data.setdefault("platform", platform_id)
-        return PlatformConfig.model_validate(data)
+        config = PlatformConfig.model_validate(data)
     except Exception as e:
         logger.warning("load_platform_config failed: %s path=%s", e, path)
         return None
+    with _cache_lock:
+        _cache[key] = (version, config)
+    return config
+
+
+def _invalidate(path: Path) -> None:
+    with _cache_lock:
+        _cache.pop(str(path), None)
 
 
 def save_platform_config(config: PlatformConfig, platforms_dir: Optional[Path] = None) -> bool:
@@ -43,6 +64,7 @@ def save_platform_config(config: PlatformConfig, platforms_dir: Optional[Path] =
         path.parent.mkdir(parents=True, exist_ok=True)
         raw = config.model_dump_json(indent=2, ensure_ascii=False)
         path.write_text(raw, encoding="utf-8")
+        _invalidate(path)
         return True
     except Exception as e:
         logger.warning("save_platform_config failed: %s path=%s", e, path)
@@ -56,12 +78,17 @@ def delete_platform_config(platform_id: str, platforms_dir: Optional[Path] = Non
         return True
     try:
         path.unlink()
+        _invalidate(path)
         return True
     except Exception as e:
         logger.warning("delete_platform_config failed: %s path=%s", e, path)
         return False
 
 
+# 与平台配置并列存放的辅助文件，不是平台配置
+_AUX_SUFFIXES = (".resources.json", ".locators.json", ".waits.json")
+
+
 def list_platform_ids(platforms_dir: Optional[Path] = None) -> list[str]:
     """列出已有配置的平台 ID（按 .json 文件名）。"""
     root = get_platforms_dir(platforms_dir)
@@ -69,6 +96,6 @@ def list_platform_ids(platforms_dir: Optional[Path] = None) -> list[str]:
         return []
     ids = []
     for f in root.iterdir():
-        if f.suffix.lower() == ".json" and f.stem and not f.name.endswith(".resources.json"):
+        if f.suffix.lower() == ".json" and f.stem and not f.name.endswith(_AUX_SUFFIXES):
             ids.append(f.stem)
     return sorted(ids)
@@ -0,0 +1,392 @@
+"""
+执行历史：每次 open/close/run 记录一条（平台、流程、起止时间、各步骤耗时与定位得分、失败步骤、主机、内存峰值），
+保存在本地 SQLite（默认 platforms_dir/runs.db）。
+
+写入不在流程线程上进行：record() 只把记录放进队列，后台线程攒批后在一个事务中写入，
+并按条数与天数定期清理旧记录。查询直接读库（WAL 模式，可与写入并发，也可跨进程读取）。
+"""
+import json
+import logging
+import math
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from kf_agent.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# 攒批：最多等待的秒数 / 一批最多条数；每写入多少条执行一次保留清理
+_BATCH_SECONDS = 1.0
+_BATCH_MAX = 100
+_PRUNE_EVERY = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    platform TEXT NOT NULL,
+    flow TEXT NOT NULL,
+    host TEXT,
+    started_at REAL NOT NULL,
+    ended_at REAL NOT NULL,
+    duration_ms REAL NOT NULL,
+    success INTEGER NOT NULL,
+    message TEXT,
+    failed_step INTEGER,
+    resumed_from INTEGER,
+    peak_rss_mb REAL,
+    traced_peak_mb REAL
+);
+CREATE INDEX IF NOT EXISTS runs_platform_started ON runs (platform, started_at);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started_at);
+CREATE TABLE IF NOT EXISTS run_steps (
+    run_id TEXT NOT NULL,
+    step_index INTEGER NOT NULL,
+    type TEXT,
+    status TEXT NOT NULL,
+    duration_ms REAL NOT NULL,
+    locate TEXT,
+    PRIMARY KEY (run_id, step_index)
+);
+"""
+
+# 旧库缺少的列（列名, 类型），打开时补齐
+_ADDED_COLUMNS = (("peak_rss_mb", "REAL"), ("traced_peak_mb", "REAL"))
+
+_RUN_COLUMNS = (
+    "run_id", "platform", "flow", "host", "started_at", "ended_at", "duration_ms",
+    "success", "message", "failed_step", "resumed_from", "peak_rss_mb", "traced_peak_mb",
+)
+
+
+# 已建表/迁移过的数据库路径（每个路径每进程只执行一次 DDL）
+_initialized: set[str] = set()
+_init_lock = threading.Lock()
+
+
+def _percentile(values: list[float], q: float) -> Optional[float]:
+    """最近秩百分位（q 取 0~100），values 需已排序。"""
+    if not values:
+        return None
+    k = max(0, min(len(values) - 1, math.ceil(q / 100 * len(values)) - 1))
+    return round(values[k], 3)
+
+
+class RunHistoryStore:
+    """SQLite 执行历史。path 为数据库文件；max_runs / max_age_days 为保留上限。"""
+
+    def __init__(self, path: Path, max_runs: int = 10000, max_age_days: float = 30.0):
+        self.path = Path(path)
+        self._schema_key = str(self.path.resolve())
+        self.max_runs = max_runs
+        self.max_age_days = max_age_days
+        self._queue: "queue.Queue[Optional[dict[str, Any]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._since_prune = 0
+        self.dropped = 0
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=10.0)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _ensure_schema(self) -> None:
+        """建表并补齐旧库缺少的列；每个路径只执行一次，之后的查询与写入不再带 DDL。"""
+        key = self._schema_key
+        if key in _initialized:
+            return
+        with _init_lock:
+            if key in _initialized:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._open()
+            try:
+                conn.executescript(_SCHEMA)
+                existing = {row["name"] for row in conn.execute("PRAGMA table_info(runs)")}
+                for name, kind in _ADDED_COLUMNS:
+                    if name not in existing:
+                        conn.execute(f"ALTER TABLE runs ADD COLUMN {name} {kind}")
+                conn.commit()
+            finally:
+                conn.close()
+            _initialized.add(key)
+
+    def _connect(self) -> sqlite3.Connection:
+        self._ensure_schema()
+        return self._open()
+
+    # ---------- 写入（后台线程） ----------
+
+    def record(self, run: dict[str, Any]) -> None:
+        """放入写入队列后立即返回。run 含 run_id/platform/flow/host/started_at/ended_at/success/... 与 steps。"""
+        self._ensure_writer()
+        self._queue.put(run)
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="kf-run-history", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        conn = None
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + _BATCH_SECONDS
+            while len(batch) < _BATCH_MAX:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=left))
+                except queue.Empty:
+                    break
+            stop = None in batch
+            runs = [r for r in batch if r is not None]
+            try:
+                if conn is None:
+                    conn = self._connect()
+                if runs:
+                    self._write(conn, runs)
+            except Exception as e:
+                self.dropped += len(runs)
+                logger.warning("run history write failed (%s runs dropped): %s", len(runs), e)
+                conn = None
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                if conn is not None:
+                    conn.close()
+                return
+
+    def _write(self, conn: sqlite3.Connection, runs: list[dict[str, Any]]) -> None:
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO runs ({','.join(_RUN_COLUMNS)}) VALUES ({','.join('?' * len(_RUN_COLUMNS))})",
+                [
+                    (
+                        r["run_id"], r["platform"], r["flow"], r.get("host"),
+                        r["started_at"], r["ended_at"], round((r["ended_at"] - r["started_at"]) * 1000, 3),
+                        1 if r.get("success") else 0, r.get("message"), r.get("failed_step"), r.get("resumed_from"),
+                        r.get("peak_rss_mb"), r.get("traced_peak_mb"),
+                    )
+                    for r in runs
+                ],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO run_steps VALUES (?,?,?,?,?,?)",
+                [
+                    (
+                        r["run_id"], s["index"], s.get("type"), s["status"], s["duration_ms"],
+                        json.dumps(s["locate"], ensure_ascii=False) if s.get("locate") else None,
+                    )
+                    for r in runs
+                    for s in r.get("steps") or []
+                ],
+            )
+        self._since_prune += len(runs)
+        if self._since_prune >= _PRUNE_EVERY:
+            self._since_prune = 0
+            self.prune(conn)
+
+    def prune(self, conn: Optional[sqlite3.Connection] = None) -> None:
+        """按天数与条数清理旧记录。"""
+        own = conn is None
+        conn = conn or self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM runs WHERE started_at < ?", (time.time() - self.max_age_days * 86400,))
+                conn.execute(
+                    "DELETE FROM runs WHERE run_id IN "
+                    "(SELECT run_id FROM runs ORDER BY started_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_runs,),
+                )
+                conn.execute("DELETE FROM run_steps WHERE run_id NOT IN (SELECT run_id FROM runs)")
+        finally:
+            if own:
+                conn.close()
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """等待队列中已提交的记录写完（关闭前、测试时用）。"""
+        if self._writer is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=5.0)
+            self._writer = None
+
+    # ---------- 查询 ----------
+
+    @staticmethod
+    def _where(platform: Optional[str], flow: Optional[str], since: Optional[float]) -> tuple[str, list[Any]]:
+        clauses, args = [], []
+        if platform:
+            clauses.append("r.platform = ?")
+            args.append(platform)
+        if flow:
+            clauses.append("r.flow = ?")
+            args.append(flow)
+        if since is not None:
+            clauses.append("r.started_at >= ?")
+            args.append(since)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def list_runs(
+        self,
+        platform: Optional[str] = None,
+        flow: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = 100,
+    ) -> list[dict[str, Any]]:
+        """最近的执行记录（新到旧），不含步骤明细。"""
+        where, args = self._where(platform, flow, since)
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT * FROM runs r{where} ORDER BY r.started_at DESC LIMIT ?", (*args, limit),
+            ).fetchall()
+            return [self._run_row(row) for row in rows]
+        finally:
+            conn.close()
+
+    def get_run(self, run_id: str) -> Optional[dict[str, Any]]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            run = self._run_row(row)
+            run["steps"] = [
+                {
+                    "index": s["step_index"],
+                    "type": s["type"],
+                    "status": s["status"],
+                    "duration_ms": s["duration_ms"],
+                    "locate": json.loads(s["locate"]) if s["locate"] else None,
+                }
+                for s in conn.execute(
+                    "SELECT * FROM run_steps WHERE run_id = ? ORDER BY step_index", (run_id,),
+                ).fetchall()
+            ]
+            return run
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _run_row(row: sqlite3.Row) -> dict[str, Any]:
+        run = dict(row)
+        run["success"] = bool(run["success"])
+        return run
+
+    def step_stats(
+        self,
+        platform: Optional[str] = None,
+        flow: Optional[str] = None,
+        since: Optional[float] = None,
+    ) -> list[dict[str, Any]]:
+        """按 (平台, 流程, 步骤下标) 汇总：执行次数、失败次数、跳过次数、耗时 p50/p95/p99/max（毫秒）。"""
+        where, args = self._where(platform, flow, since)
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT r.platform, r.flow, s.step_index, s.type, s.status, s.duration_ms "
+                f"FROM run_steps s JOIN runs r ON r.run_id = s.run_id{where}",
+                args,
+            ).fetchall()
+        finally:
+            conn.close()
+        groups: dict[tuple, dict[str, Any]] = {}
+        for row in rows:
+            key = (row["platform"], row["flow"], row["step_index"])
+            g = groups.setdefault(key, {"type": row["type"], "durations": [], "failed": 0, "skipped": 0})
+            g["durations"].append(row["duration_ms"])
+            if row["status"] == "failed":
+                g["failed"] += 1
+            elif row["status"] == "skipped":
+                g["skipped"] += 1
+        out = []
+        for (pid, fl, idx), g in sorted(groups.items()):
+            d = sorted(g["durations"])
+            out.append({
+                "platform": pid,
+                "flow": fl,
+                "step": idx,
+                "type": g["type"],
+                "count": len(d),
+                "failed": g["failed"],
+                "skipped": g["skipped"],
+                "p50_ms": _percentile(d, 50),
+                "p95_ms": _percentile(d, 95),
+                "p99_ms": _percentile(d, 99),
+                "max_ms": round(d[-1], 3) if d else None,
+            })
+        return out
+
+    def failure_rates(
+        self,
+        platform: Optional[str] = None,
+        flow: Optional[str] = None,
+        since: Optional[float] = None,
+    ) -> list[dict[str, Any]]:
+        """按 (平台, 流程) 汇总：执行次数、失败次数与失败率、耗时 p50/p99、内存峰值 p50/max（MB）。"""
+        where, args = self._where(platform, flow, since)
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT r.platform, r.flow, r.success, r.duration_ms, r.peak_rss_mb FROM runs r{where}", args,
+            ).fetchall()
+        finally:
+            conn.close()
+        groups: dict[tuple, list] = {}
+        for row in rows:
+            groups.setdefault((row["platform"], row["flow"]), []).append(
+                (row["success"], row["duration_ms"], row["peak_rss_mb"]),
+            )
+        out = []
+        for (pid, fl), items in sorted(groups.items()):
+            failed = sum(1 for ok, _, _ in items if not ok)
+            d = sorted(ms for _, ms, _ in items)
+            peaks = sorted(mb for _, _, mb in items if mb is not None)
+            out.append({
+                "platform": pid,
+                "flow": fl,
+                "runs": len(items),
+                "failed": failed,
+                "failure_rate": round(failed / len(items), 4),
+                "p50_ms": _percentile(d, 50),
+                "p99_ms": _percentile(d, 99),
+                "peak_rss_mb_p50": _percentile(peaks, 50),
+                "peak_rss_mb_max": peaks[-1] if peaks else None,
+            })
+        return out
+
+
+_store: Optional[RunHistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_run_history() -> Optional[RunHistoryStore]:
+    """进程内共享的执行历史；run_history_enabled=false 时返回 None。"""
+    global _store
+    settings = get_settings()
+    if not settings.run_history_enabled:
+        return None
+    with _store_lock:
+        if _store is None:
+            path = settings.run_history_path or (settings.platforms_dir / "runs.db")
+            _store = RunHistoryStore(path, settings.run_history_max_runs, settings.run_history_max_age_days)
+        return _store
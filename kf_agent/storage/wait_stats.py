@@ -0,0 +1,50 @@
+"""按平台读写固定等待观测 JSON（与资源库并列：{platform}.waits.json）。"""
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+
+from kf_agent.config import get_settings
+from kf_agent.core.models import WaitStats
+
+logger = logging.getLogger(__name__)
+
+
+def get_platforms_dir(platforms_dir: Optional[Path] = None) -> Path:
+    if platforms_dir is not None:
+        return Path(platforms_dir)
+    return get_settings().platforms_dir
+
+
+def path_for_platform_waits(platform_id: str, platforms_dir: Optional[Path] = None) -> Path:
+    root = get_platforms_dir(platforms_dir)
+    return root / f"{platform_id}.waits.json"
+
+
+def load_wait_stats(platform_id: str, platforms_dir: Optional[Path] = None) -> WaitStats:
+    """读取等待观测，不存在或解析失败时返回空观测。"""
+    path = path_for_platform_waits(platform_id, platforms_dir)
+    if not path.exists():
+        return WaitStats(platform=platform_id)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        data.setdefault("platform", platform_id)
+        return WaitStats.model_validate(data)
+    except Exception as e:
+        logger.warning("load_wait_stats failed: %s path=%s", e, path)
+        return WaitStats(platform=platform_id)
+
+
+def save_wait_stats(stats: WaitStats, platforms_dir: Optional[Path] = None) -> bool:
+    """保存等待观测（原子替换）。"""
+    path = path_for_platform_waits(stats.platform, platforms_dir)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        raw = stats.model_dump_json(indent=2, ensure_ascii=False)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(raw, encoding="utf-8")
+        tmp.replace(path)
+        return True
+    except Exception as e:
+        logger.warning("save_wait_stats failed: %s path=%s", e, path)
+        return False
@@ -0,0 +1,138 @@
+"""
+控件拾取命中测试基准：用合成元素树对比“每次逐层下降”与“快照 + 网格索引”的点查询耗时，
+并统计两者命中结果一致的比例。不依赖 Windows / UIA。
+合成树的元素访问没有开销，而真实环境中每次取矩形/子元素都是一次 UIA 跨进程调用
+（通常几十到几百微秒）；--call-us 为每次调用的估算耗时，输出按此折算的快照构建时间、
+每次逐层下降的耗时，以及快照在多少次查询后才划算。
+
+用法：
+    python scripts/bench_hit_testing.py --fanout 6 --depth 5 --queries 2000 --call-us 100
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kf_agent.api.hit_testing import GridIndex, smallest_by_descent, snapshot_tree  # noqa: E402
+
+
+class Elem:
+    """合成元素：矩形 + 子元素。"""
+
+    def __init__(self, rect, children=None):
+        self.rect = rect
+        self.children = children or []
+
+
+def _split(rect, n, rng):
+    """把矩形切成 n 个带间隙的子矩形（交替横/纵切）。"""
+    l, t, r, b = rect
+    horizontal = (r - l) >= (b - t)
+    span = (r - l) if horizontal else (b - t)
+    step = max(1, span // n)
+    out = []
+    for i in range(n):
+        a = step * i + rng.randint(0, max(0, step // 8))
+        z = step * (i + 1) - rng.randint(1, max(1, step // 8))
+        if z <= a:
+            continue
+        out.append((l + a, t, l + z, b) if horizontal else (l, t + a, r, t + z))
+    return out
+
+
+def build_tree(fanout: int, depth: int, seed: int = 0, size=(1920, 1080)) -> tuple[Elem, int]:
+    rng = random.Random(seed)
+    root = Elem((0, 0, size[0], size[1]))
+    count = 1
+    level = [root]
+    for _ in range(depth):
+        nxt = []
+        for el in level:
+            for rc in _split(el.rect, fanout, rng):
+                child = Elem(rc)
+                el.children.append(child)
+                nxt.append(child)
+        count += len(nxt)
+        level = nxt
+    return root, count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="控件拾取命中测试基准")
+    parser.add_argument("--fanout", type=int, default=6)
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--cell-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--call-us", type=float, default=100.0, help="每次 UIA 元素调用的估算耗时（微秒）")
+    parser.add_argument("--max-nodes", type=int, default=5000, help="快照节点数上限（同拾取器）")
+    args = parser.parse_args()
+
+    root, count = build_tree(args.fanout, args.depth, args.seed)
+    calls = {"n": 0}
+
+    def get_rect(e):
+        calls["n"] += 1
+        return e.rect
+
+    def get_children(e):
+        calls["n"] += 1
+        return e.children
+
+    rng = random.Random(args.seed + 1)
+    points = [(rng.randint(0, 1919), rng.randint(0, 1079)) for _ in range(args.queries)]
+
+    calls["n"] = 0
+    t0 = time.perf_counter()
+    nodes = snapshot_tree(root, get_rect, get_children, max_depth=args.depth + 1, max_nodes=args.max_nodes)
+    index = GridIndex(nodes, cell_size=args.cell_size)
+    build_s = time.perf_counter() - t0
+    snapshot_calls = calls["n"]
+
+    calls["n"] = 0
+    t0 = time.perf_counter()
+    descent = [smallest_by_descent(root, x, y, get_rect, get_children, max_depth=args.depth + 1) for x, y in points]
+    descent_s = time.perf_counter() - t0
+    descent_calls = calls["n"]
+
+    # 与拾取器相同：索引命中被截断的节点时从该节点继续下降
+    calls["n"] = 0
+    t0 = time.perf_counter()
+    indexed = []
+    for x, y in points:
+        node = index.deepest_at(x, y)
+        elem = node.payload if node is not None else None
+        if node is not None and node.truncated:
+            elem = smallest_by_descent(elem, x, y, get_rect, get_children, max_depth=args.depth + 1)
+        indexed.append(elem)
+    index_s = time.perf_counter() - t0
+    index_calls = calls["n"]
+
+    same = sum(1 for a, b in zip(descent, indexed) if b is a)
+    call_ms = args.call_us / 1000
+    descent_ms = descent_s * 1000 / args.queries + descent_calls / args.queries * call_ms
+    index_ms = index_s * 1000 / args.queries + index_calls / args.queries * call_ms
+    build_ms = build_s * 1000 + snapshot_calls * call_ms
+    result = {
+        "elements": count,
+        "snapshot_nodes": len(nodes),
+        "truncated_nodes": sum(1 for n in nodes if n.truncated),
+        "queries": args.queries,
+        "snapshot_element_calls": snapshot_calls,
+        "descent_element_calls_per_query": round(descent_calls / args.queries, 2),
+        "index_element_calls_per_query": round(index_calls / args.queries, 2),
+        "snapshot_build_ms": round(build_ms, 3),
+        "descent_ms_per_query": round(descent_ms, 4),
+        "index_ms_per_query": round(index_ms, 4),
+        "breakeven_queries": round(build_ms / (descent_ms - index_ms), 1) if descent_ms > index_ms else None,
+        "agreement": round(same / args.queries, 4),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+启动耗时基准：测量 (1) 导入 kf_agent.main 的耗时，(2) 启动 kf-agent 到 /health 可用，
+(3) 到 /ready 变为 warm，(4) 首个请求的耗时。每项测量 --runs 次后输出中位数与最大值（JSON）。
+
+用法：
+    python scripts/bench_startup.py --runs 5 --port 8765
+    python scripts/bench_startup.py --runs 3 --driver fake   # 不依赖桌面环境
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Optional
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_seconds() -> float:
+    code = "import time; t=time.perf_counter(); import kf_agent.main; print(time.perf_counter()-t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BASE, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _get(url: str, timeout: float = 2.0) -> Optional[int]:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except Exception:
+        return None
+
+
+def _wait_status(url: str, want: int, deadline: float) -> Optional[float]:
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        if _get(url) == want:
+            return time.perf_counter() - start
+        time.sleep(0.02)
+    return None
+
+
+def _server_run(port: int, env: dict, ready_timeout: float) -> dict:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "kf_agent.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BASE,
+        env=env,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        t0 = time.perf_counter()
+        deadline = t0 + ready_timeout
+        health = _wait_status(base + "/health", 200, deadline)
+        health_s = None if health is None else time.perf_counter() - t0
+        ready = _wait_status(base + "/ready", 200, deadline)
+        ready_s = None if ready is None else time.perf_counter() - t0
+        t1 = time.perf_counter()
+        _get(base + "/customer_service/platforms", timeout=30)
+        first_s = time.perf_counter() - t1
+        return {"health": health_s, "ready": ready_s, "first_request": first_s}
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _summary(values: list) -> dict:
+    vals = [v for v in values if v is not None]
+    if not vals:
+        return {"median": None, "max": None, "missing": len(values)}
+    return {
+        "median": round(statistics.median(vals), 4),
+        "max": round(max(vals), 4),
+        "missing": len(values) - len(vals),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="kf-agent 启动耗时基准")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--driver", default=None, help="覆盖 DRIVER 配置，如 fake")
+    parser.add_argument("--ready-timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.driver:
+        env["DRIVER"] = args.driver
+
+    imports = [_import_seconds() for _ in range(args.runs)]
+    servers = [_server_run(args.port, env, args.ready_timeout) for _ in range(args.runs)]
+    result = {
+        "runs": args.runs,
+        "import_kf_agent_main": _summary(imports),
+        "to_health": _summary([s["health"] for s in servers]),
+        "to_ready": _summary([s["ready"] for s in servers]),
+        "first_request": _summary([s["first_request"] for s in servers]),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()